@@ -0,0 +1,61 @@
+"""
+Checks the candle store for missing candles and fetches the missing ranges.
+
+Usage (from the project root):
+    python backfill_gaps.py --check                # report gaps only, no API calls
+    python backfill_gaps.py                        # fetch up to --max-gaps ranges
+    python backfill_gaps.py --storage chunked --max-gaps 200
+"""
+import argparse
+import logging
+import time
+from collections import Counter
+
+from src.config import get_app_config
+from src.database import STORAGE_ENGINES, create_database_manager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    # Default to the store the bot reads (CACHE_DB_PATH / CACHE_STORAGE) and its backfill limits.
+    config = get_app_config()
+    cache_config = config.get('cache', {})
+    parser = argparse.ArgumentParser(description="Find and backfill missing candles in the SQLite candle store.")
+    parser.add_argument('--db', default=cache_config.get('DB_PATH', 'data/cache.db'),
+                        help="SQLite database path (default: CACHE_DB_PATH).")
+    parser.add_argument('--storage', choices=STORAGE_ENGINES, default=cache_config.get('STORAGE', 'rows'),
+                        help="Candle storage engine (default: CACHE_STORAGE).")
+    parser.add_argument('--check', action='store_true', help="Only refresh and print the gap index.")
+    parser.add_argument('--max-gaps', type=int, default=cache_config.get('BACKFILL_MAX_GAPS', 20),
+                        help="Gaps to fetch in this run (default: CACHE_BACKFILL_MAX_GAPS).")
+    parser.add_argument('--max-attempts', type=int, default=cache_config.get('BACKFILL_MAX_ATTEMPTS', 3),
+                        help="Skip gaps that stayed empty this many times (default: CACHE_BACKFILL_MAX_ATTEMPTS).")
+    args = parser.parse_args()
+
+    db = create_database_manager(args.db, args.storage)
+    try:
+        if args.check:
+            started = time.perf_counter()
+            gaps = db.refresh_gap_index()
+            elapsed = time.perf_counter() - started
+            per_series = Counter((symbol, timeframe) for symbol, timeframe, _, _ in gaps)
+            for (symbol, timeframe), count in sorted(per_series.items()):
+                print(f"{symbol:<16} {timeframe:<5} {count} gaps")
+            print(f"{len(gaps)} gaps in {len(per_series)} series (checked in {elapsed:.2f}s)")
+            return
+
+        from src.backfill import GapBackfiller
+        from src.data_retrieval.data_fetcher import DataFetcher
+        report = GapBackfiller(db, DataFetcher(config), max_attempts=args.max_attempts,
+                               max_gaps=args.max_gaps).run()
+        print(f"{report['filled']}/{report['attempted']} gaps filled, {report['inserted']:,} candles inserted, "
+              f"{report['open']} gaps were open")
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()
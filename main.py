@@ -1,12 +1,19 @@
+import asyncio
 import logging
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler
-from src.config import get_config
+from src.config import get_app_config
 from src.localization import get_text
+from src.update_processor import ChatUpdateProcessor
 from src.telegram_bot import (
     start,
+    subscribe_command,
+    unsubscribe_command,
+    list_subscriptions_command,
+    jobs_command,
     conv_handler,
     error_handler,
     post_init,
+    post_shutdown,
 )
 
 # Set up logging
@@ -18,14 +25,28 @@ logger = logging.getLogger(__name__)
 
 def main() -> None:
     """Starts the Telegram bot."""
-    config = get_config()
+    config = get_app_config()
     token = config.get('telegram', {}).get('TOKEN')
     if not token:
         logger.error(get_text("error_no_token"))
         return
 
+    telegram_config = config.get('telegram', {})
+    mode = telegram_config.get('MODE', 'polling')
+
     # Create the Application and pass it your bot's token.
-    application = Application.builder().token(token).post_init(post_init).build()
+    builder = (
+        Application.builder()
+        .token(token)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        # Concurrent across chats, one at a time within a chat (the conversation state is per chat).
+        .concurrent_updates(ChatUpdateProcessor(telegram_config.get('UPDATE_WORKERS', 8)))
+    )
+    if mode == 'webhook':
+        # Updates arrive through our own HTTP server instead of the polling Updater.
+        builder = builder.updater(None)
+    application = builder.build()
 
     # It's important to load the config into bot_data for access in handlers
     application.bot_data['config'] = config
@@ -33,6 +54,10 @@ def main() -> None:
     # Add command and callback query handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CallbackQueryHandler(start, pattern='^main_menu$'))
+    application.add_handler(CommandHandler("subscribe", subscribe_command))
+    application.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
+    application.add_handler(CommandHandler("subscriptions", list_subscriptions_command))
+    application.add_handler(CommandHandler("jobs", jobs_command))
 
     # Add the conversation handler for the analysis flow
     # This handler now manages the 'analyze_start' callback.
@@ -43,7 +68,11 @@ def main() -> None:
 
     # Run the bot until the user presses Ctrl-C
     logger.info(get_text("bot_starting_log"))
-    application.run_polling()
+    if mode == 'webhook':
+        from src.webhook_server import serve_webhook
+        asyncio.run(serve_webhook(application, telegram_config.get('WEBHOOK', {})))
+    else:
+        application.run_polling()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
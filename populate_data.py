@@ -61,7 +61,8 @@ async def populate_all_data():
 
     config = get_config()
     fetcher = DataFetcher(config)
-    cache_manager = CacheManager()
+    cache_config = config.get('cache', {})
+    cache_manager = CacheManager(cache_config.get('DB_PATH', 'data/cache.db'), storage=cache_config.get('STORAGE', 'rows'))
 
     watchlist = config.get('trading', {}).get('WATCHLIST', [])
     timeframe_groups = config.get('trading', {}).get('TIMEFRAME_GROUPS', {})
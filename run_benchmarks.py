@@ -0,0 +1,88 @@
+"""
+Benchmarks the analysis hot path and compares it with a saved baseline.
+
+Usage (from the project root):
+    python run_benchmarks.py --save-baseline           # record this machine's baseline
+    python run_benchmarks.py                           # compare; exits 1 on regressions
+    python run_benchmarks.py --sizes 1000,100000 --no-cached --stages calculate_,get_analysis
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import warnings
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory benchmarks for the analysis stages.")
+    parser.add_argument('--sizes', default=None, help="Comma-separated synthetic series lengths (default: 1k..1M).")
+    parser.add_argument('--no-cached', action='store_true', help="Skip the snapshot series under --data-root.")
+    parser.add_argument('--data-root', default='data', help="Root of the <SYMBOL>/<term>/<timeframe>.json snapshots.")
+    parser.add_argument('--symbols', default=None, help="Comma-separated snapshot symbols to include.")
+    parser.add_argument('--stages', default=None, help="Comma-separated substrings; run only matching stages.")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per stage and series.")
+    parser.add_argument('--budget', type=float, default=2.0, help="Stop repeating a stage after this many seconds.")
+    parser.add_argument('--baseline', default=None, help="Baseline JSON (default: data/benchmark_baseline.json).")
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown/growth before flagging (0.25 = 25%%).")
+    parser.add_argument('--output', default=None, help="Also write the full results to this JSON file.")
+    args = parser.parse_args()
+
+    from src import benchmarks
+    from src.config import get_app_config
+
+    # mplfinance warns about plotting large series; the chart stage does so on purpose.
+    warnings.filterwarnings('ignore', module='mplfinance')
+
+    config = get_app_config()
+    sizes = [int(size) for size in args.sizes.split(',')] if args.sizes else benchmarks.DEFAULT_SIZES
+    series = []
+    if not args.no_cached and os.path.isdir(args.data_root):
+        symbols = args.symbols.split(',') if args.symbols else None
+        series.extend(benchmarks.cached_series(args.data_root, config, symbols))
+    series.extend(benchmarks.synthetic_series(sizes, config))
+    stages = benchmarks.default_stages()
+    if args.stages:
+        patterns = args.stages.split(',')
+        stages = [stage for stage in stages if any(pattern in stage.name for pattern in patterns)]
+
+    baseline_path = args.baseline or benchmarks.DEFAULT_BASELINE
+    baseline = None
+    if not args.save_baseline and os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print(benchmarks.TABLE_HEADER + (f" {'VS BASE':>8}" if baseline else ''))
+    report = benchmarks.run_suite(series, stages, args.repeat, args.budget,
+                                  on_result=lambda result: print(benchmarks.format_result(result, baseline), flush=True))
+
+    for path in filter(None, (args.output, baseline_path if args.save_baseline else None)):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+
+    if baseline is None:
+        if not args.save_baseline:
+            print(f"No baseline at {baseline_path}; run with --save-baseline to record one.")
+        return
+    regressions = benchmarks.compare(report, baseline, args.tolerance)
+    if not regressions:
+        print(f"No regressions against the baseline of {baseline.get('created', '?')}.")
+        return
+    print(f"\n{len(regressions)} regressions against the baseline of {baseline.get('created', '?')}:")
+    for regression in regressions:
+        fmt = benchmarks.format_duration if regression['metric'] == 'min' else benchmarks.format_bytes
+        print(f"  {regression['key']:<52} {'time' if regression['metric'] == 'min' else 'memory':<7} "
+              f"{fmt(regression['baseline'])} -> {fmt(regression['current'])} (x{regression['ratio']:.2f})")
+    sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Scans the OKX spot universe for FiboAnalyzer setups and prints a ranked table.
+
+Usage (from the project root):
+    python scan_market.py --timeframe 1H                 # every USDT pair, BUY/SELL setups only
+    python scan_market.py --timeframe 4H --all --top 50  # include HOLD rows
+    python scan_market.py --timeframe 15m --min-volume 1000000 --max-instruments 200
+"""
+import argparse
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen the OKX spot market for BUY/SELL setups.")
+    parser.add_argument('--timeframe', default='1H', help="Timeframe to analyze.")
+    parser.add_argument('--quote', default='USDT', help="Quote currency of the scanned pairs.")
+    parser.add_argument('--min-volume', type=float, default=0.0, help="Minimum 24h volume in the quote currency.")
+    parser.add_argument('--max-instruments', type=int, default=None, help="Scan only the N most traded pairs.")
+    parser.add_argument('--workers', type=int, default=None, help="Analysis processes (default: CPU count, 0: in-process).")
+    parser.add_argument('--fetch-threads', type=int, default=8, help="Concurrent fetches (bounded by EXCHANGE_RATE_LIMIT).")
+    parser.add_argument('--no-cache', action='store_true', help="Do not read or write the candle cache.")
+    parser.add_argument('--all', action='store_true', help="Also list instruments without a BUY/SELL signal.")
+    parser.add_argument('--top', type=int, default=30, help="Rows to print.")
+    args = parser.parse_args()
+
+    from src.config import get_app_config
+    from src.market_scanner import SIGNALS, MarketScanner
+
+    config = get_app_config()
+    cache_manager = None
+    if not args.no_cache:
+        from src.cache_manager import CacheManager
+        cache_config = config.get('cache', {})
+        cache_manager = CacheManager(cache_config.get('DB_PATH', 'data/cache.db'),
+                                     storage=cache_config.get('STORAGE', 'rows'),
+                                     write_behind=cache_config.get('WRITE_BEHIND', True),
+                                     max_gap_attempts=cache_config.get('BACKFILL_MAX_ATTEMPTS', 3))
+    try:
+        scanner = MarketScanner(config, args.timeframe, cache_manager=cache_manager, workers=args.workers,
+                                fetch_threads=args.fetch_threads, quote=args.quote,
+                                min_volume=args.min_volume, max_instruments=args.max_instruments)
+        report = scanner.scan()
+    finally:
+        if cache_manager:
+            cache_manager.close()
+
+    rows = report['results'] if args.all else [row for row in report['results'] if row['signal'] in SIGNALS]
+    print(f"{'#':>3}  {'SYMBOL':<16} {'SIGNAL':<6} {'CONF':>4} {'R/R':>6} {'SCORE':>5}  {'TREND':<10} {'PRICE':>14}")
+    for position, row in enumerate(rows[:args.top], 1):
+        print(f"{position:>3}  {row['symbol']:<16} {row['signal']:<6} {row['confidence']:>4} {row['rr_ratio']:>6.2f} "
+              f"{row['score']:>5}  {row['trend']:<10} {row['price']:>14.8g}")
+    print(f"{len(rows)} setups among {report['analyzed']}/{report['scanned']} instruments on {report['timeframe']} "
+          f"({len(report['failed'])} failed) in {report['elapsed']:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from telegram import Bot, Message
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+from src.metrics import STAGE_SECONDS, TELEGRAM_SENDS
+from src.rate_limiter import AsyncRateLimiter
+from src.retry_handler import decorrelated_jitter
+
+logger = logging.getLogger(__name__)
+
+_SEND_TIMER = STAGE_SECONDS.labels(stage='telegram_send')
+
+
+class AlertDispatcher:
+    """
+    Fans one rendered alert out to many chats within Telegram's send limits.
+
+    - A global token bucket keeps the bot under `global_rate` messages/second.
+    - Consecutive messages to the same chat are at least `per_chat_interval` apart.
+    - RetryAfter pauses every sender for the requested time and the message is retried;
+      transient network errors are retried with backoff up to `max_attempts`.
+    - A chart is uploaded once; every later send reuses Telegram's `file_id`.
+    - Chats that blocked the bot are reported through `on_blocked`.
+    """
+    def __init__(self, bot: Bot, global_rate: float = 25.0, per_chat_interval: float = 1.0,
+                 concurrency: int = 10, max_attempts: int = 3,
+                 on_blocked: Optional[Callable[[int], Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.bot = bot
+        self.per_chat_interval = per_chat_interval
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.on_blocked = on_blocked
+        self._clock = clock
+        self._limiter = AsyncRateLimiter(global_rate, clock=clock)
+        self._last_sent: Dict[int, float] = {}
+
+    async def broadcast(self, chat_ids: Iterable[int], text: str, photo: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Sends `text` (as a photo caption if `photo` is given) to every chat.
+
+        Returns:
+            A report dict: {'sent': int, 'failed': int, 'blocked': [chat_id, ...]}.
+        """
+        pending = list(dict.fromkeys(chat_ids))
+        report = {'sent': 0, 'failed': 0, 'blocked': []}
+        photo_ref: Union[bytes, str, None] = photo
+
+        # Upload the chart once; keep trying recipients until one upload succeeds.
+        while photo is not None and pending and isinstance(photo_ref, bytes):
+            message = await self._deliver(pending.pop(0), text, photo_ref, report)
+            if message is not None and message.photo:
+                photo_ref = message.photo[-1].file_id
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for chat_id in pending:
+            queue.put_nowait(chat_id)
+
+        async def worker():
+            while True:
+                try:
+                    chat_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._deliver(chat_id, text, photo_ref, report)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)))))
+        logger.info(f"Alert delivered: {report['sent']} sent, {report['failed']} failed, {len(report['blocked'])} blocked.")
+        return report
+
+    async def _wait_for_chat(self, chat_id: int):
+        last_sent = self._last_sent.get(chat_id)
+        if last_sent is not None:
+            wait = last_sent + self.per_chat_interval - self._clock()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def _deliver(self, chat_id: int, text: str, photo: Union[bytes, str, None],
+                       report: Dict[str, Any]) -> Optional[Message]:
+        delay = 0.5
+        for attempt in range(1, self.max_attempts + 1):
+            await self._wait_for_chat(chat_id)
+            await self._limiter.acquire()
+            self._last_sent[chat_id] = self._clock()
+            try:
+                with _SEND_TIMER.time():
+                    if photo is None:
+                        message = await self.bot.send_message(chat_id=chat_id, text=text)
+                    else:
+                        message = await self.bot.send_photo(chat_id=chat_id, photo=photo, caption=text)
+                report['sent'] += 1
+                TELEGRAM_SENDS.labels(outcome='sent').inc()
+                return message
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                logger.warning(f"Flood control hit while sending to {chat_id}; pausing {retry_after}s.")
+                self._limiter.pause(retry_after)
+            except Forbidden:
+                logger.info(f"Chat {chat_id} blocked the bot; dropping it.")
+                report['blocked'].append(chat_id)
+                TELEGRAM_SENDS.labels(outcome='blocked').inc()
+                if self.on_blocked:
+                    self.on_blocked(chat_id)
+                return None
+            except BadRequest as e:
+                logger.error(f"Alert to {chat_id} rejected: {e}")
+                break
+            except NetworkError as e:
+                logger.warning(f"Attempt {attempt}/{self.max_attempts} to send alert to {chat_id} failed: {e}")
+                if attempt < self.max_attempts:
+                    # Jittered, so a broadcast's failed sends do not all retry at once.
+                    delay = decorrelated_jitter(delay, 0.5, 10.0)
+                    await asyncio.sleep(delay)
+            except TelegramError as e:
+                logger.error(f"Alert to {chat_id} failed: {e}")
+                break
+        report['failed'] += 1
+        TELEGRAM_SENDS.labels(outcome='failed').inc()
+        return None
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src import tracing
+from src.utils.symbol_util import normalize_symbol
+from src.utils.timeframe_util import current_bar_start, timeframe_to_ms
+
+if TYPE_CHECKING:
+    # pandas and the analyzer are heavy; they are imported on first analysis.
+    import pandas as pd
+    from src.data_retrieval.data_fetcher import DataFetcher
+    from src.strategies.fibo_analyzer import FiboAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# (symbol, timeframe, limit) -> cleaned OHLCV DataFrame
+DataLoader = Callable[[str, str, int], Awaitable['pd.DataFrame']]
+# (symbol, timeframe, limit, expired_only) -> (cleaned OHLCV DataFrame, age in seconds, expired)
+# from the cache whatever its TTL, or None; with expired_only, also None while the series is fresh
+StaleLoader = Callable[[str, str, int, bool], Awaitable[Optional[Tuple['pd.DataFrame', float, bool]]]]
+# (stage, symbol, timeframe) -> None; stage is 'fetching' or 'analyzing'
+StageCallback = Callable[[str, str, str], Awaitable[None]]
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class AnalysisCoordinator:
+    """
+    Runs the multi-timeframe analysis for the whole TIMEFRAME_HIERARCHY.
+
+    Every (symbol, timeframe) series is analyzed at most once per bar: results are
+    memoized until the current bar closes, and concurrent requests for the same
+    series share a single in-flight analysis. Analyzing a child timeframe first
+    resolves its parent through the same memo, so the higher-timeframe trend used
+    for MTA confirmation is computed once and reused by every child.
+
+    With a live candle source, `on_bar_close` re-analyzes exactly the series
+    whose bar just confirmed. The coordinator keeps the raw OHLCV window of
+    every analyzed series and extends it with the confirmed candle, so the
+    re-analysis does not go back to the cache or the exchange.
+
+    With a `stale_loader`, `peek` answers from expired cached data instead, so
+    a caller can serve that at once while `analyze` refreshes the series.
+    """
+    def __init__(self, config: Dict[str, Any], data_loader: DataLoader,
+                 fetcher: Optional['DataFetcher'] = None, clock: Callable[[], float] = time.time,
+                 stale_loader: Optional[StaleLoader] = None):
+        self.config = config
+        self._data_loader = data_loader
+        self._stale_loader = stale_loader
+        self._fetcher = fetcher
+        self._clock = clock
+
+        trading_config = config.get('trading', {})
+        self.hierarchy = trading_config.get('TIMEFRAME_HIERARCHY', {})
+        self.candle_limits = trading_config.get('CANDLE_FETCH_LIMITS', {})
+        self._check_hierarchy()
+
+        self._analyzers: Dict[str, 'FiboAnalyzer'] = {}
+        self._results: Dict[Tuple[str, str], Tuple[int, 'pd.DataFrame', Dict[str, Any]]] = {}
+        self._analyzed_at: Dict[Tuple[str, str], float] = {}
+        self._inflight: Dict[Tuple[str, str, int], asyncio.Future] = {}
+        # (symbol, timeframe) -> (timestamp of the last confirmed bar or None, raw OHLCV window)
+        self._windows: Dict[Tuple[str, str], Tuple[Optional[int], 'pd.DataFrame']] = {}
+
+    def _check_hierarchy(self):
+        """Rejects hierarchies that would make a timeframe its own ancestor."""
+        for timeframe in self.hierarchy:
+            seen = {timeframe}
+            parent = self.hierarchy.get(timeframe)
+            while parent:
+                if parent in seen:
+                    raise ValueError(f"TIMEFRAME_HIERARCHY contains a cycle through '{parent}'.")
+                seen.add(parent)
+                parent = self.hierarchy.get(parent)
+
+    def _get_analyzer(self, timeframe: str) -> 'FiboAnalyzer':
+        analyzer = self._analyzers.get(timeframe)
+        if analyzer is None:
+            from src.data_retrieval.data_fetcher import DataFetcher
+            from src.strategies.fibo_analyzer import FiboAnalyzer
+            if self._fetcher is None:
+                self._fetcher = DataFetcher(self.config)
+            analyzer = FiboAnalyzer(self.config, self._fetcher, timeframe=timeframe)
+            self._analyzers[timeframe] = analyzer
+        return analyzer
+
+    def get_limit(self, timeframe: str) -> int:
+        """Returns the configured candle fetch limit for a timeframe."""
+        return self.candle_limits.get(timeframe, self.candle_limits.get('default', 1000))
+
+    def invalidate(self, symbol: str, timeframe: str):
+        """Drops the memoized result for a series so the next request re-analyzes it."""
+        self._results.pop((normalize_symbol(symbol), timeframe), None)
+
+    async def on_bar_close(self, symbol: str, timeframe: str,
+                           candle: Dict[str, Any]) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        """
+        Re-analyzes a series after its bar `candle` was confirmed.
+
+        The confirmed candle replaces or extends the series' window when it is
+        contiguous with it; otherwise the window is dropped and the series is
+        reloaded through the data loader. Only this series is re-analyzed; its
+        ancestors are resolved through the memo as usual.
+        """
+        key = (normalize_symbol(symbol), timeframe)
+        self._extend_window(key, candle)
+        self._results.pop(key, None)
+        return await self.analyze(key[0], timeframe)
+
+    def _extend_window(self, key: Tuple[str, str], candle: Dict[str, Any]):
+        import pandas as pd
+
+        window = self._windows.pop(key, None)
+        if window is None:
+            return
+        df = window[1]
+        last_ts = int(df['timestamp'].iloc[-1])
+        timestamp = int(candle['timestamp'])
+        if timestamp == last_ts:
+            # The window ended with the in-progress version of this bar.
+            df = df.iloc[:-1]
+        elif timestamp != last_ts + timeframe_to_ms(key[1]):
+            logger.info(f"Confirmed {key[0]} {key[1]} bar {timestamp} is not contiguous with the "
+                        f"analysis window (last {last_ts}); reloading the series.")
+            return
+        row = pd.DataFrame([{column: candle[column] for column in OHLCV_COLUMNS}])
+        df = pd.concat([df, row], ignore_index=True).tail(self.get_limit(key[1])).reset_index(drop=True)
+        self._windows[key] = (timestamp, df)
+
+    async def analyze(self, symbol: str, timeframe: str,
+                      on_stage: Optional[StageCallback] = None) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        """
+        Returns the prepared DataFrame and analysis result for a series, analyzing
+        it (and any missing ancestors) only if the current bar has not been
+        analyzed yet.
+
+        Args:
+            symbol: The trading symbol in any supported format.
+            timeframe: The timeframe to analyze.
+            on_stage: Optional coroutine called before each fetch/analysis step that
+                      actually runs. It is not called for memoized series.
+
+        Raises:
+            InsufficientDataError, APIError, NetworkError: Propagated from the data
+            loader or the analyzer for the series or any of its ancestors.
+        """
+        normalized_symbol = normalize_symbol(symbol)
+        bar_start = current_bar_start(timeframe, self._clock())
+
+        cached = self._results.get((normalized_symbol, timeframe))
+        if cached and cached[0] == bar_start:
+            return cached[1], cached[2]
+
+        inflight_key = (normalized_symbol, timeframe, bar_start)
+        future = self._inflight.get(inflight_key)
+        if future is None:
+            future = asyncio.ensure_future(self._run(normalized_symbol, timeframe, bar_start, on_stage))
+            self._inflight[inflight_key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        # Shield the shared analysis so one cancelled caller does not cancel it for the others.
+        return await asyncio.shield(future)
+
+    async def peek(self, symbol: str, timeframe: str) -> Optional[Tuple['pd.DataFrame', Dict[str, Any], float]]:
+        """
+        Analyzes a series from its expired cached data, if `analyze` would have
+        to refresh it from the exchange.
+
+        The parent trend comes from the parent's last result, whatever its bar,
+        or from the parent's cached data. Nothing is memoized.
+
+        Returns:
+            (df, analysis, age in seconds of the oldest data used), or None if
+            the series is analyzed for the current bar, is fresh in the cache
+            (`analyze` is fast), or has nothing cached to serve.
+        """
+        normalized_symbol = normalize_symbol(symbol)
+        cached = self._results.get((normalized_symbol, timeframe))
+        if self._stale_loader is None or (cached and cached[0] == current_bar_start(timeframe, self._clock())):
+            return None
+        loaded = await self._stale_loader(normalized_symbol, timeframe, self.get_limit(timeframe), True)
+        if loaded is None:
+            return None
+        df, age, _ = loaded
+
+        higher_tf_trend_info = None
+        parent_timeframe = self.hierarchy.get(timeframe)
+        if parent_timeframe:
+            parent = await self._last_known(normalized_symbol, parent_timeframe)
+            if parent is not None:
+                higher_tf_trend_info = {'trend': parent[0].get('trend', 'N/A'), 'timeframe': parent_timeframe}
+                age = max(age, parent[1])
+        analysis_info = self._get_analyzer(timeframe).get_analysis(
+            df, normalized_symbol, timeframe, higher_tf_trend_info=higher_tf_trend_info
+        )
+        return df, analysis_info, age
+
+    async def _last_known(self, symbol: str, timeframe: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The latest analysis of a series without fetching, and its age."""
+        key = (symbol, timeframe)
+        if key in self._results:
+            return self._results[key][2], self._clock() - self._analyzed_at[key]
+        loaded = await self._stale_loader(symbol, timeframe, self.get_limit(timeframe), False)
+        if loaded is None:
+            return None
+        return self._get_analyzer(timeframe).get_analysis(loaded[0], symbol, timeframe), loaded[1]
+
+    async def _run(self, symbol: str, timeframe: str, bar_start: int,
+                   on_stage: Optional[StageCallback]) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        higher_tf_trend_info = None
+        parent_timeframe = self.hierarchy.get(timeframe)
+        if parent_timeframe:
+            _, parent_analysis = await self.analyze(symbol, parent_timeframe, on_stage=on_stage)
+            higher_tf_trend_info = {
+                'trend': parent_analysis.get('trend', 'N/A'),
+                'timeframe': parent_timeframe
+            }
+
+        key = (symbol, timeframe)
+        window = self._windows.get(key)
+        if window is not None and window[0] == bar_start - timeframe_to_ms(timeframe):
+            # The window ends with the bar that just confirmed; no reload needed.
+            df = window[1].copy()
+        else:
+            if on_stage:
+                await on_stage('fetching', symbol, timeframe)
+            with tracing.span('load_data', symbol=symbol, timeframe=timeframe):
+                df = await self._data_loader(symbol, timeframe, self.get_limit(timeframe))
+            self._windows[key] = (None, df[OHLCV_COLUMNS].copy())
+
+        if on_stage:
+            await on_stage('analyzing', symbol, timeframe)
+        with tracing.span('analyze', symbol=symbol, timeframe=timeframe, candles=len(df)):
+            analysis_info = self._get_analyzer(timeframe).get_analysis(
+                df, symbol, timeframe, higher_tf_trend_info=higher_tf_trend_info
+            )
+
+        self._results[(symbol, timeframe)] = (bar_start, df, analysis_info)
+        self._analyzed_at[(symbol, timeframe)] = self._clock()
+        logger.info(f"Analyzed {symbol} on {timeframe} for bar {bar_start}.")
+        return df, analysis_info
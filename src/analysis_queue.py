@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Set
+
+logger = logging.getLogger(__name__)
+
+JobFactory = Callable[[], Awaitable[Any]]
+
+
+class QueueFullError(Exception):
+    """Raised when a user already has the maximum number of pending analysis requests."""
+    def __init__(self, message, user_id=None, pending=None):
+        super().__init__(message)
+        self.user_id = user_id
+        self.pending = pending
+
+
+class AnalysisQueue:
+    """
+    A fair, bounded job queue in front of the interactive analysis.
+
+    - At most `max_concurrent` jobs run at once across all users.
+    - Each user has at most `per_user_inflight` running jobs and at most
+      `per_user_pending` waiting jobs; further submissions are rejected.
+    - Waiting jobs are dispatched round-robin across users, so one chat
+      submitting many requests cannot starve the others.
+    """
+    def __init__(self, max_concurrent: int = 4, per_user_inflight: int = 1, per_user_pending: int = 3):
+        if max_concurrent < 1 or per_user_inflight < 1:
+            raise ValueError("max_concurrent and per_user_inflight must be at least 1.")
+        self.max_concurrent = max_concurrent
+        self.per_user_inflight = per_user_inflight
+        self.per_user_pending = per_user_pending
+
+        # Insertion order of the keys is the round-robin ring.
+        self._pending: "OrderedDict[Hashable, Deque[JobFactory]]" = OrderedDict()
+        self._inflight: Dict[Hashable, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> int:
+        """Number of jobs currently running."""
+        return len(self._tasks)
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs waiting for a slot."""
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def submit(self, user_id: Hashable, job_factory: JobFactory) -> int:
+        """
+        Schedules a job for a user.
+
+        Returns:
+            0 if the job started immediately, otherwise its 1-based position in the queue.
+
+        Raises:
+            QueueFullError: If the user already has `per_user_pending` jobs waiting.
+        """
+        jobs = self._pending.get(user_id)
+        if jobs is not None and len(jobs) >= self.per_user_pending:
+            raise QueueFullError(f"User {user_id} has too many pending analysis requests.",
+                                 user_id=user_id, pending=len(jobs))
+
+        if jobs is None:
+            jobs = self._pending[user_id] = deque()
+        jobs.append(job_factory)
+        self._dispatch()
+        return self.position(job_factory)
+
+    def position(self, job_factory: JobFactory) -> int:
+        """
+        Returns the 1-based dispatch position of a waiting job, or 0 if it is not waiting.
+
+        The position assumes round-robin order: every user's first waiting job,
+        then every user's second waiting job, and so on.
+        """
+        position = 0
+        depth = 0
+        while True:
+            found_any = False
+            for jobs in self._pending.values():
+                if depth < len(jobs):
+                    found_any = True
+                    position += 1
+                    if jobs[depth] is job_factory:
+                        return position
+            if not found_any:
+                return 0
+            depth += 1
+
+    def _next_job(self):
+        """Pops the next job in round-robin order, skipping users at their in-flight limit."""
+        for user_id in list(self._pending):
+            if self._inflight.get(user_id, 0) >= self.per_user_inflight:
+                continue
+            jobs = self._pending[user_id]
+            job_factory = jobs.popleft()
+            if jobs:
+                self._pending.move_to_end(user_id)
+            else:
+                del self._pending[user_id]
+            return user_id, job_factory
+        return None
+
+    def _dispatch(self):
+        while len(self._tasks) < self.max_concurrent:
+            next_job = self._next_job()
+            if next_job is None:
+                return
+            user_id, job_factory = next_job
+            self._inflight[user_id] = self._inflight.get(user_id, 0) + 1
+            task = asyncio.ensure_future(self._run(user_id, job_factory))
+            self._tasks.add(task)
+
+    async def _run(self, user_id: Hashable, job_factory: JobFactory):
+        try:
+            await job_factory()
+        except Exception as e:
+            logger.error(f"Analysis job for user {user_id} failed: {e}", exc_info=True)
+        finally:
+            self._tasks.discard(asyncio.current_task())
+            self._inflight[user_id] -= 1
+            if not self._inflight[user_id]:
+                del self._inflight[user_id]
+            self._dispatch()
+
+    async def join(self):
+        """Waits until every running and waiting job has finished."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
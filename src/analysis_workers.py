@@ -0,0 +1,263 @@
+import asyncio
+import functools
+import itertools
+import logging
+import multiprocessing
+import pickle
+import queue
+import threading
+import zlib
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.analysis_coordinator import AnalysisCoordinator, StageCallback
+from src.config import thaw
+from src.rate_limiter import shared_rate_limiter
+from src.utils.symbol_util import normalize_symbol
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# (config, symbol, timeframe, limit) -> cleaned OHLCV DataFrame. Workers receive
+# it by reference, so it must be a module-level function.
+ConfigDataLoader = Callable[[Dict[str, Any], str, str, int], Awaitable['pd.DataFrame']]
+# (config, symbol, timeframe, limit) -> see StaleLoader; also passed by reference.
+ConfigStaleLoader = Callable[[Dict[str, Any], str, str, int, bool], Awaitable[Optional[Tuple['pd.DataFrame', float, bool]]]]
+
+_STOP = None
+# Seconds between liveness checks of the worker processes.
+_WATCHDOG_INTERVAL = 1.0
+
+
+def shard_for(symbol: str, shards: int) -> int:
+    """Returns the worker that owns a symbol; stable across processes and runs, unlike hash()."""
+    return zlib.crc32(normalize_symbol(symbol).encode()) % shards
+
+
+def _picklable(error: Exception) -> Exception:
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _worker_main(index: int, config: Dict[str, Any], data_loader: ConfigDataLoader,
+                 stale_loader: Optional[ConfigStaleLoader], on_exit: Optional[Callable[[], None]], requests, results):
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    try:
+        asyncio.run(_serve(index, config, data_loader, stale_loader, requests, results))
+    finally:
+        # Worker processes exit without running atexit handlers.
+        if on_exit is not None:
+            on_exit()
+
+
+async def _serve(index: int, config: Dict[str, Any], data_loader: ConfigDataLoader,
+                 stale_loader: Optional[ConfigStaleLoader], requests, results):
+    coordinator = AnalysisCoordinator(config, functools.partial(data_loader, config), stale_loader=(
+        functools.partial(stale_loader, config) if stale_loader is not None else None))
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    logger.info(f"Analysis worker {index} started.")
+    while True:
+        message = await loop.run_in_executor(None, requests.get)
+        if message is _STOP:
+            break
+        request_id, op, symbol, timeframe, payload = message
+        if op == 'invalidate':
+            coordinator.invalidate(symbol, timeframe)
+            continue
+        task = asyncio.create_task(_handle(coordinator, results, request_id, op, symbol, timeframe, payload))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    logger.info(f"Analysis worker {index} stopped.")
+
+
+async def _handle(coordinator: AnalysisCoordinator, results, request_id: int, op: str,
+                  symbol: str, timeframe: str, payload: Any):
+    async def on_stage(stage: str, stage_symbol: str, stage_timeframe: str):
+        results.put((request_id, 'stage', (stage, stage_symbol, stage_timeframe)))
+
+    try:
+        if op == 'bar_close':
+            outcome = await coordinator.on_bar_close(symbol, timeframe, payload)
+        elif op == 'peek':
+            outcome = await coordinator.peek(symbol, timeframe)
+        else:
+            outcome = await coordinator.analyze(symbol, timeframe, on_stage=on_stage if payload else None)
+    except Exception as e:
+        results.put((request_id, 'error', _picklable(e)))
+    else:
+        results.put((request_id, 'done', outcome))
+
+
+class ShardedAnalysisCoordinator:
+    """
+    Runs the analysis on `workers` processes instead of the calling process.
+
+    Every symbol is owned by one worker (`shard_for`), which runs its own
+    AnalysisCoordinator, so all timeframes of a symbol, including the parents
+    used for MTA confirmation, are analyzed and memoized in one place. Requests
+    and results travel over multiprocessing queues; stage callbacks are relayed
+    back to the caller. A worker that dies fails its pending requests and is
+    restarted.
+
+    The exchange rate budget (`exchange.RATE_LIMIT`) is split evenly between
+    the workers and this process.
+
+    Exposes the subset of the AnalysisCoordinator interface the bot uses:
+    `analyze`, `peek`, `on_bar_close` and `invalidate`.
+    """
+    def __init__(self, config: Dict[str, Any], workers: int, data_loader: ConfigDataLoader,
+                 on_worker_exit: Optional[Callable[[], None]] = None, start_method: str = 'spawn',
+                 stale_loader: Optional[ConfigStaleLoader] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        self.config = config
+        self.workers = workers
+        self._data_loader = data_loader
+        self._stale_loader = stale_loader
+        self._on_worker_exit = on_worker_exit
+
+        self._worker_config = thaw(config)
+        exchange_config = self._worker_config.setdefault('exchange', {})
+        rate_share = exchange_config.get('RATE_LIMIT', 10.0) / (workers + 1)
+        exchange_config['RATE_LIMIT'] = rate_share
+        # This process keeps one share, also if it has fetched with the full budget already.
+        shared_rate_limiter('okx-rest', rate_share).set_rate(rate_share)
+
+        self._context = multiprocessing.get_context(start_method)
+        # Per worker: the request queue, the process and the thread reading its results.
+        # A worker that dies can leave its queues locked, so a restart replaces all three.
+        self._requests: List[Any] = [None] * workers
+        self._processes: List[Any] = [None] * workers
+        self._readers: List[Optional[threading.Thread]] = [None] * workers
+        # request id -> (request queue it was sent to, caller's loop, event queue)
+        self._pending: Dict[int, Tuple[Any, asyncio.AbstractEventLoop, asyncio.Queue]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        for index in range(workers):
+            self._start_worker(index)
+
+    def _start_worker(self, index: int):
+        requests, results = self._context.Queue(), self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main, name=f'analysis-worker-{index}', daemon=True,
+            args=(index, self._worker_config, self._data_loader, self._stale_loader, self._on_worker_exit,
+                  requests, results),
+        )
+        process.start()
+        reader = threading.Thread(target=self._read_results, args=(index, process, results),
+                                  name=f'analysis-results-{index}', daemon=True)
+        reader.start()
+        self._requests[index], self._processes[index], self._readers[index] = requests, process, reader
+
+    async def analyze(self, symbol: str, timeframe: str,
+                      on_stage: Optional[StageCallback] = None) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        """See AnalysisCoordinator.analyze; runs on the worker that owns `symbol`."""
+        return await self._request('analyze', symbol, timeframe, on_stage is not None, on_stage)
+
+    async def peek(self, symbol: str, timeframe: str) -> Optional[Tuple['pd.DataFrame', Dict[str, Any], float]]:
+        """See AnalysisCoordinator.peek; runs on the worker that owns `symbol`."""
+        return await self._request('peek', symbol, timeframe, None, None)
+
+    async def on_bar_close(self, symbol: str, timeframe: str,
+                           candle: Dict[str, Any]) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        """See AnalysisCoordinator.on_bar_close; runs on the worker that owns `symbol`."""
+        return await self._request('bar_close', symbol, timeframe, dict(candle), None)
+
+    def invalidate(self, symbol: str, timeframe: str):
+        """Drops the memoized result for a series on its worker."""
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            requests = self._requests[shard_for(symbol, self.workers)]
+        requests.put((None, 'invalidate', symbol, timeframe, None))
+
+    async def _request(self, op: str, symbol: str, timeframe: str, payload: Any,
+                       on_stage: Optional[StageCallback]) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        if self._closed:
+            raise RuntimeError("The analysis workers are shut down.")
+        symbol = normalize_symbol(symbol)
+        request_id = next(self._ids)
+        events: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            requests = self._requests[shard_for(symbol, self.workers)]
+            self._pending[request_id] = (requests, asyncio.get_running_loop(), events)
+        try:
+            requests.put((request_id, op, symbol, timeframe, payload))
+            while True:
+                kind, value = await events.get()
+                if kind == 'stage':
+                    if on_stage:
+                        await on_stage(*value)
+                elif kind == 'error':
+                    raise value
+                else:
+                    return value
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def _deliver(self, request_id: int, kind: str, value: Any):
+        with self._lock:
+            entry = self._pending.get(request_id)
+        if entry is not None:
+            _, loop, events = entry
+            try:
+                loop.call_soon_threadsafe(events.put_nowait, (kind, value))
+            except RuntimeError:
+                pass  # The caller's loop is closed.
+
+    def _fail_pending(self, error: Exception, requests: Any = None):
+        with self._lock:
+            request_ids = [request_id for request_id, entry in self._pending.items()
+                           if requests is None or entry[0] is requests]
+        for request_id in request_ids:
+            self._deliver(request_id, 'error', error)
+
+    def _read_results(self, index: int, process, results):
+        while True:
+            try:
+                message = results.get(timeout=_WATCHDOG_INTERVAL)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                break
+            except (EOFError, OSError):
+                break
+            except Exception:
+                logger.exception("Could not read an analysis result.")
+                continue
+            self._deliver(*message)
+
+        with self._lock:
+            if self._closed:
+                return
+            logger.error(f"Analysis worker {index} exited with code {process.exitcode}; restarting it.")
+            dead_requests = self._requests[index]
+            # Requests registered from here on go to the new worker.
+            self._start_worker(index)
+        self._fail_pending(RuntimeError(f"Analysis worker {index} exited unexpectedly."), dead_requests)
+
+    def close(self, timeout: float = 10.0):
+        """Lets the workers finish their requests, then stops them."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for requests in self._requests:
+            requests.put(_STOP)
+        for index, process in enumerate(self._processes):
+            process.join(timeout)
+            if process.is_alive():
+                logger.error(f"Analysis worker {index} did not stop within {timeout}s; terminating it.")
+                process.terminate()
+                process.join()
+        # Readers exit once their worker is gone and its results are drained.
+        for reader in self._readers:
+            reader.join(timeout + _WATCHDOG_INTERVAL)
+        self._fail_pending(RuntimeError("The analysis workers are shut down."))
@@ -0,0 +1,72 @@
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict
+
+from src.data_retrieval.exceptions import APIError, NetworkError
+from src.database import DatabaseManager
+from src.utils.timeframe_util import timeframe_to_ms
+
+if TYPE_CHECKING:
+    from src.data_retrieval.data_fetcher import DataFetcher
+
+logger = logging.getLogger(__name__)
+
+
+class GapBackfiller:
+    """
+    Fills holes in cached series by fetching only the missing ranges.
+
+    Each run refreshes the gap index over the whole store (one scan, see
+    DatabaseManager.find_gaps) and then works through the open gaps, least
+    attempted and newest first. A gap that is still open after a fetch counts
+    an attempt; after `max_attempts` it is left alone, since the exchange
+    itself has no candles there (e.g. an exchange outage). Very long gaps are
+    filled newest part first, `max_bars_per_gap` bars per run.
+    """
+    def __init__(self, db: DatabaseManager, fetcher: 'DataFetcher', max_attempts: int = 3,
+                 max_gaps: int = 20, max_bars_per_gap: int = 10_000):
+        self.db = db
+        self.fetcher = fetcher
+        self.max_attempts = max_attempts
+        self.max_gaps = max_gaps
+        self.max_bars_per_gap = max_bars_per_gap
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Returns:
+            A report dict: {'open', 'attempted', 'filled', 'inserted', 'failed'}.
+        """
+        started = time.perf_counter()
+        open_gaps = self.db.refresh_gap_index()
+        report = {'open': len(open_gaps), 'attempted': 0, 'filled': 0, 'inserted': 0, 'failed': 0}
+
+        for gap in self.db.get_gaps(max_attempts=self.max_attempts, limit=self.max_gaps):
+            symbol, timeframe, start_ts, end_ts = gap['symbol'], gap['timeframe'], gap['start_ts'], gap['end_ts']
+            start_ts = max(start_ts, end_ts - self.max_bars_per_gap * timeframe_to_ms(timeframe))
+            report['attempted'] += 1
+            try:
+                candles = self.fetcher.fetch_range(symbol, timeframe, start_ts, end_ts)['data']
+            except (APIError, NetworkError) as e:
+                logger.warning(f"Backfill of {symbol}-{timeframe} [{start_ts}, {end_ts}) failed: {e}")
+                self.db.record_gap_attempt(symbol, timeframe, gap['start_ts'])
+                report['failed'] += 1
+                continue
+
+            if candles:
+                report['inserted'] += self.db.bulk_insert_candles(symbol, timeframe, [(
+                    [int(c['timestamp']) for c in candles],
+                    *([float(c[column]) for c in candles] for column in ('open', 'high', 'low', 'close', 'volume')),
+                )])
+            remaining = self.db.refresh_gap_index(symbol, timeframe)
+            still_open = next((g for g in remaining if g[2] == gap['start_ts']), None)
+            if still_open is None:
+                report['filled'] += 1
+            elif still_open[3] >= end_ts:
+                # Nothing arrived for this range; only a lack of progress counts as an attempt.
+                self.db.record_gap_attempt(symbol, timeframe, gap['start_ts'])
+
+        logger.info(
+            f"Gap backfill took {time.perf_counter() - started:.2f}s: {report['open']} open gaps, "
+            f"{report['filled']}/{report['attempted']} filled, {report['inserted']} candles inserted."
+        )
+        return report
@@ -0,0 +1,303 @@
+"""
+Benchmarks for the analysis hot path: indicators, candlestick patterns, swing
+search, the full FiboAnalyzer analysis, validation, report formatting and
+chart rendering.
+
+Each stage runs over the snapshot series under data/ and over seeded
+synthetic random walks (1k to 1M bars by default). Per stage and series it
+records the median and best wall time of a few runs, and the peak memory of
+one run traced with tracemalloc (numpy buffers included). Timing runs are
+separate from the traced run, since tracemalloc slows allocation-heavy code.
+
+Results are compared with a saved baseline JSON; a stage regresses when its
+best time or its peak memory exceeds the baseline by more than the
+tolerance. The best time is compared rather than the median because it is
+the least disturbed by other load on the machine.
+Baselines are machine specific: save one per machine. Run with
+`python run_benchmarks.py`.
+"""
+import gc
+import logging
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_BASELINE = 'data/benchmark_baseline.json'
+
+# Fast stages are called repeatedly until one timing sample lasts this long.
+SAMPLE_SECONDS = 0.01
+MAX_CALLS_PER_SAMPLE = 10_000
+
+# Differences below these floors are noise, whatever the ratio.
+MIN_TIME_DELTA = 0.00005
+MIN_MEMORY_DELTA = 64 * 1024
+
+
+class BenchmarkSeries:
+    """
+    One candle series and the inputs derived from it, built on first use
+    outside the timed runs.
+    """
+    def __init__(self, name: str, symbol: str, timeframe: str, candles: List[Dict[str, Any]], config: Dict[str, Any]):
+        self.name = name
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.candles = candles
+        self.config = config
+        self._frame = None
+        self._analyzer = None
+        self._prepared = None
+        self._analysis: Optional[Tuple[Any, Dict[str, Any]]] = None
+
+    @property
+    def bars(self) -> int:
+        return len(self.candles)
+
+    @property
+    def frame(self) -> 'pd.DataFrame':
+        """The validated OHLCV DataFrame."""
+        if self._frame is None:
+            from src.validators import DataValidator
+            self._frame = DataValidator.validate_and_clean_dataframe(self.candles)
+        return self._frame
+
+    @property
+    def analyzer(self) -> 'FiboAnalyzer':
+        if self._analyzer is None:
+            from src.strategies.fibo_analyzer import FiboAnalyzer
+            self._analyzer = FiboAnalyzer(self.config, fetcher=None, timeframe=self.timeframe)
+        return self._analyzer
+
+    @property
+    def prepared(self) -> 'pd.DataFrame':
+        """The frame with the analyzer's indicator columns, as the swing search sees it."""
+        if self._prepared is None:
+            data = self.analyzer._prepare_data(self.frame.copy())
+            data.dropna(subset=['sma_slow'], inplace=True)
+            self._prepared = data.reset_index(drop=True)
+        return self._prepared
+
+    @property
+    def analysis(self) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        """(frame, analysis) as the bot passes them to the formatter and the chart."""
+        if self._analysis is None:
+            frame = self.frame.copy()
+            self._analysis = (frame, self.analyzer.get_analysis(frame, self.symbol, self.timeframe))
+        return self._analysis
+
+
+def synthetic_candles(bars: int, seed: int = 0, start: int = 1_700_000_000_000,
+                      interval_ms: int = 60_000) -> List[Dict[str, Any]]:
+    """A reproducible geometric random walk as a list of candle dicts."""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.002, bars)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0.0, 0.001, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0.0, 0.001, bars)))
+    volume = rng.lognormal(3.0, 1.0, bars)
+    timestamps = start + interval_ms * np.arange(bars, dtype=np.int64)
+    return [
+        {'timestamp': ts, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+        for ts, o, h, l, c, v in zip(timestamps.tolist(), open_.tolist(), high.tolist(), low.tolist(),
+                                     close.tolist(), volume.tolist())
+    ]
+
+
+def synthetic_series(sizes: Sequence[int], config: Dict[str, Any], seed: int = 0) -> List[BenchmarkSeries]:
+    return [BenchmarkSeries(f'synthetic-{bars}', 'SYN-USDT', '1m', synthetic_candles(bars, seed), config)
+            for bars in sizes]
+
+
+def cached_series(root: str, config: Dict[str, Any], symbols: Optional[Sequence[str]] = None) -> List[BenchmarkSeries]:
+    """The snapshot series under `root` (<SYMBOL>/<term>/<timeframe>.json)."""
+    from src.data_import import discover_snapshot_files, iter_json_candles
+
+    series = []
+    for symbol, timeframe, path in discover_snapshot_files(root):
+        if symbols and symbol not in symbols:
+            continue
+        try:
+            candles = list(iter_json_candles(path))
+        except ValueError as e:
+            logger.warning(f"Skipping {path}: {e}")
+            continue
+        if candles:
+            series.append(BenchmarkSeries(f'{symbol}:{timeframe}', symbol, timeframe, candles, config))
+    return series
+
+
+class Stage:
+    """
+    A benchmarked call. `prepare(series)` returns the call's arguments and runs
+    untimed before every run, e.g. to copy a frame the call mutates.
+    """
+    def __init__(self, name: str, func: Callable, prepare: Callable[[BenchmarkSeries], tuple],
+                 max_bars: Optional[int] = None):
+        self.name = name
+        self.func = func
+        self.prepare = prepare
+        self.max_bars = max_bars
+
+
+def default_stages() -> List[Stage]:
+    from src.strategies.fibo_analyzer import FiboAnalyzer
+    from src.utils import indicators
+    from src.utils.chart_generator import generate_analysis_chart
+    from src.utils.formatter import format_analysis_from_template
+    from src.utils.patterns import get_candlestick_pattern
+    from src.validators import DataValidator
+
+    def frame(series):
+        return (series.frame,)
+
+    def swing_range(series):
+        closes = series.frame['close']
+        return float(closes.max()), float(closes.min())
+
+    return [
+        Stage('validate_and_clean_dataframe', DataValidator.validate_and_clean_dataframe,
+              lambda series: (series.candles,)),
+        Stage('calculate_sma', indicators.calculate_sma, lambda series: (series.frame, 50)),
+        Stage('calculate_rsi', indicators.calculate_rsi, frame),
+        Stage('calculate_macd', indicators.calculate_macd, frame),
+        Stage('calculate_bollinger_bands', indicators.calculate_bollinger_bands, frame),
+        Stage('calculate_atr', indicators.calculate_atr, frame),
+        Stage('calculate_stochastic', indicators.calculate_stochastic, frame),
+        Stage('calculate_obv', indicators.calculate_obv, frame),
+        Stage('calculate_adx', indicators.calculate_adx, frame),
+        Stage('detect_trend_line_break', indicators.detect_trend_line_break, frame),
+        Stage('calculate_fib_levels', indicators.calculate_fib_levels, swing_range),
+        Stage('calculate_fib_extensions', indicators.calculate_fib_extensions, swing_range),
+        Stage('get_candlestick_pattern', get_candlestick_pattern, frame),
+        Stage('find_recent_swing_points', FiboAnalyzer._find_recent_swing_points,
+              lambda series: (series.analyzer, series.prepared)),
+        Stage('get_analysis', FiboAnalyzer.get_analysis,
+              lambda series: (series.analyzer, series.frame.copy(), series.symbol, series.timeframe)),
+        Stage('format_analysis_from_template', format_analysis_from_template,
+              lambda series: (series.analysis[1], series.symbol, series.timeframe)),
+        # The bot charts a fetch window of a few hundred bars; plotting a huge series measures matplotlib only.
+        Stage('generate_analysis_chart', generate_analysis_chart,
+              lambda series: (series.analysis[0], series.analysis[1], series.symbol), max_bars=10_000),
+    ]
+
+
+def _time_calls(stage: Stage, series: BenchmarkSeries, number: int) -> float:
+    """Seconds per call over `number` calls, each with freshly prepared arguments."""
+    calls = [stage.prepare(series) for _ in range(number)]
+    gc.collect()
+    started = time.perf_counter()
+    for args in calls:
+        stage.func(*args)
+    return (time.perf_counter() - started) / number
+
+
+def measure(stage: Stage, series: BenchmarkSeries, repeat: int = 5, budget: float = 2.0) -> Dict[str, Any]:
+    """
+    Runs `stage` once under tracemalloc (which also warms it up), then takes
+    up to `repeat` timing samples, stopping early once `budget` seconds are
+    spent. Like timeit, fast stages are called enough times per sample for
+    the sample to last about SAMPLE_SECONDS.
+    """
+    args = stage.prepare(series)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage.func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    first = _time_calls(stage, series, 1)
+    number = max(1, min(MAX_CALLS_PER_SAMPLE, int(SAMPLE_SECONDS / max(first, 1e-7))))
+    timings = [first] if number == 1 else []
+    spent = first
+    while len(timings) < repeat and (not timings or spent < budget):
+        timings.append(_time_calls(stage, series, number))
+        spent += timings[-1] * number
+    return {
+        'stage': stage.name, 'series': series.name, 'bars': series.bars, 'runs': len(timings), 'number': number,
+        'median': statistics.median(timings), 'min': min(timings), 'peak_bytes': peak,
+    }
+
+
+def run_suite(series: Sequence[BenchmarkSeries], stages: Sequence[Stage], repeat: int = 5, budget: float = 2.0,
+              on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Measures every stage on every series; failed stages are reported, not raised."""
+    results = {}
+    for item in series:
+        for stage in stages:
+            if stage.max_bars is not None and item.bars > stage.max_bars:
+                continue
+            try:
+                result = measure(stage, item, repeat, budget)
+            except Exception as e:
+                logger.warning(f"Benchmark {stage.name} on {item.name} failed: {e}")
+                result = {'stage': stage.name, 'series': item.name, 'bars': item.bars,
+                          'error': f"{type(e).__name__}: {e}"}
+            results[f'{stage.name}@{item.name}'] = result
+            if on_result:
+                on_result(result)
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'machine': f'{platform.machine()} {platform.processor() or platform.platform()}',
+        'python': platform.python_version(),
+        'results': results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25) -> List[Dict[str, Any]]:
+    """
+    Returns the stages whose best time or peak memory exceeds the baseline
+    by more than `tolerance` (0.25 = 25%) and by more than the noise floors.
+    """
+    regressions = []
+    for key, result in report['results'].items():
+        old = baseline.get('results', {}).get(key)
+        if old is None or 'error' in old or 'error' in result:
+            continue
+        for metric, floor in (('min', MIN_TIME_DELTA), ('peak_bytes', MIN_MEMORY_DELTA)):
+            before, after = old[metric], result[metric]
+            if after > before * (1 + tolerance) and after - before > floor:
+                regressions.append({'key': key, 'metric': metric, 'baseline': before, 'current': after,
+                                    'ratio': after / before if before else float('inf')})
+    return regressions
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f}µs'
+    if seconds < 1:
+        return f'{seconds * 1e3:.2f}ms'
+    return f'{seconds:.2f}s'
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+        size /= 1024
+    return f'{size:.1f}GiB'
+
+
+def format_result(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """One table row; with a baseline, the change of the best time."""
+    label = f"{result['stage']:<30} {result['series']:<20} {result['bars']:>9}"
+    if 'error' in result:
+        return f"{label}  ! {result['error']}"
+    row = (f"{label} {format_duration(result['median']):>10} {format_duration(result['min']):>10} "
+           f"{format_bytes(result['peak_bytes']):>10}")
+    old = (baseline or {}).get('results', {}).get(f"{result['stage']}@{result['series']}")
+    if old and 'error' not in old and old['min']:
+        row += f" {(result['min'] / old['min'] - 1) * 100:>+7.1f}%"
+    return row
+
+
+TABLE_HEADER = f"{'STAGE':<30} {'SERIES':<20} {'BARS':>9} {'MEDIAN':>10} {'BEST':>10} {'PEAK MEM':>10}"
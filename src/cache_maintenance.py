@@ -0,0 +1,125 @@
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from src.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class RetentionPolicy:
+    """
+    How much history to keep per timeframe.
+
+    `bars` and `days` map a timeframe (or 'default') to the number of newest
+    bars / days of history to keep; 0 or a missing entry means no limit.
+    When both apply to a timeframe, the tighter one wins.
+    """
+    def __init__(self, bars: Optional[Mapping[str, int]] = None, days: Optional[Mapping[str, int]] = None):
+        self.bars = dict(bars or {})
+        self.days = dict(days or {})
+
+    @staticmethod
+    def _lookup(limits: Dict[str, int], timeframe: str) -> Optional[int]:
+        value = limits.get(timeframe, limits.get('default', 0))
+        return value if value and value > 0 else None
+
+    def keep_bars(self, timeframe: str) -> Optional[int]:
+        return self._lookup(self.bars, timeframe)
+
+    def keep_days(self, timeframe: str) -> Optional[int]:
+        return self._lookup(self.days, timeframe)
+
+
+def apply_retention(db: DatabaseManager, policy: RetentionPolicy, now_ms: Optional[int] = None) -> int:
+    """
+    Trims every series to the policy, one short transaction per series.
+
+    Returns:
+        The number of candles deleted.
+    """
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    deleted = 0
+    for series in db.list_series():
+        symbol, timeframe = series['symbol'], series['timeframe']
+        cutoffs = []
+        keep_bars = policy.keep_bars(timeframe)
+        if keep_bars and series['count'] > keep_bars:
+            cutoffs.append(db.nth_latest_timestamp(symbol, timeframe, keep_bars))
+        keep_days = policy.keep_days(timeframe)
+        if keep_days:
+            cutoffs.append(now_ms - keep_days * DAY_MS)
+        cutoffs = [cutoff for cutoff in cutoffs if cutoff is not None]
+        if cutoffs:
+            deleted += db.delete_candles_before(symbol, timeframe, max(cutoffs))
+    return deleted
+
+
+def used_bytes(db: DatabaseManager) -> int:
+    """Bytes of the file holding live data (excludes free pages)."""
+    stats = db.page_stats()
+    return (stats['page_count'] - stats['freelist_count']) * stats['page_size']
+
+
+def evict_to_budget(db: DatabaseManager, max_bytes: int) -> List[Tuple[str, str]]:
+    """
+    Drops the least recently used series until the live data fits in `max_bytes`.
+
+    Series are ranked by last read (falling back to last write; series without
+    metadata go first). The size each one frees is estimated from its share of
+    the candles, so no page-level statistics are needed.
+
+    Returns:
+        The (symbol, timeframe) pairs that were evicted.
+    """
+    excess = used_bytes(db) - max_bytes
+    if max_bytes <= 0 or excess <= 0:
+        return []
+    series = db.list_series()
+    total_candles = sum(s['count'] for s in series)
+    if not total_candles:
+        return []
+    bytes_per_candle = used_bytes(db) / total_candles
+
+    series.sort(key=lambda s: str(s['last_accessed'] or s['last_updated'] or ''))
+    evicted = []
+    for entry in series:
+        if excess <= 0:
+            break
+        db.drop_series(entry['symbol'], entry['timeframe'])
+        evicted.append((entry['symbol'], entry['timeframe']))
+        excess -= entry['count'] * bytes_per_candle
+    if evicted:
+        logger.info(f"Evicted {len(evicted)} cold series to stay under {max_bytes} bytes: {evicted}")
+    return evicted
+
+
+def maintain_cache(db: DatabaseManager, policy: RetentionPolicy, max_bytes: int = 0,
+                   accessed: Optional[Dict[Tuple[str, str], Any]] = None) -> Dict[str, Any]:
+    """
+    Runs one maintenance pass: record reads, apply retention, evict to the size
+    budget and compact (DatabaseManager.compact).
+
+    Returns:
+        A report dict: {'deleted', 'evicted', 'released_pages', 'size_bytes'}.
+    """
+    started = time.perf_counter()
+    db.touch_series(accessed or {})
+    deleted = apply_retention(db, policy)
+    evicted = evict_to_budget(db, max_bytes)
+    released = db.compact()
+    stats = db.page_stats()
+    report = {
+        'deleted': deleted,
+        'evicted': evicted,
+        'released_pages': released,
+        'size_bytes': stats['page_count'] * stats['page_size'],
+    }
+    logger.info(
+        f"Cache maintenance on {db.db_path} took {time.perf_counter() - started:.2f}s: "
+        f"{deleted} candles trimmed, {len(evicted)} series evicted, {released} pages released, "
+        f"{report['size_bytes'] / 1e6:.1f} MB on disk."
+    )
+    return report
@@ -1,34 +1,85 @@
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple
 
 from src.utils.symbol_util import normalize_symbol
-from src.database import DatabaseManager
+from src.backfill import GapBackfiller
+from src.cache_maintenance import RetentionPolicy, maintain_cache
+from src.database import create_database_manager
+from src.metrics import CACHE_LOOKUPS, STAGE_SECONDS
+from src.utils.timeframe_util import timeframe_to_ms
+from src.write_behind import CandleWriter
+
+if TYPE_CHECKING:
+    from src.data_retrieval.data_fetcher import DataFetcher
 
 logger = logging.getLogger(__name__)
 
+_READ_TIMER = STAGE_SECONDS.labels(stage='cache_read')
+_WRITE_TIMER = STAGE_SECONDS.labels(stage='cache_write')
+
+def _find_gaps(candles: List[Dict[str, Any]], timeframe: str) -> List[Tuple[int, int]]:
+    """(start_ts, end_ts) of each run of bars missing between consecutive candles (see DatabaseManager.find_gaps)."""
+    try:
+        step = timeframe_to_ms(timeframe)
+    except ValueError:
+        return []
+    timestamps = [c['timestamp'] for c in candles]
+    return [(earlier + step, later) for earlier, later in zip(timestamps, timestamps[1:]) if later - earlier > step]
+
 class CacheManager:
     """
     Manages reading and writing data by interfacing with the DatabaseManager.
     This class handles the logic of when to fetch from cache vs. when it's a miss.
+    `storage` selects the candle storage engine (see create_database_manager).
+    With `write_behind`, `set` hands writes to a background CandleWriter and
+    returns immediately; `get` still sees them, since it waits for pending
+    writes of the series it reads, for up to `write_wait_timeout` seconds
+    (after that it reads what has been committed).
+
+    A window with missing bars is a miss while a refetch may still fill them.
+    `set` counts every hole that a fetch brings back in the gap index; after
+    `max_gap_attempts` (shared with GapBackfiller) the hole is taken to be on
+    the exchange itself and the window is served with it.
     """
-    def __init__(self, db_path: str = 'data/cache.db', default_ttl_hours: int = 24):
-        self.db = DatabaseManager(db_path)
+    def __init__(self, db_path: str = 'data/cache.db', default_ttl_hours: int = 24, storage: str = 'rows',
+                 write_behind: bool = False, max_gap_attempts: int = 3, write_wait_timeout: float = 5.0):
+        self.db = create_database_manager(db_path, storage)
+        self.storage = storage
         self.default_ttl_hours = default_ttl_hours
+        self.max_gap_attempts = max_gap_attempts
+        self.write_wait_timeout = write_wait_timeout
+        # Reads since the last maintenance pass; persisted there for LRU eviction.
+        self._accessed: Dict[Tuple[str, str], datetime] = {}
+        self.writer: Optional[CandleWriter] = None
+        if write_behind:
+            self.writer = CandleWriter(create_database_manager(db_path, storage))
 
-    def get(self, symbol: str, timeframe: str) -> Optional[List[Dict[str, Any]]]:
+    def get(self, symbol: str, timeframe: str, limit: int = 1000,
+            start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
         """
         Retrieves fresh, valid data from the database cache.
 
+        Only the requested rows are read: the last `limit` candles, or a time range
+        with the semantics of DatabaseManager.get_candles.
+
         Returns:
             A list of candle data if fresh and valid data is found, otherwise None.
         """
         normalized_symbol = normalize_symbol(symbol)
+        self._wait_for_writes(normalized_symbol, timeframe)
 
+        with _READ_TIMER.time():
+            candles, result = self._lookup(normalized_symbol, timeframe, limit, start_ts, end_ts)
+        CACHE_LOOKUPS.labels(result=result).inc()
+        return candles
+
+    def _lookup(self, normalized_symbol: str, timeframe: str, limit: int, start_ts: Optional[int],
+                end_ts: Optional[int]) -> Tuple[Optional[List[Dict[str, Any]]], str]:
         metadata = self.db.get_cache_metadata(normalized_symbol, timeframe)
         if not metadata:
             logger.info(f"Cache miss (no metadata) for {normalized_symbol}-{timeframe}")
-            return None
+            return None, 'miss'
 
         # Check TTL
         last_updated_str = metadata["last_updated"]
@@ -39,15 +90,64 @@ class CacheManager:
 
         if datetime.utcnow() > last_updated + timedelta(hours=ttl_hours):
             logger.info(f"Cache expired for {normalized_symbol}-{timeframe}. Last updated: {last_updated}")
-            return None
+            return None, 'expired'
 
-        candles = self.db.get_candles(normalized_symbol, timeframe)
+        candles = self.db.get_candles(normalized_symbol, timeframe, limit, start_ts, end_ts)
         if not candles:
             logger.warning(f"Cache miss (no candles) for {normalized_symbol}-{timeframe} despite fresh metadata.")
-            return None
+            return None, 'miss'
+        if self._has_fillable_gaps(normalized_symbol, timeframe, candles):
+            logger.warning(f"Cache miss (missing candles) for {normalized_symbol}-{timeframe}; refetching.")
+            return None, 'gap'
 
         logger.info(f"Cache hit for {normalized_symbol}-{timeframe}")
-        return candles
+        self._accessed[(normalized_symbol, timeframe)] = datetime.utcnow()
+        return candles, 'hit'
+
+    def _wait_for_writes(self, normalized_symbol: str, timeframe: str):
+        if self.writer and not self.writer.wait_for(normalized_symbol, timeframe, self.write_wait_timeout):
+            logger.warning(f"Queued writes for {normalized_symbol}-{timeframe} not applied within "
+                           f"{self.write_wait_timeout}s; reading the committed data.")
+
+    def _has_fillable_gaps(self, normalized_symbol: str, timeframe: str, candles: List[Dict[str, Any]]) -> bool:
+        """True if the candles miss bars that have not yet stayed empty for max_gap_attempts fetches."""
+        gaps = _find_gaps(candles, timeframe)
+        if not gaps:
+            return False
+        attempts = {gap['start_ts']: gap['attempts']
+                    for gap in self.db.get_gaps(symbol=normalized_symbol, timeframe=timeframe)}
+        return any(attempts.get(start_ts, 0) < self.max_gap_attempts for start_ts, _ in gaps)
+
+    def get_stale(self, symbol: str, timeframe: str, limit: int = 1000, max_age: Optional[float] = None,
+                  expired_only: bool = False) -> Optional[Tuple[List[Dict[str, Any]], float, bool]]:
+        """
+        Retrieves the cached candles of a series whether or not its TTL has
+        lapsed, for serving while a refresh runs.
+
+        The candles are only read if the metadata allows serving them: the
+        series is at most `max_age` seconds old and, with `expired_only`, its
+        TTL has lapsed.
+
+        Returns:
+            (candles, age in seconds since the series was last fetched, whether
+            the TTL has lapsed), or None if nothing usable is cached.
+        """
+        normalized_symbol = normalize_symbol(symbol)
+        self._wait_for_writes(normalized_symbol, timeframe)
+
+        metadata = self.db.get_cache_metadata(normalized_symbol, timeframe)
+        if not metadata:
+            return None
+        last_updated = datetime.fromisoformat(metadata["last_updated"])
+        age = (datetime.utcnow() - last_updated).total_seconds()
+        expired = age > metadata["ttl_hours"] * 3600
+        if (max_age is not None and age > max_age) or (expired_only and not expired):
+            return None
+        candles = self.db.get_candles(normalized_symbol, timeframe, limit)
+        if not candles or self._has_fillable_gaps(normalized_symbol, timeframe, candles):
+            return None
+        self._accessed[(normalized_symbol, timeframe)] = datetime.utcnow()
+        return candles, age, expired
 
     def set(self, symbol: str, timeframe: str, data: List[Dict[str, Any]]):
         """
@@ -58,5 +158,59 @@ class CacheManager:
             return
 
         normalized_symbol = normalize_symbol(symbol)
-        self.db.save_candles(normalized_symbol, timeframe, data, self.default_ttl_hours)
-        logger.info(f"Successfully saved data to DB cache for {normalized_symbol}-{timeframe}")
\ No newline at end of file
+        # The exchange sent these holes again: one more attempt each (see _has_fillable_gaps).
+        gaps = _find_gaps(data, timeframe)
+        if gaps:
+            logger.warning(f"Fetched data for {normalized_symbol}-{timeframe} is missing bars in {len(gaps)} ranges.")
+        if self.writer:
+            self.writer.submit(normalized_symbol, timeframe, data, self.default_ttl_hours, gaps)
+            logger.info(f"Queued data for DB cache write for {normalized_symbol}-{timeframe}")
+            return
+        with _WRITE_TIMER.time():
+            self.db.save_candles(normalized_symbol, timeframe, data, self.default_ttl_hours)
+            if gaps:
+                self.db.record_refetched_gaps(normalized_symbol, timeframe, gaps)
+        logger.info(f"Successfully saved data to DB cache for {normalized_symbol}-{timeframe}")
+
+    def append_live(self, symbol: str, timeframe: str, candles: List[Dict[str, Any]]):
+        """
+        Stores confirmed bars from the live stream.
+
+        They extend the freshness of a series that is already cached, but never
+        make a series count as cached on their own: a window that is not
+        contiguous with the stored history is caught by the gap check in `get`.
+        """
+        normalized_symbol = normalize_symbol(symbol)
+        if self.writer:
+            self.writer.submit(normalized_symbol, timeframe, candles, ttl_hours=None)
+        else:
+            self.db.save_candles_many([(normalized_symbol, timeframe, candles, None, datetime.utcnow())])
+
+    def maintain(self, policy: RetentionPolicy, max_bytes: int = 0) -> Dict[str, Any]:
+        """
+        Runs retention, LRU eviction and compaction (see cache_maintenance.maintain_cache)
+        on a separate connection, so it can run off the request path while reads continue.
+        """
+        accessed, self._accessed = self._accessed, {}
+        db = create_database_manager(self.db.db_path, self.storage)
+        try:
+            return maintain_cache(db, policy, max_bytes, accessed)
+        finally:
+            db.close()
+
+    def backfill_gaps(self, fetcher: 'DataFetcher', **options) -> Dict[str, Any]:
+        """
+        Fetches the missing ranges of cached series (see backfill.GapBackfiller)
+        on a separate connection.
+        """
+        db = create_database_manager(self.db.db_path, self.storage)
+        try:
+            return GapBackfiller(db, fetcher, **options).run()
+        finally:
+            db.close()
+
+    def close(self):
+        """Flushes pending writes and closes the database connections."""
+        if self.writer:
+            self.writer.close()
+        self.db.close()
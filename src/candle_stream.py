@@ -0,0 +1,221 @@
+import asyncio
+import inspect
+import json
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake, InvalidURI
+
+from src.utils.symbol_util import normalize_symbol
+
+logger = logging.getLogger(__name__)
+
+# Candle channels are served on the "business" endpoint of the V5 WebSocket API.
+OKX_WS_URL = 'wss://ws.okx.com:8443/ws/v5/business'
+OKX_DEMO_WS_URL = 'wss://wspap.okx.com:8443/ws/v5/business'
+
+# OKX closes connections that are idle for 30 seconds.
+PING_INTERVAL = 20.0
+# Subscription args per request; requests are limited to 64 KB.
+SUBSCRIBE_BATCH = 100
+
+CandleListener = Callable[[str, str, Dict[str, Any]], Union[None, Awaitable[None]]]
+Series = Tuple[str, str]
+
+
+def api_timeframe(timeframe: str) -> str:
+    """OKX channel timeframes use uppercase units for hours and days ('1H', '1D')."""
+    if timeframe[-1] in 'hd':
+        return timeframe[:-1] + timeframe[-1].upper()
+    return timeframe
+
+
+def parse_candle(row: List[str]) -> Dict[str, Any]:
+    """Converts an OKX candle row into a candle dict, keeping the `confirm` flag."""
+    return {
+        'timestamp': int(row[0]),
+        'open': float(row[1]),
+        'high': float(row[2]),
+        'low': float(row[3]),
+        'close': float(row[4]),
+        'volume': float(row[5]),
+        'confirm': row[8] == '1' if len(row) > 8 else False,
+    }
+
+
+class CandleStream:
+    """
+    Streams candles for a set of series from the OKX WebSocket API.
+
+    - The in-progress bar of every series is kept in memory (`current_bar`).
+    - Each bar the exchange marks as confirmed is passed once to every
+      listener as (symbol, timeframe, candle). Listeners may be coroutines.
+    - On any disconnect the stream reconnects with exponential backoff and
+      jitter and resubscribes every series. A connection that stays silent
+      for two ping intervals is treated as dead.
+
+    `subscribe` and `unsubscribe` may be called while the stream is running.
+    """
+    def __init__(self, series: Iterable[Series] = (), url: str = OKX_WS_URL,
+                 ping_interval: float = PING_INTERVAL, reconnect_delay: float = 1.0,
+                 max_reconnect_delay: float = 30.0):
+        self.url = url
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._series: Set[Series] = set()
+        self._by_channel: Dict[Tuple[str, str], Series] = {}
+        self._current: Dict[Series, Dict[str, Any]] = {}
+        self._last_confirmed: Dict[Series, int] = {}
+        self._listeners: List[CandleListener] = []
+        self._websocket = None
+        self._stopped = asyncio.Event()
+        self.connections = 0
+        for symbol, timeframe in series:
+            self._add((normalize_symbol(symbol), timeframe))
+
+    @staticmethod
+    def _arg(series: Series) -> Dict[str, str]:
+        return {'channel': f'candle{api_timeframe(series[1])}', 'instId': series[0]}
+
+    def _add(self, key: Series):
+        self._series.add(key)
+        arg = self._arg(key)
+        self._by_channel[(arg['channel'], arg['instId'])] = key
+
+    @property
+    def series(self) -> Set[Series]:
+        return set(self._series)
+
+    @property
+    def connected(self) -> bool:
+        return self._websocket is not None
+
+    def add_listener(self, listener: CandleListener):
+        """Registers a callback for confirmed bars."""
+        self._listeners.append(listener)
+
+    def current_bar(self, symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """Returns the latest update of a series' newest bar, or None before the first update."""
+        return self._current.get((normalize_symbol(symbol), timeframe))
+
+    async def subscribe(self, symbol: str, timeframe: str):
+        key = (normalize_symbol(symbol), timeframe)
+        if key in self._series:
+            return
+        self._add(key)
+        await self._send_op('subscribe', [key])
+
+    async def unsubscribe(self, symbol: str, timeframe: str):
+        key = (normalize_symbol(symbol), timeframe)
+        if key not in self._series:
+            return
+        self._series.discard(key)
+        arg = self._arg(key)
+        self._by_channel.pop((arg['channel'], arg['instId']), None)
+        self._current.pop(key, None)
+        await self._send_op('unsubscribe', [key])
+
+    async def _send_op(self, op: str, series: List[Series]):
+        websocket = self._websocket
+        if websocket is None or not series:
+            return  # Sent on the next (re)connect.
+        for offset in range(0, len(series), SUBSCRIBE_BATCH):
+            args = [self._arg(key) for key in series[offset:offset + SUBSCRIBE_BATCH]]
+            try:
+                await websocket.send(json.dumps({'op': op, 'args': args}))
+            except ConnectionClosed:
+                return
+
+    def stop(self):
+        """Stops `run` after the current message; the socket is closed."""
+        self._stopped.set()
+        if self._websocket is not None:
+            asyncio.ensure_future(self._websocket.close())
+
+    async def run(self):
+        """Connects and consumes until `stop` is called, reconnecting as needed."""
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            try:
+                async with connect(self.url, ping_interval=None, open_timeout=10, close_timeout=2) as websocket:
+                    self._websocket = websocket
+                    self.connections += 1
+                    logger.info(f"Candle stream connected to {self.url}; subscribing {len(self._series)} series.")
+                    await self._send_op('subscribe', sorted(self._series))
+                    delay = self.reconnect_delay
+                    await self._consume(websocket)
+            except (OSError, asyncio.TimeoutError, ConnectionClosed, InvalidHandshake) as e:
+                logger.warning(f"Candle stream connection lost: {e!r}")
+            except InvalidURI:
+                raise
+            finally:
+                self._websocket = None
+            if self._stopped.is_set():
+                break
+            wait = delay * (0.5 + random.random())
+            logger.info(f"Candle stream reconnecting in {wait:.1f}s...")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.max_reconnect_delay)
+        logger.info("Candle stream stopped.")
+
+    async def _consume(self, websocket):
+        awaiting_pong = False
+        while not self._stopped.is_set():
+            try:
+                message = await asyncio.wait_for(websocket.recv(), self.ping_interval)
+            except asyncio.TimeoutError:
+                if awaiting_pong:
+                    raise ConnectionError("no pong from the server")
+                await websocket.send('ping')
+                awaiting_pong = True
+                continue
+            awaiting_pong = False
+            if message == 'pong':
+                continue
+            await self._handle(message)
+
+    async def _handle(self, message: Union[str, bytes]):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            logger.warning(f"Candle stream received a non-JSON message: {message!r:.200}")
+            return
+        event = payload.get('event')
+        if event == 'error':
+            logger.error(f"Candle stream error {payload.get('code')}: {payload.get('msg')}")
+            return
+        if event is not None:
+            logger.debug(f"Candle stream event: {payload}")
+            return
+
+        arg = payload.get('arg', {})
+        key = self._by_channel.get((arg.get('channel'), arg.get('instId')))
+        if key is None:
+            return
+        for row in payload.get('data', []):
+            try:
+                candle = parse_candle(row)
+            except (IndexError, TypeError, ValueError):
+                logger.warning(f"Candle stream received a malformed candle: {row!r:.200}")
+                continue
+            current = self._current.get(key)
+            if current is None or candle['timestamp'] >= current['timestamp']:
+                self._current[key] = candle
+            if candle['confirm'] and candle['timestamp'] > self._last_confirmed.get(key, -1):
+                self._last_confirmed[key] = candle['timestamp']
+                await self._emit(key, candle)
+
+    async def _emit(self, key: Series, candle: Dict[str, Any]):
+        for listener in list(self._listeners):
+            try:
+                result = listener(key[0], key[1], candle)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception(f"Candle listener failed for {key[0]}-{key[1]}.")
@@ -0,0 +1,376 @@
+import sqlite3
+import logging
+import struct
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.database import CACHE_METADATA_SCHEMA, CANDLE_GAPS_SCHEMA, DatabaseManager
+from src.utils.timeframe_util import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+VALUE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+CANDLE_KEYS = ('timestamp',) + VALUE_COLUMNS
+
+_CHUNK_FORMAT_VERSION = 1
+_CHUNK_HEADER = struct.Struct('<BI')  # format version, candle count
+
+Columns = Tuple[np.ndarray, np.ndarray]  # (timestamps int64[n], values float64[5, n])
+
+
+def encode_chunk(timestamps: np.ndarray, values: np.ndarray, level: int = 6) -> bytes:
+    """
+    Encodes sorted candles as a compressed columnar blob.
+
+    Timestamps are stored as deltas (constant for a gap-free series) and the
+    float columns are byte-shuffled (all first bytes, then all second bytes, ...)
+    so that zlib sees the slowly changing exponent bytes next to each other.
+    """
+    count = len(timestamps)
+    deltas = np.diff(np.asarray(timestamps, dtype='<i8'), prepend=0)
+    floats = np.ascontiguousarray(values, dtype='<f8')
+    shuffled = floats.view(np.uint8).reshape(-1, 8).T.tobytes()
+    return _CHUNK_HEADER.pack(_CHUNK_FORMAT_VERSION, count) + zlib.compress(deltas.tobytes() + shuffled, level)
+
+
+def decode_chunk(blob: bytes) -> Columns:
+    """Decodes a blob written by `encode_chunk`."""
+    version, count = _CHUNK_HEADER.unpack_from(blob)
+    if version != _CHUNK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported candle chunk format version {version}.")
+    raw = zlib.decompress(blob[_CHUNK_HEADER.size:])
+    timestamps = np.cumsum(np.frombuffer(raw, dtype='<i8', count=count))
+    planes = np.frombuffer(raw, dtype=np.uint8, offset=count * 8).reshape(8, -1)
+    values = planes.T.copy().view('<f8').reshape(len(VALUE_COLUMNS), count)
+    return timestamps, values
+
+
+class ChunkedDatabaseManager(DatabaseManager):
+    """
+    A candle store that keeps each series as compressed columnar chunks.
+
+    Candles of a (symbol, timeframe) are bucketed by time into chunks of
+    `chunk_size` bars. The `candle_chunks` table is a small index of chunk
+    ranges and counts; the blobs themselves live in `candle_chunk_data`, so
+    finding the chunks for a read never touches compressed data. Writes merge
+    into the affected chunks and keep existing candles, like INSERT OR IGNORE
+    in the row store. Cache metadata is stored exactly as in DatabaseManager.
+    """
+    def __init__(self, db_path: str = 'data/cache.db', chunk_size: int = 512, compression_level: int = 6):
+        self.chunk_size = chunk_size
+        self.compression_level = compression_level
+        self._write_lock = threading.Lock()
+        super().__init__(db_path)
+
+    def _init_db(self):
+        """Initializes the database schema if it doesn't exist."""
+        if not self._conn:
+            return
+        try:
+            with self._conn:
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS candle_chunks (
+                        id INTEGER PRIMARY KEY,
+                        symbol TEXT NOT NULL,
+                        timeframe TEXT NOT NULL,
+                        chunk_id INTEGER NOT NULL,
+                        first_ts INTEGER NOT NULL,
+                        last_ts INTEGER NOT NULL,
+                        count INTEGER NOT NULL,
+                        UNIQUE (symbol, timeframe, chunk_id)
+                    )
+                ''')
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS candle_chunk_data (
+                        id INTEGER PRIMARY KEY,
+                        data BLOB NOT NULL
+                    )
+                ''')
+                self._conn.execute(CACHE_METADATA_SCHEMA)
+                self._conn.execute(CANDLE_GAPS_SCHEMA)
+            self._migrate_cache_metadata()
+            logger.info("Chunked candle tables initialized successfully.")
+        except sqlite3.Error as e:
+            logger.error(f"Error initializing chunked candle tables: {e}")
+
+    def _chunk_span(self, timeframe: str) -> int:
+        return timeframe_to_ms(timeframe) * self.chunk_size
+
+    def get_candle_columns(self, symbol: str, timeframe: str, limit: int = 1000,
+                           start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Optional[Columns]:
+        """
+        Returns candles as (timestamps, values[5, n]) numpy arrays in ascending
+        order, with the range semantics of DatabaseManager.get_candles, or None
+        if nothing matches. Only chunks overlapping the range are decoded.
+        """
+        if not self._conn:
+            return None
+        conditions, params = '', [symbol, timeframe]
+        if start_ts is not None:
+            conditions += ' AND last_ts >= ?'
+            params.append(start_ts)
+        if end_ts is not None:
+            conditions += ' AND first_ts < ?'
+            params.append(end_ts)
+        forward = start_ts is not None
+        index_rows = self._conn.execute(
+            f'''
+            SELECT id FROM candle_chunks WHERE symbol = ? AND timeframe = ?{conditions}
+            ORDER BY chunk_id {'ASC' if forward else 'DESC'}
+            ''',
+            params
+        )
+
+        chunks: List[Columns] = []
+        total = 0
+        for index_row in index_rows:
+            blob = self._conn.execute('SELECT data FROM candle_chunk_data WHERE id = ?', (index_row['id'],)).fetchone()['data']
+            timestamps, values = decode_chunk(blob)
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start_ts is not None:
+                mask &= timestamps >= start_ts
+            if end_ts is not None:
+                mask &= timestamps < end_ts
+            if not mask.all():
+                timestamps, values = timestamps[mask], values[:, mask]
+            chunks.append((timestamps, values))
+            total += len(timestamps)
+            if total >= limit:
+                break
+        if not total:
+            return None
+
+        if not forward:
+            chunks.reverse()
+        timestamps = np.concatenate([ts for ts, _ in chunks])
+        values = np.concatenate([vals for _, vals in chunks], axis=1)
+        window = slice(None, limit) if forward else slice(-limit, None)
+        return timestamps[window], values[:, window]
+
+    def get_candles(self, symbol: str, timeframe: str, limit: int = 1000,
+                    start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Retrieves candle data from the database (see DatabaseManager.get_candles)."""
+        try:
+            columns = self.get_candle_columns(symbol, timeframe, limit, start_ts, end_ts)
+        except (sqlite3.Error, ValueError, zlib.error) as e:
+            logger.error(f"Error getting candles for {symbol}-{timeframe}: {e}")
+            return []
+        if columns is None:
+            return []
+        timestamps, values = columns
+        return [dict(zip(CANDLE_KEYS, row)) for row in zip(timestamps.tolist(), *values.tolist())]
+
+    def get_candles_batch(self, series: Iterable[Tuple[str, str]], limit: int = 1000,
+                          start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """Reads several series; each read only touches its own chunk index entries."""
+        return {
+            (symbol, timeframe): self.get_candles(symbol, timeframe, limit, start_ts, end_ts)
+            for symbol, timeframe in dict.fromkeys(series)
+        }
+
+    def save_candles(self, symbol: str, timeframe: str, candles: List[Dict[str, Any]], ttl_hours: int):
+        """Saves a batch of candle data to the database, ignoring duplicates."""
+        if not self._conn or not candles:
+            return
+        batch = (
+            [int(c['timestamp']) for c in candles],
+            *([float(c[column]) for c in candles] for column in VALUE_COLUMNS),
+        )
+        try:
+            self.bulk_insert_candles(symbol, timeframe, [batch])
+            self.update_cache_metadata(symbol, timeframe, ttl_hours)
+        except sqlite3.Error as e:
+            logger.error(f"Error saving candles for {symbol}-{timeframe}: {e}")
+
+    def save_candles_many(self, writes: Iterable[Tuple[str, str, List[Dict[str, Any]], Optional[int], datetime]]):
+        """Saves several series in one transaction (see DatabaseManager.save_candles_many)."""
+        with self._write_lock:
+            super().save_candles_many(writes)
+
+    def _insert_candles(self, symbol: str, timeframe: str, candles: List[Dict[str, Any]]):
+        timestamps = np.array([int(c['timestamp']) for c in candles], dtype=np.int64)
+        values = np.array([[float(c[column]) for c in candles] for column in VALUE_COLUMNS], dtype=np.float64)
+        chunk_ids = timestamps // self._chunk_span(timeframe)
+        for chunk_id in np.unique(chunk_ids).tolist():
+            mask = chunk_ids == chunk_id
+            self._merge_chunk(symbol, timeframe, chunk_id, timestamps[mask], values[:, mask])
+
+    def bulk_insert_candles(self, symbol: str, timeframe: str, batches: Iterable[Sequence[Sequence]]) -> int:
+        """
+        Merges columnar batches, (timestamps, opens, highs, lows, closes, volumes),
+        into the series' chunks in a single transaction, ignoring duplicates.
+
+        Returns:
+            The number of candles actually inserted.
+        """
+        if not self._conn:
+            return 0
+        span = self._chunk_span(timeframe)
+        inserted = 0
+        with self._write_lock:
+            try:
+                with self._conn:
+                    for batch in batches:
+                        timestamps = np.asarray(batch[0], dtype=np.int64)
+                        if not len(timestamps):
+                            continue
+                        values = np.asarray(batch[1:], dtype=np.float64)
+                        chunk_ids = timestamps // span
+                        for chunk_id in np.unique(chunk_ids).tolist():
+                            mask = chunk_ids == chunk_id
+                            inserted += self._merge_chunk(symbol, timeframe, chunk_id, timestamps[mask], values[:, mask])
+            except sqlite3.Error as e:
+                logger.error(f"Error bulk inserting candles for {symbol}-{timeframe}: {e}")
+                raise
+        return inserted
+
+    def _merge_chunk(self, symbol: str, timeframe: str, chunk_id: int,
+                     timestamps: np.ndarray, values: np.ndarray) -> int:
+        row = self._conn.execute(
+            '''
+            SELECT c.id, d.data FROM candle_chunks c JOIN candle_chunk_data d ON d.id = c.id
+            WHERE c.symbol = ? AND c.timeframe = ? AND c.chunk_id = ?
+            ''',
+            (symbol, timeframe, chunk_id)
+        ).fetchone()
+
+        existing = 0
+        if row is not None:
+            old_timestamps, old_values = decode_chunk(row['data'])
+            existing = len(old_timestamps)
+            # Existing candles come first so np.unique keeps them over new duplicates.
+            timestamps = np.concatenate([old_timestamps, timestamps])
+            values = np.concatenate([old_values, values], axis=1)
+        timestamps, first_index = np.unique(timestamps, return_index=True)
+        values = values[:, first_index]
+        if len(timestamps) == existing:
+            return 0
+
+        blob = encode_chunk(timestamps, values, self.compression_level)
+        first_ts, last_ts, count = int(timestamps[0]), int(timestamps[-1]), len(timestamps)
+        if row is None:
+            cursor = self._conn.execute(
+                'INSERT INTO candle_chunks (symbol, timeframe, chunk_id, first_ts, last_ts, count) VALUES (?, ?, ?, ?, ?, ?)',
+                (symbol, timeframe, chunk_id, first_ts, last_ts, count)
+            )
+            self._conn.execute('INSERT INTO candle_chunk_data (id, data) VALUES (?, ?)', (cursor.lastrowid, blob))
+        else:
+            self._conn.execute(
+                'UPDATE candle_chunks SET first_ts = ?, last_ts = ?, count = ? WHERE id = ?',
+                (first_ts, last_ts, count, row['id'])
+            )
+            self._conn.execute('UPDATE candle_chunk_data SET data = ? WHERE id = ?', (blob, row['id']))
+        return count - existing
+
+    def list_series(self) -> List[Dict[str, Any]]:
+        """Lists every stored series (see DatabaseManager.list_series); counts come from the chunk index."""
+        if not self._conn:
+            return []
+        rows = self._conn.execute(
+            '''
+            SELECT c.symbol, c.timeframe, c.count, m.last_updated, m.last_accessed
+            FROM (SELECT symbol, timeframe, SUM(count) AS count FROM candle_chunks GROUP BY symbol, timeframe) c
+            LEFT JOIN cache_metadata m ON m.symbol = c.symbol AND m.timeframe = c.timeframe
+            '''
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def nth_latest_timestamp(self, symbol: str, timeframe: str, n: int) -> Optional[int]:
+        """Returns the timestamp of the n-th newest candle, or None if the series is shorter."""
+        if n <= 0:
+            return None
+        columns = self.get_candle_columns(symbol, timeframe, limit=n)
+        if columns is None or len(columns[0]) < n:
+            return None
+        return int(columns[0][0])
+
+    def delete_candles_before(self, symbol: str, timeframe: str, cutoff_ts: int) -> int:
+        """
+        Deletes the candles of a series older than `cutoff_ts`: whole chunks are
+        dropped, the chunk containing the cutoff is rewritten.
+        """
+        if not self._conn:
+            return 0
+        deleted = 0
+        with self._write_lock, self._conn:
+            rows = self._conn.execute(
+                'SELECT id, first_ts, last_ts, count FROM candle_chunks WHERE symbol = ? AND timeframe = ? AND first_ts < ?',
+                (symbol, timeframe, cutoff_ts)
+            ).fetchall()
+            for row in rows:
+                if row['last_ts'] < cutoff_ts:
+                    self._delete_chunk(row['id'])
+                    deleted += row['count']
+                    continue
+                blob = self._conn.execute('SELECT data FROM candle_chunk_data WHERE id = ?', (row['id'],)).fetchone()['data']
+                timestamps, values = decode_chunk(blob)
+                keep = timestamps >= cutoff_ts
+                timestamps, values = timestamps[keep], values[:, keep]
+                self._conn.execute(
+                    'UPDATE candle_chunks SET first_ts = ?, count = ? WHERE id = ?',
+                    (int(timestamps[0]), len(timestamps), row['id'])
+                )
+                self._conn.execute(
+                    'UPDATE candle_chunk_data SET data = ? WHERE id = ?',
+                    (encode_chunk(timestamps, values, self.compression_level), row['id'])
+                )
+                deleted += row['count'] - len(timestamps)
+        return deleted
+
+    def drop_series(self, symbol: str, timeframe: str) -> int:
+        """Deletes a series and its metadata. Returns the number of candles deleted."""
+        if not self._conn:
+            return 0
+        with self._write_lock, self._conn:
+            rows = self._conn.execute(
+                'SELECT id, count FROM candle_chunks WHERE symbol = ? AND timeframe = ?', (symbol, timeframe)
+            ).fetchall()
+            for row in rows:
+                self._delete_chunk(row['id'])
+            self._conn.execute('DELETE FROM cache_metadata WHERE symbol = ? AND timeframe = ?', (symbol, timeframe))
+            self._conn.execute('DELETE FROM candle_gaps WHERE symbol = ? AND timeframe = ?', (symbol, timeframe))
+        return sum(row['count'] for row in rows)
+
+    def find_gaps(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> List[Tuple[str, str, int, int]]:
+        """
+        Finds missing candles (see DatabaseManager.find_gaps). Chunks are read in
+        index order and only their timestamp columns are inspected.
+        """
+        if not self._conn:
+            return []
+        where, params = '', []
+        if symbol is not None:
+            where, params = 'WHERE c.symbol = ? AND c.timeframe = ?', [symbol, timeframe]
+        rows = self._conn.execute(
+            f'''
+            SELECT c.symbol, c.timeframe, d.data FROM candle_chunks c JOIN candle_chunk_data d ON d.id = c.id
+            {where} ORDER BY c.symbol, c.timeframe, c.chunk_id
+            ''',
+            params
+        )
+        gaps = []
+        series, previous, step = None, None, None
+        for row in rows:
+            if (row['symbol'], row['timeframe']) != series:
+                series, previous = (row['symbol'], row['timeframe']), None
+                try:
+                    step = timeframe_to_ms(row['timeframe'])
+                except ValueError:
+                    step = None
+            if step is None:
+                continue
+            timestamps, _ = decode_chunk(row['data'])
+            if previous is not None:
+                timestamps = np.concatenate([[previous], timestamps])
+            for index in np.flatnonzero(np.diff(timestamps) > step).tolist():
+                gaps.append((*series, int(timestamps[index]) + step, int(timestamps[index + 1])))
+            previous = timestamps[-1]
+        return gaps
+
+    def _delete_chunk(self, chunk_row_id: int):
+        self._conn.execute('DELETE FROM candle_chunk_data WHERE id = ?', (chunk_row_id,))
+        self._conn.execute('DELETE FROM candle_chunks WHERE id = ?', (chunk_row_id,))
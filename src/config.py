@@ -4,15 +4,25 @@ This module provides a centralized, validated configuration for the application.
 It imports the validated AppSettings object and transforms it into the nested
 dictionary structure that the rest of the application expects. This acts as an
 adapter layer between the flat .env structure and the application's structured config.
+
+The config is built once and kept as a frozen (read-only) structure, see
+`get_app_config()`. `reload_config()` re-reads the settings and swaps the
+frozen config atomically, so a running bot can pick up .env changes.
 """
 import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
 
-def get_config():
+def _build_config(settings) -> dict:
     """
-    Constructs and returns the application's configuration dictionary from the
+    Constructs the application's configuration dictionary from the
     validated Pydantic settings object.
     """
-    from .settings import settings
     # Manually construct the nested dictionaries that the application expects.
     # This keeps the validation flat and simple, while maintaining the app's
     # existing config structure.
@@ -26,13 +36,29 @@ def get_config():
     config = {
         'telegram': {
             'TOKEN': settings.BOT_TOKEN,
-            'ADMIN_CHAT_ID': settings.TELEGRAM_ADMIN_CHAT_ID
+            'ADMIN_CHAT_ID': settings.TELEGRAM_ADMIN_CHAT_ID,
+            'MODE': settings.BOT_MODE,
+            'UPDATE_WORKERS': settings.UPDATE_WORKERS,
+            'PROGRESS_EDIT_DELAY': settings.PROGRESS_EDIT_DELAY,
+            'PROGRESS_MIN_INTERVAL': settings.PROGRESS_MIN_INTERVAL,
+            'CONFIG_WATCH_INTERVAL': settings.CONFIG_WATCH_INTERVAL,
+            'WEBHOOK': {
+                'URL': settings.WEBHOOK_URL,
+                'LISTEN': settings.WEBHOOK_LISTEN,
+                'PORT': settings.WEBHOOK_PORT,
+                'PATH': settings.WEBHOOK_PATH,
+                'SECRET_TOKEN': settings.WEBHOOK_SECRET_TOKEN
+            }
         },
         'exchange': {
             'API_KEY': settings.EXCHANGE_API_KEY,
             'API_SECRET': settings.EXCHANGE_API_SECRET,
             'PASSWORD': settings.EXCHANGE_API_PASSWORD,
-            'SANDBOX_MODE': settings.SANDBOX_MODE
+            'SANDBOX_MODE': settings.SANDBOX_MODE,
+            'RATE_LIMIT': settings.EXCHANGE_RATE_LIMIT,
+            'STREAM_ENABLED': settings.STREAM_ENABLED,
+            'STREAM_TIMEFRAMES': settings.STREAM_TIMEFRAMES,
+            'STREAM_URL': settings.STREAM_URL
         },
         'trading': {
             'WATCHLIST': settings.WATCHLIST,
@@ -41,7 +67,45 @@ def get_config():
             'TIMEFRAME_HIERARCHY': settings.TIMEFRAME_HIERARCHY,
             'CANDLE_FETCH_LIMITS': settings.CANDLE_FETCH_LIMITS,
             'ANALYSIS_INTERVAL_MINUTES': settings.ANALYSIS_INTERVAL_MINUTES,
-            'TRADE_AMOUNT': settings.TRADE_AMOUNT
+            'ANALYSIS_MAX_CONCURRENCY': settings.ANALYSIS_MAX_CONCURRENCY,
+            'ANALYSIS_PER_USER_INFLIGHT': settings.ANALYSIS_PER_USER_INFLIGHT,
+            'ANALYSIS_PER_USER_PENDING': settings.ANALYSIS_PER_USER_PENDING,
+            'ANALYSIS_WORKERS': settings.ANALYSIS_WORKERS,
+            'TRADE_AMOUNT': settings.TRADE_AMOUNT,
+            'TEMPLATE_AUTO_RELOAD': settings.TEMPLATE_AUTO_RELOAD
+        },
+        'cache': {
+            'DB_PATH': settings.CACHE_DB_PATH,
+            'STORAGE': settings.CACHE_STORAGE,
+            'WRITE_BEHIND': settings.CACHE_WRITE_BEHIND,
+            'RETENTION_BARS': settings.CACHE_RETENTION_BARS,
+            'RETENTION_DAYS': settings.CACHE_RETENTION_DAYS,
+            'MAX_SIZE_MB': settings.CACHE_MAX_SIZE_MB,
+            'MAINTENANCE_INTERVAL_MINUTES': settings.CACHE_MAINTENANCE_INTERVAL_MINUTES,
+            'BACKFILL_INTERVAL_MINUTES': settings.CACHE_BACKFILL_INTERVAL_MINUTES,
+            'BACKFILL_MAX_GAPS': settings.CACHE_BACKFILL_MAX_GAPS,
+            'BACKFILL_MAX_ATTEMPTS': settings.CACHE_BACKFILL_MAX_ATTEMPTS,
+            'STALE_MAX_AGE_HOURS': settings.CACHE_STALE_MAX_AGE_HOURS
+        },
+        'alerts': {
+            'SUBSCRIPTIONS_DB_PATH': settings.SUBSCRIPTIONS_DB_PATH,
+            'GLOBAL_RATE': settings.ALERT_GLOBAL_RATE,
+            'PER_CHAT_INTERVAL': settings.ALERT_PER_CHAT_INTERVAL,
+            'SEND_CONCURRENCY': settings.ALERT_SEND_CONCURRENCY
+        },
+        'jobs': {
+            'DB_PATH': settings.JOBS_DB_PATH,
+            'CONCURRENCY': settings.JOB_RUNNER_CONCURRENCY,
+            'LEASE_SECONDS': settings.JOB_LEASE_SECONDS,
+            'MAX_ATTEMPTS': settings.JOB_MAX_ATTEMPTS
+        },
+        'metrics': {
+            'LISTEN': settings.METRICS_LISTEN,
+            'PORT': settings.METRICS_PORT
+        },
+        'tracing': {
+            'SAMPLE_RATE': settings.TRACE_SAMPLE_RATE,
+            'FILE': settings.TRACE_FILE
         },
         'risk_management': {
             'max_drawdown': settings.MAX_DRAWDOWN,
@@ -75,8 +139,133 @@ def get_config():
             }
         }
     }
+    config['strategy_params_by_timeframe'] = _resolve_timeframe_params(config)
+    return config
+
+def _resolve_timeframe_params(config: dict) -> dict:
+    """
+    Merges each strategy's `timeframe_overrides` into its base parameters ahead of
+    time, so analyzers do not have to do it per instance.
+    """
+    resolved = {}
+    for strategy, base_params in config.get('strategy_params', {}).items():
+        overrides = base_params.get('timeframe_overrides', {})
+        resolved[strategy] = {tf: {**base_params, **params} for tf, params in overrides.items()}
+    return resolved
+
+def get_strategy_params(config: Mapping[str, Any], strategy: str, timeframe: Optional[str] = None) -> Mapping[str, Any]:
+    """
+    Returns the parameters of a strategy for a timeframe, with that timeframe's
+    overrides applied. Uses the pre-resolved parameters when the config has them.
+    """
+    base_params = config.get('strategy_params', {}).get(strategy, {})
+    resolved = config.get('strategy_params_by_timeframe', {}).get(strategy)
+    if resolved is not None:
+        return resolved.get(timeframe, base_params)
+    specific_params = base_params.get('timeframe_overrides', {}).get(timeframe, {})
+    return {**base_params, **specific_params}
+
+def freeze(value):
+    """Recursively converts dicts to read-only mappings and lists to tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def thaw(value):
+    """Returns a mutable deep copy of a frozen config (the inverse of `freeze`)."""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+_app_config: Optional[Mapping[str, Any]] = None
+_config_lock = threading.Lock()
+_reload_listeners: List[Callable[[Mapping[str, Any]], Any]] = []
+
+def get_app_config() -> Mapping[str, Any]:
+    """
+    Returns the shared, frozen application config. It is built on first use and
+    only replaced by `reload_config()`; callers must not modify it.
+    """
+    config = _app_config
+    if config is None:
+        with _config_lock:
+            if _app_config is None:
+                from .settings import settings
+                _swap_config(freeze(_build_config(settings)))
+            config = _app_config
     return config
 
+def get_config() -> dict:
+    """
+    Returns a mutable copy of the application's configuration dictionary.
+
+    Prefer `get_app_config()` on hot paths; this exists for callers that
+    need to adjust their own copy (e.g. tests).
+    """
+    return thaw(get_app_config())
+
+def _swap_config(config: Mapping[str, Any]):
+    global _app_config
+    _app_config = config
+
+def on_config_reload(listener: Callable[[Mapping[str, Any]], Any]):
+    """Registers a callback that receives the new frozen config after each reload."""
+    _reload_listeners.append(listener)
+
+def reload_config() -> bool:
+    """
+    Re-reads the settings (.env and environment) and atomically replaces the
+    shared config. On a validation error the current config is kept.
+
+    Returns:
+        True if the config was replaced.
+    """
+    from . import settings as settings_module
+    try:
+        new_settings = settings_module.AppSettings()
+        new_config = freeze(_build_config(new_settings))
+    except Exception as e:
+        logger.error(f"Config reload failed, keeping the current config: {e}")
+        return False
+
+    with _config_lock:
+        settings_module.settings = new_settings
+        _swap_config(new_config)
+    logger.info("Configuration reloaded.")
+
+    for listener in list(_reload_listeners):
+        try:
+            listener(new_config)
+        except Exception as e:
+            logger.error(f"Config reload listener {listener!r} failed: {e}", exc_info=True)
+    return True
+
+async def watch_config_file(path: str = '.env', interval: float = 5.0):
+    """
+    Polls `path` and calls `reload_config()` whenever its mtime changes.
+    Runs until cancelled.
+    """
+    import asyncio
+
+    def mtime():
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    last_mtime = mtime()
+    while True:
+        await asyncio.sleep(interval)
+        current = mtime()
+        if current != last_mtime:
+            last_mtime = current
+            logger.info(f"{path} changed; reloading configuration.")
+            reload_config()
+
 if __name__ == '__main__':
     # To run this script directly for testing, you must execute it as a module
     # from the project root directory: python -m src.config
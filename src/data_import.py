@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from src.database import DatabaseManager
+from src.utils.symbol_util import normalize_symbol
+
+logger = logging.getLogger(__name__)
+
+CANDLE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# Matches the start of the candle array in a {"symbol": ..., "data": [...]} snapshot.
+_DATA_ARRAY_RE = re.compile(r'"data"\s*:\s*\[')
+_SKIP_RE = re.compile(r'[\s,]*')
+# What may follow a candle inside the array: another candle or the end of the array.
+_AFTER_CANDLE_RE = re.compile(r'\s*[,\]]')
+
+
+def _last_candle_end(buffer: str, pos: int, closer: str) -> int:
+    """
+    The offset of the last `closer` after `pos` that ends a candle, or -1.
+
+    A candle's closing bracket is followed by ',' or the array's ']'; this skips
+    the brackets that close the enclosing array or object.
+    """
+    end = len(buffer)
+    while True:
+        cut = buffer.rfind(closer, pos, end)
+        if cut <= pos:
+            return -1
+        if _AFTER_CANDLE_RE.match(buffer, cut + 1):
+            return cut
+        end = cut
+
+
+def iter_json_candles(path: str, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """
+    Streams the candles of a JSON file one at a time without loading the whole file.
+
+    Supports the snapshot layout written for the bot ({"symbol": ..., "data": [...]})
+    and bare top-level arrays (e.g. exported OKX histories). Candles may be dicts
+    or OKX-style [ts, open, high, low, close, volume, ...] lists.
+
+    Raises:
+        ValueError: If the file contains no candle array or is truncated.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size)
+        eof = not buffer
+
+        # Locate the opening bracket of the candle array.
+        while True:
+            stripped = buffer.lstrip()
+            if stripped.startswith('['):
+                pos = len(buffer) - len(stripped) + 1
+                break
+            match = _DATA_ARRAY_RE.search(buffer)
+            if match:
+                pos = match.end()
+                break
+            if eof:
+                raise ValueError(f"No candle array found in {path}.")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+
+        fast_path = True
+        while True:
+            pos = _SKIP_RE.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+
+            # Fast path: decode every complete candle in the buffer with a single
+            # json.loads call. Candles are flat, so the last closing bracket of
+            # their kind that is followed by ',' or ']' ends a candle; anything
+            # unexpected falls back to decoding one candle at a time until more
+            # data is read.
+            if fast_path and pos < len(buffer):
+                cut = _last_candle_end(buffer, pos, '}' if buffer[pos] == '{' else ']')
+                if cut > pos:
+                    try:
+                        candles = json.loads('[' + buffer[pos:cut + 1] + ']')
+                    except json.JSONDecodeError:
+                        fast_path = False
+                    else:
+                        yield from candles
+                        pos = cut + 1
+                        continue
+
+            try:
+                candle, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"Truncated or malformed candle array in {path} at offset {pos}.")
+                # The next candle spans the chunk boundary; read more and retry.
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                fast_path = True
+                continue
+            yield candle
+            pos = end
+
+
+def iter_candle_batches(candles: Iterable[Any], batch_size: int = 50_000) -> Iterator[Tuple[Sequence, ...]]:
+    """
+    Groups raw candles into columnar batches and converts the string fields in bulk.
+
+    Yields:
+        (timestamps, opens, highs, lows, closes, volumes) tuples of Python lists,
+        ready for DatabaseManager.bulk_insert_candles.
+    """
+    batch: List[Any] = []
+    for candle in candles:
+        batch.append(candle)
+        if len(batch) >= batch_size:
+            yield _convert_batch(batch)
+            batch = []
+    if batch:
+        yield _convert_batch(batch)
+
+
+def _convert_batch(batch: List[Any]) -> Tuple[Sequence, ...]:
+    if isinstance(batch[0], dict):
+        columns = [[c[field] for c in batch] for field in CANDLE_FIELDS]
+    else:
+        columns = [list(column) for column in zip(*batch)][:len(CANDLE_FIELDS)]
+    # numpy parses the numeric strings in C; timestamps may be strings too.
+    timestamps = np.asarray(columns[0], dtype=np.int64)
+    values = np.asarray(columns[1:], dtype=np.float64)
+    return (timestamps.tolist(), *values.tolist())
+
+
+def discover_snapshot_files(root: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Finds snapshot files laid out as <root>/<SYMBOL>/<term>/<timeframe>.json.
+
+    Yields:
+        (symbol, timeframe, path) tuples, with the symbol normalized.
+    """
+    for symbol_dir in sorted(os.listdir(root)):
+        symbol_path = os.path.join(root, symbol_dir)
+        if not os.path.isdir(symbol_path):
+            continue
+        for term_dir in sorted(os.listdir(symbol_path)):
+            term_path = os.path.join(symbol_path, term_dir)
+            if not os.path.isdir(term_path):
+                continue
+            for filename in sorted(os.listdir(term_path)):
+                if filename.endswith('.json'):
+                    yield normalize_symbol(symbol_dir), filename[:-len('.json')], os.path.join(term_path, filename)
+
+
+def import_series(db: DatabaseManager, symbol: str, timeframe: str, path: str,
+                  batch_size: int = 50_000, mark_fresh: bool = False,
+                  ttl_hours: int = 24) -> Dict[str, Any]:
+    """
+    Streams one JSON file into the candle store in a single transaction.
+
+    The cache metadata is only touched with `mark_fresh`, since imported history
+    is usually older than the cache TTL and should not be served as fresh.
+
+    Returns:
+        A stats dict: {'symbol', 'timeframe', 'read', 'inserted', 'seconds', 'rows_per_second'}.
+    """
+    symbol = normalize_symbol(symbol)
+    read = 0
+    started = time.perf_counter()
+
+    def counted(batches):
+        nonlocal read
+        for batch in batches:
+            read += len(batch[0])
+            yield batch
+
+    inserted = db.bulk_insert_candles(
+        symbol, timeframe, counted(iter_candle_batches(iter_json_candles(path), batch_size))
+    )
+    if mark_fresh and read:
+        db.update_cache_metadata(symbol, timeframe, ttl_hours)
+
+    seconds = time.perf_counter() - started
+    return {
+        'symbol': symbol, 'timeframe': timeframe, 'read': read, 'inserted': inserted,
+        'seconds': seconds, 'rows_per_second': read / seconds if seconds > 0 else 0.0,
+    }
+
+
+def import_snapshots(db: DatabaseManager, root: str = 'data', batch_size: int = 50_000,
+                     mark_fresh: bool = False, ttl_hours: int = 24) -> List[Dict[str, Any]]:
+    """Imports every snapshot file under `root`; a failing file is logged and skipped."""
+    results = []
+    for symbol, timeframe, path in discover_snapshot_files(root):
+        try:
+            stats = import_series(db, symbol, timeframe, path, batch_size, mark_fresh, ttl_hours)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to import {path}: {e}")
+            continue
+        logger.info(
+            f"Imported {symbol}-{timeframe}: {stats['inserted']}/{stats['read']} new rows "
+            f"in {stats['seconds']:.3f}s ({stats['rows_per_second']:,.0f} rows/s)"
+        )
+        results.append(stats)
+    return results
@@ -1,24 +1,55 @@
+import json
 import okx.MarketData as MarketData
+import httpx
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import logging
-import time
 from requests.exceptions import RequestException
 
 from .exceptions import APIError, NetworkError
 from ..utils.symbol_util import normalize_symbol
-from ..retry_handler import with_retry
+from .. import tracing
+from ..metrics import EXCHANGE_REQUESTS, STAGE_SECONDS
+from ..rate_limiter import RateLimiter, shared_rate_limiter
+from ..retry_handler import CircuitOpenError, shared_circuit_breaker, shared_retry_budget, with_retry
 
 logger = logging.getLogger(__name__)
 
+# Failures of the transport or of the exchange itself, worth retrying. A body
+# that is not JSON (the okx client's response.json() raises JSONDecodeError)
+# is a gateway error page.
+TRANSIENT_ERRORS = (httpx.TransportError, RequestException, json.JSONDecodeError, APIError)
+# OKX codes for server-side trouble: 50001 service unavailable, 50004 endpoint
+# timeout, 50011 rate limited, 50013 system busy, 50026 system error.
+RETRYABLE_API_CODES = {'50001', '50004', '50011', '50013', '50026'}
+RATE_LIMITED_CODE = '50011'
+
+_REQUEST_TIMER = STAGE_SECONDS.labels(stage='exchange_request')
+
+
+def _is_transient(error: Exception) -> bool:
+    return not isinstance(error, APIError) or error.status_code in RETRYABLE_API_CODES
+
 class DataFetcher:
     """
     A class to fetch historical market data from the OKX exchange.
+
+    Every REST request draws from one process-wide rate budget
+    (`exchange.RATE_LIMIT` requests per second), shared by all fetchers and
+    threads, so parallel fetches cannot exceed the exchange's limits.
+
+    Transient failures are retried with jittered backoff, but only while the
+    shared retry budget lasts, and each endpoint has a circuit breaker: after
+    repeated failures calls fail fast with NetworkError instead of adding to
+    the load on a struggling exchange.
     """
+    rate_limiter: Optional[RateLimiter] = None
+
     def __init__(self, config: Dict):
         self.config = config.get('exchange', {})
         self.debug = self.config.get('SANDBOX_MODE', True)
         flag = "1" if self.debug else "0"  # 0 for live, 1 for demo
+        self.rate_limiter = shared_rate_limiter('okx-rest', self.config.get('RATE_LIMIT', 10.0))
 
         self.market_api = MarketData.MarketAPI(
             api_key=self.config.get('API_KEY'),
@@ -29,22 +60,11 @@ class DataFetcher:
             debug=self.debug
         )
 
-    def fetch_historical_data(self, symbol: str, timeframe: str, limit: int = 300) -> Dict:
-        """
-        Fetches historical candlestick data for a given symbol and timeframe.
-
-        Args:
-            symbol (str): The trading symbol (e.g., 'BTC-USDT').
-            timeframe (str): The timeframe for the candles (e.g., '1D', '4H', '15m').
-            limit (int): The total number of candles to fetch.
-
-        Returns:
-            Dict: A dictionary containing the data.
+    API_MAX_LIMIT = 100
+    MAX_ATTEMPTS = 3
 
-        Raises:
-            APIError: If the exchange API returns an error.
-            NetworkError: If a network-related error occurs.
-        """
+    @staticmethod
+    def _api_params(symbol: str, timeframe: str):
         # Normalize the symbol to ensure it's in the API-compatible format
         api_symbol = normalize_symbol(symbol)
 
@@ -54,55 +74,110 @@ class DataFetcher:
             api_timeframe = timeframe.upper()
         else:
             api_timeframe = timeframe
+        return api_symbol, api_timeframe
 
-        logger.info(f"Fetching {limit} historical data for {symbol} on {timeframe} (API symbol: {api_symbol}, API timeframe: {api_timeframe})...")
+    def _fetch_page(self, symbol: str, api_symbol: str, api_timeframe: str, after: str) -> List[List[str]]:
+        """
+        Fetches one page of up to API_MAX_LIMIT candles, newest first.
 
-        API_MAX_LIMIT = 100
-        all_candles = []
-        end_timestamp = ''
+        `after` is OKX's cursor for records *older* than the given timestamp
+        ('' for the newest page).
+        """
+        try:
+            result = self._call('candles', self.market_api.get_history_candlesticks, api_symbol,
+                                instId=api_symbol, bar=api_timeframe, limit=str(self.API_MAX_LIMIT), after=after)
+        except APIError:
+            raise
+        except TRANSIENT_ERRORS as e:
+            logger.error(f"Network error for {symbol} persisted after all retries: {e}")
+            raise NetworkError(f"Failed to connect to the exchange after multiple retries: {e}") from e
+        except CircuitOpenError as e:
+            raise NetworkError(f"The exchange is temporarily unavailable: {e}") from e
+        except Exception as e:
+            logger.exception(f"An unexpected error occurred during API call for {symbol}: {e}")
+            raise
 
-        logger.info(f"Starting paginated data fetch for {symbol} to get {limit} candles...")
+        return result.get('data', [])
 
-        @with_retry(exceptions=(RequestException,), max_attempts=3)
-        def _fetch_batch_with_retry(instId, bar, limit, before):
-            """Fetches a single batch of candlesticks with retry logic."""
-            return self.market_api.get_history_candlesticks(instId=instId, bar=bar, limit=limit, before=before)
+    def _call(self, endpoint: str, request: Callable[..., Dict], api_symbol: str, **params) -> Dict:
+        """
+        Calls an exchange endpoint through the rate limiter, retry budget and
+        the endpoint's circuit breaker, and checks the result.
+        """
+        @with_retry(exceptions=TRANSIENT_ERRORS, retry_if=_is_transient, max_attempts=self.MAX_ATTEMPTS,
+                    budget=shared_retry_budget('okx-rest'), breaker=shared_circuit_breaker(f'okx-rest:{endpoint}'))
+        def call_with_retry():
+            # One span per attempt; pages are told apart by their `after` cursor.
+            with tracing.span(f'exchange.{endpoint}', **params):
+                self._throttle()
+                return send()
 
-        while len(all_candles) < limit:
+        def send():
             try:
-                # Always fetch the max allowed per request to be efficient
-                logger.info(f"Requesting batch of up to {API_MAX_LIMIT}. Have {len(all_candles)}/{limit} candles.")
-                result = _fetch_batch_with_retry(
-                    instId=api_symbol, bar=api_timeframe, limit=str(API_MAX_LIMIT), before=end_timestamp
-                )
-            except RequestException as e:
-                logger.error(f"Network error for {symbol} persisted after all retries: {e}")
-                raise NetworkError(f"Failed to connect to the exchange after multiple retries: {e}") from e
-            except Exception as e:
-                logger.exception(f"An unexpected error occurred during API call for {symbol}: {e}")
+                with _REQUEST_TIMER.time():
+                    result = request(**params)
+            except Exception:
+                EXCHANGE_REQUESTS.labels(endpoint=endpoint, outcome='error').inc()
                 raise
+            EXCHANGE_REQUESTS.labels(endpoint=endpoint, outcome='ok' if result.get('code') == '0' else 'api_error').inc()
+            if result.get('code') == RATE_LIMITED_CODE and self.rate_limiter is not None:
+                # Back everyone off, not just this caller.
+                self.rate_limiter.pause(1.0)
+            self._check_result(result, api_symbol)
+            return result
 
-            if result.get('code') != '0':
-                error_msg = result.get('msg', 'Unknown API error')
-                error_code = result.get('code')
-                logger.error(f"API Error for {api_symbol}: {error_msg} (Code: {error_code})")
-                # Specific check for invalid instrument ID
-                if error_code == '51001':
-                     raise APIError(f"Invalid instrument ID: {api_symbol}", status_code=error_code)
-                raise APIError(error_msg, status_code=error_code)
+        return call_with_retry()
 
-            data = result.get('data', [])
-            if not data:
-                logger.warning(f"No more data returned from API for {symbol}. Fetched {len(all_candles)} candles.")
-                break # Exit loop if API returns no more data
+    def _throttle(self):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
 
-            all_candles.extend(data)
-            end_timestamp = data[-1][0] # Timestamp of the last candle for the next 'before' request
-            time.sleep(0.2) # Small delay to respect API rate limits
+    @staticmethod
+    def _check_result(result: Dict, api_symbol: str):
+        if result.get('code') != '0':
+            error_msg = result.get('msg', 'Unknown API error')
+            error_code = result.get('code')
+            logger.error(f"API Error for {api_symbol}: {error_msg} (Code: {error_code})")
+            # Specific check for invalid instrument ID
+            if error_code == '51001':
+                 raise APIError(f"Invalid instrument ID: {api_symbol}", status_code=error_code)
+            raise APIError(error_msg, status_code=error_code)
 
-        if not all_candles:
-            raise APIError(f"Failed to fetch any data for {symbol}, it might be an invalid symbol or have no trading history.")
+    def fetch_instruments(self, quote: str = 'USDT') -> List[Dict]:
+        """
+        Lists the live spot instruments quoted in `quote`, most traded first.
+
+        Returns:
+            List[Dict]: {'symbol', 'last', 'volume_24h'} per instrument, where
+            volume_24h is the 24h volume in the quote currency.
+
+        Raises:
+            APIError: If the exchange API returns an error.
+            NetworkError: If a network-related error occurs.
+        """
+        try:
+            result = self._call('tickers', self.market_api.get_tickers, 'SPOT tickers', instType='SPOT')
+        except APIError:
+            raise
+        except TRANSIENT_ERRORS as e:
+            raise NetworkError(f"Failed to connect to the exchange after multiple retries: {e}") from e
+        except CircuitOpenError as e:
+            raise NetworkError(f"The exchange is temporarily unavailable: {e}") from e
 
+        instruments = []
+        for ticker in result.get('data', []):
+            if not ticker.get('instId', '').endswith(f'-{quote}'):
+                continue
+            try:
+                instruments.append({'symbol': ticker['instId'], 'last': float(ticker['last']),
+                                    'volume_24h': float(ticker['volCcy24h'])})
+            except (KeyError, TypeError, ValueError):
+                continue
+        instruments.sort(key=lambda instrument: instrument['volume_24h'], reverse=True)
+        return instruments
+
+    @staticmethod
+    def _to_frame(all_candles: List[List[str]]) -> pd.DataFrame:
         df = pd.DataFrame(all_candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'volCcy', 'volCcyQuote', 'confirm'])
 
         # Convert all relevant columns to numeric types
@@ -112,14 +187,87 @@ class DataFetcher:
 
         # Drop rows with NaN in critical columns and sort by timestamp
         df.dropna(subset=['timestamp', 'open', 'high', 'low', 'close', 'volume'], inplace=True)
-        df = df.drop_duplicates(subset=['timestamp']).sort_values(by='timestamp', ascending=True).reset_index(drop=True)
+        return df.drop_duplicates(subset=['timestamp']).sort_values(by='timestamp', ascending=True).reset_index(drop=True)
 
+    def fetch_historical_data(self, symbol: str, timeframe: str, limit: int = 300) -> Dict:
+        """
+        Fetches historical candlestick data for a given symbol and timeframe.
+
+        Args:
+            symbol (str): The trading symbol (e.g., 'BTC-USDT').
+            timeframe (str): The timeframe for the candles (e.g., '1D', '4H', '15m').
+            limit (int): The total number of candles to fetch.
+
+        Returns:
+            Dict: A dictionary containing the data.
+
+        Raises:
+            APIError: If the exchange API returns an error.
+            NetworkError: If a network-related error occurs.
+        """
+        api_symbol, api_timeframe = self._api_params(symbol, timeframe)
+        logger.info(f"Fetching {limit} historical data for {symbol} on {timeframe} (API symbol: {api_symbol}, API timeframe: {api_timeframe})...")
+
+        all_candles = []
+        end_timestamp = ''
+
+        logger.info(f"Starting paginated data fetch for {symbol} to get {limit} candles...")
+        while len(all_candles) < limit:
+            # Always fetch the max allowed per request to be efficient
+            logger.info(f"Requesting batch of up to {self.API_MAX_LIMIT}. Have {len(all_candles)}/{limit} candles.")
+            data = self._fetch_page(symbol, api_symbol, api_timeframe, after=end_timestamp)
+            if not data:
+                logger.warning(f"No more data returned from API for {symbol}. Fetched {len(all_candles)} candles.")
+                break # Exit loop if API returns no more data
+
+            all_candles.extend(data)
+            end_timestamp = data[-1][0] # Oldest candle of the page; the next page starts before it
+
+        if not all_candles:
+            raise APIError(f"Failed to fetch any data for {symbol}, it might be an invalid symbol or have no trading history.")
+
+        df = self._to_frame(all_candles)
         if len(df) > limit:
             df = df.tail(limit)
 
         logger.info(f"Successfully fetched a total of {len(df)} candles for {symbol} on {timeframe}.")
         return {"symbol": symbol, "data": df.to_dict('records')}
 
+    def fetch_range(self, symbol: str, timeframe: str, start_ts: int, end_ts: int) -> Dict:
+        """
+        Fetches the candles with start_ts <= timestamp < end_ts (ms), paging
+        backwards from end_ts so only the requested range is downloaded.
+
+        Returns:
+            Dict: {"symbol": ..., "data": [...]} like fetch_historical_data; the
+            data may be empty if the exchange has no candles in the range.
+
+        Raises:
+            APIError: If the exchange API returns an error.
+            NetworkError: If a network-related error occurs.
+        """
+        api_symbol, api_timeframe = self._api_params(symbol, timeframe)
+        logger.info(f"Fetching {symbol} {timeframe} candles in [{start_ts}, {end_ts})...")
+
+        all_candles = []
+        cursor = str(end_ts)
+        while True:
+            data = self._fetch_page(symbol, api_symbol, api_timeframe, after=cursor)
+            if not data:
+                break
+            all_candles.extend(data)
+            oldest = int(data[-1][0])
+            if oldest <= start_ts or str(oldest) == cursor:
+                break
+            cursor = str(oldest)
+
+        if not all_candles:
+            return {"symbol": symbol, "data": []}
+        df = self._to_frame(all_candles)
+        df = df[(df['timestamp'] >= start_ts) & (df['timestamp'] < end_ts)]
+        logger.info(f"Fetched {len(df)} candles for {symbol} on {timeframe} in the requested range.")
+        return {"symbol": symbol, "data": df.to_dict('records')}
+
 
 if __name__ == '__main__':
     # To run this script directly for testing, you must execute it as a module
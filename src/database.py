@@ -1,10 +1,62 @@
 import sqlite3
 import logging
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from itertools import repeat
+from typing import Iterable, List, Dict, Any, Optional, Sequence, Tuple
+
+from src.utils.timeframe_util import timeframe_to_ms
 
 logger = logging.getLogger(__name__)
 
+# Storage engines accepted by create_database_manager().
+STORAGE_ENGINES = ('rows', 'chunked')
+
+# Clustered on the primary key, so a series is stored contiguously in
+# timestamp order and range reads are a single B-tree seek plus a scan.
+CANDLES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        symbol TEXT NOT NULL,
+        timeframe TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        open REAL NOT NULL,
+        high REAL NOT NULL,
+        low REAL NOT NULL,
+        close REAL NOT NULL,
+        volume REAL NOT NULL,
+        PRIMARY KEY (symbol, timeframe, timestamp)
+    ) WITHOUT ROWID
+'''
+
+CANDLE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# SQLite caps the number of terms in a compound SELECT (500 by default).
+BATCH_READ_MAX_SERIES = 200
+
+CACHE_METADATA_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cache_metadata (
+        symbol TEXT NOT NULL,
+        timeframe TEXT NOT NULL,
+        last_updated TIMESTAMP NOT NULL,
+        ttl_hours INTEGER NOT NULL,
+        last_accessed TIMESTAMP,
+        PRIMARY KEY (symbol, timeframe)
+    )
+'''
+
+# Missing candle ranges found by refresh_gap_index(): candles in
+# [start_ts, end_ts) are expected from the bar spacing but not stored.
+CANDLE_GAPS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS candle_gaps (
+        symbol TEXT NOT NULL,
+        timeframe TEXT NOT NULL,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_attempt TIMESTAMP,
+        PRIMARY KEY (symbol, timeframe, start_ts)
+    ) WITHOUT ROWID
+'''
+
 class DatabaseManager:
     """
     Manages all interactions with the SQLite database for caching.
@@ -20,6 +72,9 @@ class DatabaseManager:
         try:
             self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self._conn.row_factory = sqlite3.Row
+            # Lets cache maintenance return freed pages without a full VACUUM.
+            # Takes effect for new files; existing ones are converted by compact().
+            self._conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
             logger.info(f"Successfully connected to database: {self.db_path}")
         except sqlite3.Error as e:
             logger.error(f"Error connecting to database {self.db_path}: {e}")
@@ -31,76 +86,236 @@ class DatabaseManager:
             return
         try:
             with self._conn:
-                self._conn.execute('''
-                    CREATE TABLE IF NOT EXISTS candles (
-                        symbol TEXT NOT NULL,
-                        timeframe TEXT NOT NULL,
-                        timestamp INTEGER NOT NULL,
-                        open REAL NOT NULL,
-                        high REAL NOT NULL,
-                        low REAL NOT NULL,
-                        close REAL NOT NULL,
-                        volume REAL NOT NULL,
-                        PRIMARY KEY (symbol, timeframe, timestamp)
-                    )
-                ''')
-                self._conn.execute('''
-                    CREATE TABLE IF NOT EXISTS cache_metadata (
-                        symbol TEXT NOT NULL,
-                        timeframe TEXT NOT NULL,
-                        last_updated TIMESTAMP NOT NULL,
-                        ttl_hours INTEGER NOT NULL,
-                        PRIMARY KEY (symbol, timeframe)
-                    )
-                ''')
+                self._conn.execute(CANDLES_SCHEMA.format(table='candles'))
+                self._conn.execute(CACHE_METADATA_SCHEMA)
+                self._conn.execute(CANDLE_GAPS_SCHEMA)
+            self._migrate_candles_to_without_rowid()
+            self._migrate_cache_metadata()
             logger.info("Database tables initialized successfully.")
         except sqlite3.Error as e:
             logger.error(f"Error initializing database tables: {e}")
 
-    def get_candles(self, symbol: str, timeframe: str, limit: int = 1000) -> List[Dict[str, Any]]:
-        """Retrieves candle data from the database."""
+    def _migrate_candles_to_without_rowid(self):
+        """
+        Rebuilds a `candles` table created by older versions (a rowid table with a
+        separate primary key index) as a WITHOUT ROWID table clustered on the key.
+        """
+        row = self._conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'candles'").fetchone()
+        if row is None or 'WITHOUT ROWID' in row['sql'].upper():
+            return
+        logger.info(f"Migrating candles table in {self.db_path} to a WITHOUT ROWID layout...")
+        with self._conn:
+            self._conn.execute('DROP TABLE IF EXISTS candles_migration')
+            self._conn.execute(CANDLES_SCHEMA.format(table='candles_migration'))
+            self._conn.execute('''
+                INSERT OR IGNORE INTO candles_migration (symbol, timeframe, timestamp, open, high, low, close, volume)
+                SELECT symbol, timeframe, timestamp, open, high, low, close, volume FROM candles
+                ORDER BY symbol, timeframe, timestamp
+            ''')
+            self._conn.execute('DROP TABLE candles')
+            self._conn.execute('ALTER TABLE candles_migration RENAME TO candles')
+        # Return the old table's pages to the filesystem (and apply auto_vacuum).
+        self._conn.execute('VACUUM')
+        logger.info("Candles table migration complete.")
+
+    def _migrate_cache_metadata(self):
+        """Adds the `last_accessed` column to cache_metadata tables from older versions."""
+        columns = [row['name'] for row in self._conn.execute('PRAGMA table_info(cache_metadata)')]
+        if 'last_accessed' not in columns:
+            with self._conn:
+                self._conn.execute('ALTER TABLE cache_metadata ADD COLUMN last_accessed TIMESTAMP')
+
+    @staticmethod
+    def _range_query(start_ts: Optional[int], end_ts: Optional[int]) -> Tuple[str, List[Any], str]:
+        """Builds the timestamp filter and sort order for a range read (see get_candles)."""
+        conditions, params = [], []
+        if start_ts is not None:
+            conditions.append('timestamp >= ?')
+            params.append(start_ts)
+        if end_ts is not None:
+            conditions.append('timestamp < ?')
+            params.append(end_ts)
+        where = ''.join(f' AND {condition}' for condition in conditions)
+        return where, params, 'ASC' if start_ts is not None else 'DESC'
+
+    def get_candles(self, symbol: str, timeframe: str, limit: int = 1000,
+                    start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieves candle data from the database, in ascending timestamp order.
+
+        Without `start_ts`, returns the last `limit` candles before `end_ts` (or the
+        latest ones). With `start_ts`, returns the first `limit` candles at or after
+        it (and before `end_ts`, if given). Both are a single seek on the primary key.
+        """
         if not self._conn:
             return []
+        where, params, order = self._range_query(start_ts, end_ts)
         try:
-            with self._conn:
-                cursor = self._conn.execute(
-                    '''
-                    SELECT timestamp, open, high, low, close, volume FROM candles
-                    WHERE symbol = ? AND timeframe = ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                    ''',
-                    (symbol, timeframe, limit)
-                )
-                rows = cursor.fetchall()
-                # Return in ascending order as expected by analyzers
-                return [dict(row) for row in reversed(rows)]
+            cursor = self._conn.cursor()
+            # Plain tuples: building dicts from sqlite3.Row is several times slower.
+            cursor.row_factory = None
+            rows = cursor.execute(
+                f'''
+                SELECT timestamp, open, high, low, close, volume FROM candles
+                WHERE symbol = ? AND timeframe = ?{where}
+                ORDER BY timestamp {order}
+                LIMIT ?
+                ''',
+                (symbol, timeframe, *params, limit)
+            ).fetchall()
         except sqlite3.Error as e:
             logger.error(f"Error getting candles for {symbol}-{timeframe}: {e}")
             return []
+        if order == 'DESC':
+            # Return in ascending order as expected by analyzers
+            rows.reverse()
+        return [dict(zip(CANDLE_FIELDS, row)) for row in rows]
+
+    def get_candles_batch(self, series: Iterable[Tuple[str, str]], limit: int = 1000,
+                          start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """
+        Reads several (symbol, timeframe) series with one statement per
+        BATCH_READ_MAX_SERIES series, with the same range semantics as get_candles.
+
+        Returns:
+            {(symbol, timeframe): [candle, ...]} with an entry for every requested series.
+        """
+        series = list(dict.fromkeys(series))
+        result: Dict[Tuple[str, str], List[Dict[str, Any]]] = {key: [] for key in series}
+        if not self._conn or not series:
+            return result
+        where, params, order = self._range_query(start_ts, end_ts)
+        branch = f'''
+            SELECT * FROM (
+                SELECT symbol, timeframe, timestamp, open, high, low, close, volume FROM candles
+                WHERE symbol = ? AND timeframe = ?{where}
+                ORDER BY timestamp {order}
+                LIMIT ?
+            )
+        '''
+        try:
+            cursor = self._conn.cursor()
+            cursor.row_factory = None
+            for offset in range(0, len(series), BATCH_READ_MAX_SERIES):
+                group = series[offset:offset + BATCH_READ_MAX_SERIES]
+                sql = ' UNION ALL '.join([branch] * len(group))
+                group_params = [value for symbol, timeframe in group for value in (symbol, timeframe, *params, limit)]
+                for row in cursor.execute(sql, group_params):
+                    result[(row[0], row[1])].append(dict(zip(CANDLE_FIELDS, row[2:])))
+        except sqlite3.Error as e:
+            logger.error(f"Error batch reading candles for {len(series)} series: {e}")
+            return {key: [] for key in series}
+        if order == 'DESC':
+            for candles in result.values():
+                candles.reverse()
+        return result
 
     def save_candles(self, symbol: str, timeframe: str, candles: List[Dict[str, Any]], ttl_hours: int):
         """Saves a batch of candle data to the database, ignoring duplicates."""
         if not self._conn or not candles:
             return
 
-        candle_data = [
-            (symbol, timeframe, int(c['timestamp']), float(c['open']), float(c['high']), float(c['low']), float(c['close']), float(c['volume']))
-            for c in candles
-        ]
+        try:
+            with self._conn:
+                self._insert_candles(symbol, timeframe, candles)
+            self.update_cache_metadata(symbol, timeframe, ttl_hours)
+        except sqlite3.Error as e:
+            logger.error(f"Error saving candles for {symbol}-{timeframe}: {e}")
+
+    def save_candles_many(self, writes: Iterable[Tuple[str, str, List[Dict[str, Any]], Optional[int], datetime]]):
+        """
+        Saves candles and metadata for several series in one transaction.
+
+        Each write is (symbol, timeframe, candles, ttl_hours, updated_at) and
+        writes are applied in order. Duplicate candles are ignored. A write with
+        ttl_hours=None (e.g. streamed bars) only refreshes existing metadata and
+        never marks a series as cached on its own.
 
+        Raises:
+            sqlite3.Error: If the transaction fails; nothing is written then.
+        """
+        if not self._conn:
+            return
+        writes = list(writes)
         try:
             with self._conn:
+                for symbol, timeframe, candles, _, _ in writes:
+                    if candles:
+                        self._insert_candles(symbol, timeframe, candles)
                 self._conn.executemany(
                     '''
-                    INSERT OR IGNORE INTO candles (symbol, timeframe, timestamp, open, high, low, close, volume)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO cache_metadata (symbol, timeframe, last_updated, ttl_hours)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (symbol, timeframe)
+                    DO UPDATE SET last_updated = excluded.last_updated, ttl_hours = excluded.ttl_hours
                     ''',
-                    candle_data
+                    [(symbol, timeframe, updated_at, ttl_hours)
+                     for symbol, timeframe, _, ttl_hours, updated_at in writes if ttl_hours is not None]
+                )
+                self._conn.executemany(
+                    'UPDATE cache_metadata SET last_updated = ? WHERE symbol = ? AND timeframe = ?',
+                    [(updated_at, symbol, timeframe)
+                     for symbol, timeframe, _, ttl_hours, updated_at in writes if ttl_hours is None]
                 )
-            self.update_cache_metadata(symbol, timeframe, ttl_hours)
         except sqlite3.Error as e:
-            logger.error(f"Error saving candles for {symbol}-{timeframe}: {e}")
+            logger.error(f"Error saving a batch of {len(writes)} series writes: {e}")
+            raise
+
+    def _insert_candles(self, symbol: str, timeframe: str, candles: List[Dict[str, Any]]):
+        self._conn.executemany(
+            '''
+            INSERT OR IGNORE INTO candles (symbol, timeframe, timestamp, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            [(symbol, timeframe, int(c['timestamp']), float(c['open']), float(c['high']),
+              float(c['low']), float(c['close']), float(c['volume'])) for c in candles]
+        )
+
+    def enable_wal(self):
+        """
+        Switches the database to write-ahead logging, so readers are not blocked by
+        a writer. synchronous=NORMAL on this connection skips the fsync per commit;
+        a power loss can drop the last commits but never corrupts the file.
+        """
+        if not self._conn:
+            return
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        except sqlite3.Error as e:
+            logger.warning(f"Could not enable WAL for {self.db_path}: {e}")
+
+    def set_busy_timeout(self, seconds: float):
+        """Makes writes on this connection wait up to `seconds` for another connection's lock."""
+        if not self._conn:
+            return
+        self._conn.execute(f'PRAGMA busy_timeout = {int(seconds * 1000)}')
+
+    def bulk_insert_candles(self, symbol: str, timeframe: str, batches: Iterable[Sequence[Sequence]]) -> int:
+        """
+        Inserts candles for one series in a single transaction, ignoring duplicates.
+
+        Each batch is columnar: a (timestamps, opens, highs, lows, closes, volumes)
+        tuple of equally long sequences.
+
+        Returns:
+            The number of rows actually inserted.
+        """
+        if not self._conn:
+            return 0
+        sql = '''
+            INSERT OR IGNORE INTO candles (symbol, timeframe, timestamp, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        changes_before = self._conn.total_changes
+        try:
+            with self._conn:
+                for batch in batches:
+                    self._conn.executemany(sql, zip(repeat(symbol), repeat(timeframe), *batch))
+        except sqlite3.Error as e:
+            logger.error(f"Error bulk inserting candles for {symbol}-{timeframe}: {e}")
+            raise
+        return self._conn.total_changes - changes_before
 
     def get_cache_metadata(self, symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
         """Retrieves cache metadata for a given symbol and timeframe."""
@@ -126,16 +341,263 @@ class DatabaseManager:
             with self._conn:
                 self._conn.execute(
                     '''
-                    INSERT OR REPLACE INTO cache_metadata (symbol, timeframe, last_updated, ttl_hours)
+                    INSERT INTO cache_metadata (symbol, timeframe, last_updated, ttl_hours)
                     VALUES (?, ?, ?, ?)
+                    ON CONFLICT (symbol, timeframe)
+                    DO UPDATE SET last_updated = excluded.last_updated, ttl_hours = excluded.ttl_hours
                     ''',
                     (symbol, timeframe, datetime.utcnow(), ttl_hours)
                 )
         except sqlite3.Error as e:
             logger.error(f"Error updating metadata for {symbol}-{timeframe}: {e}")
 
+    def list_series(self) -> List[Dict[str, Any]]:
+        """
+        Lists every stored series with its candle count and cache metadata
+        (last_updated, last_accessed; None for series without metadata).
+        """
+        if not self._conn:
+            return []
+        rows = self._conn.execute(
+            '''
+            SELECT c.symbol, c.timeframe, c.count, m.last_updated, m.last_accessed
+            FROM (SELECT symbol, timeframe, COUNT(*) AS count FROM candles GROUP BY symbol, timeframe) c
+            LEFT JOIN cache_metadata m ON m.symbol = c.symbol AND m.timeframe = c.timeframe
+            '''
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def touch_series(self, accessed: Dict[Tuple[str, str], datetime]):
+        """Records when series were last read (used for LRU eviction)."""
+        if not self._conn or not accessed:
+            return
+        with self._conn:
+            self._conn.executemany(
+                'UPDATE cache_metadata SET last_accessed = ? WHERE symbol = ? AND timeframe = ?',
+                [(when, symbol, timeframe) for (symbol, timeframe), when in accessed.items()]
+            )
+
+    def nth_latest_timestamp(self, symbol: str, timeframe: str, n: int) -> Optional[int]:
+        """Returns the timestamp of the n-th newest candle, or None if the series is shorter."""
+        if not self._conn or n <= 0:
+            return None
+        row = self._conn.execute(
+            '''
+            SELECT timestamp FROM candles WHERE symbol = ? AND timeframe = ?
+            ORDER BY timestamp DESC LIMIT 1 OFFSET ?
+            ''',
+            (symbol, timeframe, n - 1)
+        ).fetchone()
+        return row['timestamp'] if row else None
+
+    def delete_candles_before(self, symbol: str, timeframe: str, cutoff_ts: int) -> int:
+        """Deletes the candles of a series older than `cutoff_ts`. Returns the number deleted."""
+        if not self._conn:
+            return 0
+        with self._conn:
+            cursor = self._conn.execute(
+                'DELETE FROM candles WHERE symbol = ? AND timeframe = ? AND timestamp < ?',
+                (symbol, timeframe, cutoff_ts)
+            )
+        return cursor.rowcount
+
+    def drop_series(self, symbol: str, timeframe: str) -> int:
+        """Deletes a series and its metadata. Returns the number of candles deleted."""
+        if not self._conn:
+            return 0
+        with self._conn:
+            cursor = self._conn.execute('DELETE FROM candles WHERE symbol = ? AND timeframe = ?', (symbol, timeframe))
+            self._conn.execute('DELETE FROM cache_metadata WHERE symbol = ? AND timeframe = ?', (symbol, timeframe))
+            self._conn.execute('DELETE FROM candle_gaps WHERE symbol = ? AND timeframe = ?', (symbol, timeframe))
+        return cursor.rowcount
+
+    def page_stats(self) -> Dict[str, int]:
+        """Returns the file's page_size, page_count and freelist_count."""
+        if not self._conn:
+            return {'page_size': 0, 'page_count': 0, 'freelist_count': 0}
+        return {
+            name: self._conn.execute(f'PRAGMA {name}').fetchone()[0]
+            for name in ('page_size', 'page_count', 'freelist_count')
+        }
+
+    def find_gaps(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> List[Tuple[str, str, int, int]]:
+        """
+        Finds missing candles from the expected bar spacing of each timeframe.
+
+        Each series is streamed in primary-key order and its timestamps are
+        diffed in Python: a sequential scan of the clustered table, about three
+        times faster than an SQLite LAG() window query over the same rows.
+
+        Returns:
+            (symbol, timeframe, start_ts, end_ts) tuples: candles in
+            [start_ts, end_ts) are missing between two stored candles.
+        """
+        if not self._conn:
+            return []
+        if symbol is not None:
+            series = [(symbol, timeframe)]
+        else:
+            series = [tuple(row) for row in self._conn.execute('SELECT DISTINCT symbol, timeframe FROM candles')]
+        cursor = self._conn.cursor()
+        cursor.row_factory = None
+        gaps = []
+        for series_symbol, series_timeframe in series:
+            try:
+                step = timeframe_to_ms(series_timeframe)
+            except ValueError:
+                continue
+            timestamps = [row[0] for row in cursor.execute(
+                'SELECT timestamp FROM candles WHERE symbol = ? AND timeframe = ? ORDER BY timestamp',
+                (series_symbol, series_timeframe)
+            )]
+            gaps.extend(
+                (series_symbol, series_timeframe, earlier + step, later)
+                for earlier, later in zip(timestamps, timestamps[1:]) if later - earlier > step
+            )
+        return gaps
+
+    def refresh_gap_index(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> List[Tuple[str, str, int, int]]:
+        """
+        Recomputes the gap index for one series, or for the whole store.
+
+        Gaps that are still open keep their backfill attempt count; gaps that
+        have been filled are removed.
+
+        Returns:
+            The open gaps in the refreshed scope (see find_gaps).
+        """
+        if not self._conn:
+            return []
+        gaps = self.find_gaps(symbol, timeframe)
+        scope, params = '', []
+        if symbol is not None:
+            scope, params = 'WHERE symbol = ? AND timeframe = ?', [symbol, timeframe]
+        with self._conn:
+            self._conn.execute('CREATE TEMP TABLE IF NOT EXISTS found_gaps (symbol TEXT, timeframe TEXT, start_ts INTEGER, end_ts INTEGER)')
+            self._conn.execute('DELETE FROM found_gaps')
+            self._conn.executemany('INSERT INTO found_gaps VALUES (?, ?, ?, ?)', gaps)
+            self._conn.execute(
+                f'''
+                DELETE FROM candle_gaps {scope}{' AND' if scope else 'WHERE'} (symbol, timeframe, start_ts) NOT IN
+                    (SELECT symbol, timeframe, start_ts FROM found_gaps)
+                ''',
+                params
+            )
+            self._conn.execute(
+                '''
+                INSERT INTO candle_gaps (symbol, timeframe, start_ts, end_ts)
+                SELECT symbol, timeframe, start_ts, end_ts FROM found_gaps WHERE true
+                ON CONFLICT (symbol, timeframe, start_ts) DO UPDATE SET end_ts = excluded.end_ts
+                '''
+            )
+            self._conn.execute('DELETE FROM found_gaps')
+        return gaps
+
+    def get_gaps(self, max_attempts: Optional[int] = None, limit: Optional[int] = None,
+                 symbol: Optional[str] = None, timeframe: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Returns indexed gaps, of one series or of the whole store, least attempted and newest first."""
+        if not self._conn:
+            return []
+        conditions, params = [], []
+        if max_attempts is not None:
+            conditions.append('attempts < ?')
+            params.append(max_attempts)
+        if symbol is not None:
+            conditions.append('symbol = ? AND timeframe = ?')
+            params.extend((symbol, timeframe))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self._conn.execute(
+            f'''
+            SELECT symbol, timeframe, start_ts, end_ts, attempts, last_attempt FROM candle_gaps {where}
+            ORDER BY attempts ASC, end_ts DESC LIMIT ?
+            ''',
+            (*params, -1 if limit is None else limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def record_gap_attempt(self, symbol: str, timeframe: str, start_ts: int):
+        """Counts a backfill attempt for a gap that is still open."""
+        if not self._conn:
+            return
+        with self._conn:
+            self._conn.execute(
+                '''
+                UPDATE candle_gaps SET attempts = attempts + 1, last_attempt = ?
+                WHERE symbol = ? AND timeframe = ? AND start_ts = ?
+                ''',
+                (datetime.utcnow(), symbol, timeframe, start_ts)
+            )
+
+    def record_refetched_gaps(self, symbol: str, timeframe: str, gaps: Iterable[Tuple[int, int]]):
+        """
+        Counts an attempt for each (start_ts, end_ts) gap that a fresh fetch of
+        the series came back with, indexing gaps that were not indexed yet.
+        """
+        if not self._conn:
+            return
+        now = datetime.utcnow()
+        with self._conn:
+            self._conn.executemany(
+                '''
+                INSERT INTO candle_gaps (symbol, timeframe, start_ts, end_ts, attempts, last_attempt)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (symbol, timeframe, start_ts) DO UPDATE
+                SET end_ts = excluded.end_ts, attempts = attempts + 1, last_attempt = excluded.last_attempt
+                ''',
+                [(symbol, timeframe, start_ts, end_ts, now) for start_ts, end_ts in gaps]
+            )
+
+    def compact(self, step_pages: int = 1024) -> int:
+        """
+        Returns free pages to the filesystem and checkpoints the WAL.
+
+        Pages are released with incremental_vacuum in steps of `step_pages`, each
+        its own short write, so readers (in WAL mode) are never blocked. A file
+        created before auto_vacuum was enabled is converted once with a VACUUM,
+        which does block: other connections cannot write until it finishes
+        (the write-behind writer waits for it, see CandleWriter).
+
+        Returns:
+            The number of pages released.
+        """
+        if not self._conn:
+            return 0
+        before = self.page_stats()['page_count']
+        if self._conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            logger.info(f"Converting {self.db_path} to incremental auto_vacuum (one-time VACUUM)...")
+            self._conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            self._conn.execute('VACUUM')
+        else:
+            while True:
+                free = self.page_stats()['freelist_count']
+                if not free:
+                    break
+                self._conn.execute(f'PRAGMA incremental_vacuum({min(free, step_pages)})').fetchall()
+                if self.page_stats()['freelist_count'] >= free:
+                    break
+        # PASSIVE never waits on readers; whatever it cannot copy is picked up next time.
+        self._conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+        return max(before - self.page_stats()['page_count'], 0)
+
     def close(self):
         """Closes the database connection."""
         if self._conn:
             self._conn.close()
-            logger.info("Database connection closed.")
\ No newline at end of file
+            logger.info("Database connection closed.")
+
+def create_database_manager(db_path: str = 'data/cache.db', storage: str = 'rows') -> DatabaseManager:
+    """
+    Creates the candle store for a storage engine.
+
+    - 'rows': one SQLite row per candle (DatabaseManager).
+    - 'chunked': compressed columnar chunks (ChunkedDatabaseManager).
+
+    Raises:
+        ValueError: If the storage engine is unknown.
+    """
+    if storage == 'rows':
+        return DatabaseManager(db_path)
+    if storage == 'chunked':
+        from src.chunk_store import ChunkedDatabaseManager
+        return ChunkedDatabaseManager(db_path)
+    raise ValueError(f"Unknown storage engine '{storage}'. Expected one of {STORAGE_ENGINES}.")
@@ -0,0 +1,314 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PERIODIC = 10
+PRIORITY_BACKFILL = 20
+
+# Job states. Queued and leased jobs are "active"; only one active job may hold a dedupe key.
+QUEUED, LEASED, DONE, FAILED = 'queued', 'leased', 'done', 'failed'
+
+JOBS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        dedupe_key TEXT,
+        priority INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL,
+        lease_owner TEXT,
+        lease_expires REAL,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        last_error TEXT
+    )
+'''
+JOBS_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_key ON jobs (dedupe_key) "
+    "WHERE dedupe_key IS NOT NULL AND state IN ('queued', 'leased')",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (state, priority, available_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at) WHERE finished_at IS NOT NULL",
+)
+
+JobHandler = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+
+class JobQueue:
+    """
+    A durable job queue in SQLite, safe to share between threads and processes.
+
+    - `enqueue` adds a job with a priority (PRIORITY_*). A job with a
+      `dedupe_key` is not added while another job with that key is queued or
+      running; the existing job is kept and takes the higher priority.
+    - `claim` leases the most urgent ready jobs for `lease_seconds`. A job
+      whose lease expires (its worker crashed or hung) is claimed again.
+    - `complete` finishes a job; `fail` schedules a retry with exponential
+      backoff, or marks the job failed after `max_attempts`.
+    - `stats` reports depth, queue latency and throughput.
+
+    Claims run in IMMEDIATE transactions, so concurrent workers never lease
+    the same job.
+    """
+    def __init__(self, db_path: str = 'data/jobs.db', lease_seconds: float = 60.0, max_attempts: int = 5,
+                 backoff_base: float = 5.0, backoff_max: float = 600.0, clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(JOBS_SCHEMA)
+        for statement in JOBS_INDEXES:
+            self._conn.execute(statement)
+
+    def _transaction(self, sql_statements: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = sql_statements(self._conn)
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return result
+
+    def enqueue(self, kind: str, payload: Optional[Dict[str, Any]] = None, priority: int = PRIORITY_PERIODIC,
+                dedupe_key: Optional[str] = None, delay: float = 0.0) -> int:
+        """Adds a job (or keeps the active job with the same dedupe key) and returns its id."""
+        now = self._clock()
+
+        def insert(conn: sqlite3.Connection) -> int:
+            if dedupe_key is not None:
+                row = conn.execute("SELECT id, priority FROM jobs WHERE dedupe_key = ? AND state IN (?, ?)",
+                                   (dedupe_key, QUEUED, LEASED)).fetchone()
+                if row is not None:
+                    if priority < row['priority']:
+                        conn.execute('UPDATE jobs SET priority = ? WHERE id = ?', (priority, row['id']))
+                    return row['id']
+            cursor = conn.execute(
+                'INSERT INTO jobs (kind, dedupe_key, priority, payload, state, available_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (kind, dedupe_key, priority, json.dumps(payload or {}), QUEUED, now + delay, now)
+            )
+            return cursor.lastrowid
+
+        return self._transaction(insert)
+
+    def claim(self, worker_id: str, limit: int = 1, kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Leases up to `limit` ready jobs, most urgent first, and returns them as
+        dicts with 'id', 'kind', 'payload', 'priority', 'attempts' and 'created_at'.
+        """
+        now = self._clock()
+        kinds = list(kinds) if kinds is not None else None
+        kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})" if kinds else ''
+
+        def lease(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            rows = conn.execute(
+                'SELECT id, kind, payload, priority, attempts, created_at FROM jobs '
+                f'WHERE ((state = ? AND available_at <= ?) OR (state = ? AND lease_expires <= ?)){kind_filter} '
+                'ORDER BY priority, available_at, id LIMIT ?',
+                (QUEUED, now, LEASED, now, *(kinds or ()), limit)
+            ).fetchall()
+            jobs = []
+            for row in rows:
+                conn.execute(
+                    'UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, '
+                    'started_at = COALESCE(started_at, ?) WHERE id = ?',
+                    (LEASED, worker_id, now + self.lease_seconds, now, row['id'])
+                )
+                jobs.append({'id': row['id'], 'kind': row['kind'], 'payload': json.loads(row['payload']),
+                             'priority': row['priority'], 'attempts': row['attempts'] + 1,
+                             'created_at': row['created_at']})
+            return jobs
+
+        return self._transaction(lease)
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extends a lease. Returns False if the worker no longer holds it."""
+        def extend(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute('UPDATE jobs SET lease_expires = ? WHERE id = ? AND state = ? AND lease_owner = ?',
+                                  (self._clock() + self.lease_seconds, job_id, LEASED, worker_id))
+            return cursor.rowcount == 1
+        return self._transaction(extend)
+
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        """Marks a leased job done. Returns False if the worker no longer holds the lease."""
+        def finish(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                'UPDATE jobs SET state = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL '
+                'WHERE id = ? AND state = ? AND lease_owner = ?',
+                (DONE, self._clock(), job_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+        return self._transaction(finish)
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> Optional[str]:
+        """
+        Records a failed attempt: the job is retried after a backoff, or marked
+        failed once it used `max_attempts`. Returns the new state, or None if
+        the worker no longer holds the lease.
+        """
+        now = self._clock()
+
+        def record(conn: sqlite3.Connection) -> Optional[str]:
+            row = conn.execute('SELECT attempts FROM jobs WHERE id = ? AND state = ? AND lease_owner = ?',
+                               (job_id, LEASED, worker_id)).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] >= self.max_attempts:
+                conn.execute('UPDATE jobs SET state = ?, finished_at = ?, last_error = ?, lease_owner = NULL, '
+                             'lease_expires = NULL WHERE id = ?', (FAILED, now, error, job_id))
+                return FAILED
+            delay = min(self.backoff_base * 2 ** (row['attempts'] - 1), self.backoff_max)
+            conn.execute('UPDATE jobs SET state = ?, available_at = ?, last_error = ?, lease_owner = NULL, '
+                         'lease_expires = NULL WHERE id = ?', (QUEUED, now + delay, error, job_id))
+            return QUEUED
+
+        return self._transaction(record)
+
+    def stats(self, window_seconds: float = 300.0) -> Dict[str, Any]:
+        """
+        Returns {'depth': {state: count}, 'ready': jobs waiting for a worker,
+        'oldest_ready_age': seconds the most overdue ready job has waited,
+        'completed': jobs done in the window, 'throughput': completions per
+        second over the window, 'avg_latency': mean seconds from enqueue to
+        first start for those jobs, 'failed': jobs failed in the window}.
+        """
+        now = self._clock()
+        since = now - window_seconds
+        with self._lock:
+            depth = {row['state']: row['count'] for row in self._conn.execute(
+                'SELECT state, COUNT(*) AS count FROM jobs GROUP BY state')}
+            ready = self._conn.execute(
+                'SELECT COUNT(*) AS count, MIN(available_at) AS oldest FROM jobs WHERE state = ? AND available_at <= ?',
+                (QUEUED, now)).fetchone()
+            done = self._conn.execute(
+                'SELECT COUNT(*) AS count, AVG(started_at - created_at) AS latency FROM jobs '
+                'WHERE state = ? AND finished_at >= ?', (DONE, since)).fetchone()
+            failed = self._conn.execute('SELECT COUNT(*) AS count FROM jobs WHERE state = ? AND finished_at >= ?',
+                                        (FAILED, since)).fetchone()
+        return {
+            'depth': depth,
+            'ready': ready['count'],
+            'oldest_ready_age': now - ready['oldest'] if ready['oldest'] is not None else 0.0,
+            'completed': done['count'],
+            'throughput': done['count'] / window_seconds,
+            'avg_latency': done['latency'] or 0.0,
+            'failed': failed['count'],
+        }
+
+    def purge(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """Deletes done and failed jobs that finished more than `older_than_seconds` ago."""
+        cutoff = self._clock() - older_than_seconds
+        return self._transaction(lambda conn: conn.execute(
+            'DELETE FROM jobs WHERE state IN (?, ?) AND finished_at < ?', (DONE, FAILED, cutoff)).rowcount)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobRunner:
+    """
+    Pulls jobs from a JobQueue and runs them on the event loop, up to
+    `concurrency` at a time.
+
+    `handlers` maps a job kind to a callable taking the payload; it may be a
+    coroutine. Blocking queue calls run on the default executor. Leases are
+    renewed while a job runs; an exception fails the attempt (see JobQueue.fail).
+    Any number of runners, in any number of processes, may share a queue.
+    """
+    def __init__(self, job_queue: JobQueue, handlers: Dict[str, JobHandler], concurrency: int = 4,
+                 poll_interval: float = 1.0, worker_id: Optional[str] = None):
+        self.queue = job_queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{id(self):x}'
+        self._running: set = set()
+        self._stopped = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        """Claims new jobs now instead of after the poll interval."""
+        self._wakeup.set()
+
+    def stop(self):
+        """Stops claiming jobs; `run` returns once the running jobs finish."""
+        self._stopped.set()
+        self._wakeup.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while not self._stopped.is_set():
+            free = self.concurrency - len(self._running)
+            jobs = []
+            if free > 0:
+                try:
+                    jobs = await loop.run_in_executor(None, self.queue.claim, self.worker_id, free, list(self.handlers))
+                except sqlite3.Error as e:
+                    logger.error(f"Could not claim jobs: {e}")
+            for job in jobs:
+                task = asyncio.create_task(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._job_finished)
+            if jobs and len(jobs) == free:
+                # Full: wait for a slot.
+                await self._wakeup.wait()
+            elif not jobs:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+    def _job_finished(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._wakeup.set()
+
+    async def _execute(self, job: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        heartbeat = asyncio.create_task(self._keep_leased(job['id']))
+        try:
+            result = self.handlers[job['kind']](job['payload'])
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            state = await loop.run_in_executor(None, self.queue.fail, job['id'], self.worker_id, f'{type(e).__name__}: {e}')
+            logger.warning(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed: {e}; now {state}.")
+        else:
+            await loop.run_in_executor(None, self.queue.complete, job['id'], self.worker_id)
+        finally:
+            heartbeat.cancel()
+
+    async def _keep_leased(self, job_id: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await loop.run_in_executor(None, self.queue.heartbeat, job_id, self.worker_id):
+                    logger.warning(f"Lost the lease on job {job_id}; another worker may run it again.")
+                    return
+            except sqlite3.Error as e:
+                logger.error(f"Could not renew the lease on job {job_id}: {e}")
@@ -0,0 +1,202 @@
+import logging
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import thaw
+from src.utils.symbol_util import normalize_symbol
+
+if TYPE_CHECKING:
+    from src.cache_manager import CacheManager
+    from src.data_retrieval.data_fetcher import DataFetcher
+    from src.strategies.fibo_analyzer import FiboAnalyzer
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+SIGNALS = ('BUY', 'SELL')
+
+# (symbol, float64 array of shape (bars, 6) in OHLCV_COLUMNS order)
+SeriesBatch = List[Tuple[str, np.ndarray]]
+
+# The analyzer of a pool worker, built once per process by `_init_worker`.
+_worker_analyzer: Optional['FiboAnalyzer'] = None
+_worker_timeframe: Optional[str] = None
+
+
+def _init_worker(config: Dict[str, Any], timeframe: str):
+    global _worker_analyzer, _worker_timeframe
+    from src.strategies.fibo_analyzer import FiboAnalyzer
+    # The analyzer never fetches; scanned data is passed in.
+    _worker_analyzer = FiboAnalyzer(config, None, timeframe=timeframe)
+    _worker_timeframe = timeframe
+
+
+def analyze_batch(batch: SeriesBatch) -> List[Dict[str, Any]]:
+    """
+    Analyzes a batch of series in the current process and returns one summary
+    row per series; series that cannot be analyzed get an 'error' row instead.
+    """
+    import pandas as pd
+
+    rows = []
+    for symbol, ohlcv in batch:
+        try:
+            df = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+            result = _worker_analyzer.get_analysis(df, symbol, _worker_timeframe)
+        except Exception as e:
+            rows.append({'symbol': symbol, 'error': str(e)})
+            continue
+        rows.append({
+            'symbol': symbol,
+            'signal': result.get('signal', 'HOLD'),
+            'trend': result.get('trend', 'N/A'),
+            'confidence': result.get('confidence', 0),
+            'rr_ratio': result.get('rr_ratio', 0.0),
+            'score': result.get('score', 0),
+            'price': float(result.get('current_price', 0)),
+        })
+    return rows
+
+
+def rank(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Orders BUY/SELL setups first, then by confidence and reward/risk ratio."""
+    return sorted(rows, key=lambda row: (row['signal'] in SIGNALS, row['confidence'], row['rr_ratio']), reverse=True)
+
+
+class MarketScanner:
+    """
+    Screens every spot instrument quoted in `quote` for FiboAnalyzer setups on
+    one timeframe.
+
+    Candles are fetched on `fetch_threads` threads through the fetcher's shared
+    rate budget, so the scan never exceeds the exchange limits the bot also
+    depends on. Fetched series are shipped as compact arrays in batches of
+    `batch_size` to a pool of `workers` processes, each holding its own
+    analyzer, and analysis overlaps with the remaining fetches. `workers=0`
+    analyzes in this process.
+
+    With a `cache_manager`, fresh cached series are not fetched and fetched
+    series are cached. The cache is only touched from the calling thread.
+    Series are analyzed without higher-timeframe confirmation.
+    """
+    def __init__(self, config: Dict[str, Any], timeframe: str, fetcher: Optional['DataFetcher'] = None,
+                 cache_manager: Optional['CacheManager'] = None, workers: Optional[int] = None,
+                 batch_size: int = 16, fetch_threads: int = 8, quote: str = 'USDT',
+                 min_volume: float = 0.0, max_instruments: Optional[int] = None):
+        self.config = config
+        self.timeframe = timeframe
+        if fetcher is None:
+            from src.data_retrieval.data_fetcher import DataFetcher
+            fetcher = DataFetcher(config)
+        self.fetcher = fetcher
+        self.cache_manager = cache_manager
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_size = batch_size
+        self.fetch_threads = fetch_threads
+        self.quote = quote
+        self.min_volume = min_volume
+        self.max_instruments = max_instruments
+
+        limits = config.get('trading', {}).get('CANDLE_FETCH_LIMITS', {})
+        self.limit = limits.get(timeframe, limits.get('default', 1000))
+
+    def discover(self) -> List[str]:
+        """Returns the instruments to scan, most traded first."""
+        instruments = [
+            instrument['symbol'] for instrument in self.fetcher.fetch_instruments(self.quote)
+            if instrument['volume_24h'] >= self.min_volume
+        ]
+        return instruments[:self.max_instruments] if self.max_instruments else instruments
+
+    def scan(self, symbols: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Scans `symbols` (default: `discover()`).
+
+        Returns:
+            Dict: {'timeframe', 'scanned', 'analyzed', 'elapsed', 'results', 'failed'},
+            where 'results' are the summary rows in `rank` order and 'failed'
+            lists {'symbol', 'error'} for series that could not be fetched or
+            analyzed.
+        """
+        started = time.perf_counter()
+        symbols = [normalize_symbol(symbol) for symbol in (self.discover() if symbols is None else symbols)]
+        rows: List[Dict[str, Any]] = []
+        failed: List[Dict[str, Any]] = []
+
+        pool = None
+        if self.workers > 0:
+            pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                       initargs=(thaw(self.config), self.timeframe))
+        else:
+            _init_worker(self.config, self.timeframe)
+        analyses: List[Future] = []
+        batch: SeriesBatch = []
+
+        def submit(series: SeriesBatch):
+            if pool is None:
+                rows.extend(analyze_batch(series))
+            else:
+                analyses.append(pool.submit(analyze_batch, series))
+
+        def add(symbol: str, ohlcv: np.ndarray):
+            nonlocal batch
+            batch.append((symbol, ohlcv))
+            if len(batch) >= self.batch_size:
+                submit(batch)
+                batch = []
+
+        try:
+            missing = []
+            for symbol in symbols:
+                cached = self.cache_manager.get(symbol, self.timeframe, limit=self.limit) if self.cache_manager else None
+                if cached:
+                    add(symbol, self._to_array(cached))
+                else:
+                    missing.append(symbol)
+
+            with ThreadPoolExecutor(self.fetch_threads, thread_name_prefix='scanner-fetch') as fetch_pool:
+                fetches = {fetch_pool.submit(self.fetcher.fetch_historical_data, symbol, self.timeframe, self.limit): symbol
+                           for symbol in missing}
+                for future in as_completed(fetches):
+                    symbol = fetches[future]
+                    try:
+                        data = future.result()['data']
+                        ohlcv = self._to_array(data)
+                    except Exception as e:
+                        logger.warning(f"Scanner could not fetch {symbol} on {self.timeframe}: {e}")
+                        failed.append({'symbol': symbol, 'error': str(e)})
+                        continue
+                    if self.cache_manager:
+                        self.cache_manager.set(symbol, self.timeframe, data)
+                    add(symbol, ohlcv)
+            if batch:
+                submit(batch)
+
+            for future in analyses:
+                rows.extend(future.result())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        results = [row for row in rows if 'error' not in row]
+        failed.extend(row for row in rows if 'error' in row)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Scanned {len(symbols)} instruments on {self.timeframe} in {elapsed:.1f}s "
+                    f"({len(results)} analyzed, {len(failed)} failed).")
+        return {
+            'timeframe': self.timeframe,
+            'scanned': len(symbols),
+            'analyzed': len(results),
+            'elapsed': elapsed,
+            'results': rank(results),
+            'failed': failed,
+        }
+
+    @staticmethod
+    def _to_array(candles: List[Dict[str, Any]]) -> np.ndarray:
+        from src.validators import DataValidator
+        return DataValidator.validate_and_clean_dataframe(candles)[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.symbol_util import normalize_symbol
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = 'candle-columns'
+FORMAT_VERSION = 1
+HEADER_FILE = 'header.json'
+
+# Column name -> little-endian numpy dtype. Part of the on-disk schema.
+COLUMNS: Dict[str, str] = {
+    'timestamp': '<i8',
+    'open': '<f8',
+    'high': '<f8',
+    'low': '<f8',
+    'close': '<f8',
+    'volume': '<f8',
+}
+VALUE_COLUMNS = tuple(name for name in COLUMNS if name != 'timestamp')
+
+
+class CandleSeries:
+    """
+    A read-only, memory-mapped view of one series.
+
+    Every column is a numpy.memmap of the committed rows, so slicing returns
+    views into the page cache: nothing is copied or deserialized until the
+    values are actually used. Call `refresh()` to see rows appended later.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.header: Dict[str, Any] = {}
+        self.columns: Dict[str, np.ndarray] = {}
+        self.refresh()
+
+    def refresh(self):
+        """Re-reads the header and maps the currently committed rows."""
+        self.header = _read_header(self.path)
+        count = self.header['count']
+        columns = {}
+        for name, dtype in self.header['columns'].items():
+            if count:
+                columns[name] = np.memmap(os.path.join(self.path, f'{name}.bin'), dtype=dtype, mode='r', shape=(count,))
+            else:
+                columns[name] = np.empty(0, dtype=dtype)
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return self.header['count']
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.columns['timestamp']
+
+    def range(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Returns zero-copy column views for start_ts <= timestamp < end_ts.
+
+        The bounds are found by binary search on the timestamp column, which
+        only touches a handful of pages.
+        """
+        timestamps = self.timestamps
+        start = 0 if start_ts is None else int(np.searchsorted(timestamps, start_ts, side='left'))
+        end = len(timestamps) if end_ts is None else int(np.searchsorted(timestamps, end_ts, side='left'))
+        return {name: column[start:end] for name, column in self.columns.items()}
+
+    def tail(self, n: int) -> Dict[str, np.ndarray]:
+        """Returns zero-copy column views of the last `n` candles."""
+        return {name: column[-n:] if n else column[:0] for name, column in self.columns.items()}
+
+    def to_frame(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> 'pd.DataFrame':
+        """Copies a range into a DataFrame shaped like DataValidator's output."""
+        import pandas as pd
+        columns = self.range(start_ts, end_ts)
+        return pd.DataFrame({name: np.array(column) for name, column in columns.items()})
+
+
+class MmapCandleStore:
+    """
+    Append-only per-series column files for large-scale research reads.
+
+    Layout: <root>/<SYMBOL>/<timeframe>/ holds one raw little-endian file per
+    column (timestamp.bin, open.bin, ...) and header.json with the format name,
+    version, column schema and committed row count.
+
+    Appends write the column files first and then atomically replace the
+    header, so readers never see a partially written row; bytes past the
+    committed count (e.g. after a crash) are discarded on the next append.
+    One writer process per store is assumed.
+    """
+    def __init__(self, root: str = 'data/mmap'):
+        self.root = root
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def series_path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, normalize_symbol(symbol), timeframe)
+
+    def exists(self, symbol: str, timeframe: str) -> bool:
+        return os.path.exists(os.path.join(self.series_path(symbol, timeframe), HEADER_FILE))
+
+    def open(self, symbol: str, timeframe: str) -> CandleSeries:
+        """
+        Maps a series for reading.
+
+        Raises:
+            FileNotFoundError: If the series has never been written.
+            ValueError: If the header has an unknown format or version.
+        """
+        return CandleSeries(self.series_path(symbol, timeframe))
+
+    def _lock_for(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def append(self, symbol: str, timeframe: str, timestamps: Sequence[int], values: Sequence[Sequence[float]]) -> int:
+        """
+        Appends candles newer than the last stored one.
+
+        Args:
+            timestamps: Candle open times in ms, ascending.
+            values: The (open, high, low, close, volume) columns.
+
+        Returns:
+            The number of candles appended. Candles at or before the last stored
+            timestamp are skipped, since the files are append-only.
+        """
+        path = self.series_path(symbol, timeframe)
+        timestamps = np.asarray(timestamps, dtype=COLUMNS['timestamp'])
+        values = np.asarray(values, dtype='<f8').reshape(len(VALUE_COLUMNS), -1)
+        if len(timestamps) != values.shape[1]:
+            raise ValueError("timestamps and values must have the same length.")
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) <= 0):
+            raise ValueError("timestamps must be strictly increasing.")
+
+        with self._lock_for(path):
+            os.makedirs(path, exist_ok=True)
+            try:
+                header = _read_header(path)
+            except FileNotFoundError:
+                header = {
+                    'format': FORMAT_NAME, 'version': FORMAT_VERSION,
+                    'symbol': normalize_symbol(symbol), 'timeframe': timeframe,
+                    'columns': dict(COLUMNS), 'count': 0, 'last_timestamp': None,
+                }
+
+            if header['last_timestamp'] is not None:
+                keep = timestamps > header['last_timestamp']
+                timestamps, values = timestamps[keep], values[:, keep]
+            if not len(timestamps):
+                return 0
+
+            count = header['count']
+            arrays = {'timestamp': timestamps, **dict(zip(VALUE_COLUMNS, values))}
+            for name, dtype in header['columns'].items():
+                column_path = os.path.join(path, f'{name}.bin')
+                with open(column_path, 'ab') as f:
+                    f.truncate(count * np.dtype(dtype).itemsize)
+                    f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            header['count'] = count + len(timestamps)
+            header['last_timestamp'] = int(timestamps[-1])
+            _write_header(path, header)
+        return len(timestamps)
+
+    def append_candles(self, symbol: str, timeframe: str, candles: List[Dict[str, Any]]) -> int:
+        """Appends candle dicts (as returned by DatabaseManager.get_candles)."""
+        if not candles:
+            return 0
+        timestamps = [int(c['timestamp']) for c in candles]
+        values = [[float(c[name]) for c in candles] for name in VALUE_COLUMNS]
+        return self.append(symbol, timeframe, timestamps, values)
+
+    def sync_from_database(self, db: 'DatabaseManager', symbol: str, timeframe: str, limit: int = 10_000_000) -> int:
+        """Appends the candles in `db` that are newer than the mapped series."""
+        start_ts = None
+        if self.exists(symbol, timeframe):
+            last_timestamp = _read_header(self.series_path(symbol, timeframe))['last_timestamp']
+            start_ts = last_timestamp + 1 if last_timestamp is not None else None
+        return self.append_candles(symbol, timeframe, db.get_candles(normalize_symbol(symbol), timeframe, limit, start_ts=start_ts))
+
+
+def _read_header(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, HEADER_FILE), 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    if header.get('format') != FORMAT_NAME or header.get('version') != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported candle column format in {path}: {header.get('format')} v{header.get('version')}."
+        )
+    return header
+
+
+def _write_header(path: str, header: Dict[str, Any]):
+    tmp_path = os.path.join(path, HEADER_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(path, HEADER_FILE))
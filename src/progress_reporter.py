@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """
+    Shows analysis progress by editing a status message, off the critical path.
+
+    `stage()` only records the new status text and returns immediately; a
+    background task performs the edits:
+
+    - a stage is shown only once it has been current for `delay` seconds, so
+      stages that finish quickly never cost a round-trip;
+    - edits are at least `min_interval` seconds apart and rapid stage changes
+      are coalesced into the latest text;
+    - a RetryAfter (flood control) pushes the next edit back instead of failing.
+
+    `close()` stops reporting. An edit already in flight is allowed to finish so
+    it cannot land after whatever the caller sends next.
+    """
+    def __init__(self, send: Callable[[str], Awaitable[Any]], delay: float = 0.7,
+                 min_interval: float = 1.5, clock: Optional[Callable[[], float]] = None):
+        self._send = send
+        self.delay = delay
+        self.min_interval = min_interval
+        self._clock = clock or asyncio.get_running_loop().time
+
+        self._current: Optional[str] = None
+        self._stage_started = 0.0
+        self._last_text: Optional[str] = None
+        self._last_sent = float('-inf')
+        self._changed = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+        self.sent_count = 0
+
+    def stage(self, text: str):
+        """Records the current stage. Never blocks."""
+        if self._closed:
+            return
+        self._current = text
+        self._stage_started = self._clock()
+        self._changed.set()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        """Stops reporting and waits for an in-flight edit, if any, to complete."""
+        self._closed = True
+        self._changed.set()
+        if self._task is not None:
+            await self._task
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            if self._closed:
+                return
+
+            due = max(self._stage_started + self.delay, self._last_sent + self.min_interval)
+            remaining = due - self._clock()
+            if remaining > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), remaining)
+                    # The stage changed (or we were closed) while waiting; re-evaluate.
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            text = self._current
+            if text is not None and text != self._last_text:
+                await self._deliver(text)
+
+    async def _deliver(self, text: str):
+        self._last_sent = self._clock()
+        try:
+            await self._send(text)
+            self._last_text = text
+            self.sent_count += 1
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            logger.warning(f"Progress edit throttled by Telegram; backing off {retry_after}s.")
+            self._last_sent = self._clock() + retry_after
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.warning(f"Progress edit rejected: {e}")
+        except TelegramError as e:
+            logger.warning(f"Progress edit failed: {e}")
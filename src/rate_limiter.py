@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class AsyncRateLimiter:
+    """
+    A token-bucket rate limiter for asyncio callers.
+
+    `rate` tokens are added per second up to `burst`; each `acquire()` takes one
+    token, waiting if none are available. Waiters are served in FIFO order.
+    `pause()` blocks every caller for a while, e.g. after a server-side
+    "retry after" response that applies to the whole client.
+    """
+    def __init__(self, rate: float, burst: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Waits until a token is available and consumes it."""
+        async with self._lock:
+            while True:
+                now = self._clock()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Blocks all callers for `seconds` from now."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        # No tokens accrue while paused, so callers do not burst when it ends.
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+
+class RateLimiter:
+    """
+    The blocking, thread-safe counterpart of AsyncRateLimiter.
+
+    Used by synchronous exchange clients that run on worker threads, so every
+    thread draws from the same token bucket.
+    """
+    def __init__(self, rate: float, burst: Optional[int] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        # Held while waiting, so waiters are served one at a time.
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until a token is available and consumes it."""
+        with self._lock:
+            while True:
+                now = self._clock()
+                if now < self._paused_until:
+                    self._sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                self._sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Blocks all callers for `seconds` from now."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+    def set_rate(self, rate: float, burst: Optional[int] = None):
+        """Changes the budget; tokens accrued so far are kept up to the new burst."""
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        with self._lock:
+            now = self._clock()
+            if now >= self._paused_until:
+                self._refill(now)
+            self.rate = rate
+            self.burst = burst if burst is not None else max(1, int(rate))
+            self._tokens = min(self._tokens, float(self.burst))
+
+
+_shared_limiters: Dict[str, RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter(name: str, rate: float, burst: Optional[int] = None) -> RateLimiter:
+    """
+    Returns the process-wide RateLimiter called `name`, creating it with
+    `rate` and `burst` on first use. Later callers share the first budget;
+    use `set_rate` to change it.
+    """
+    with _shared_lock:
+        limiter = _shared_limiters.get(name)
+        if limiter is None:
+            limiter = RateLimiter(rate, burst)
+            _shared_limiters[name] = limiter
+        return limiter
@@ -1,36 +1,273 @@
+import asyncio
+import inspect
+import random
+import threading
 import time
 import logging
+from collections import deque
 from functools import wraps
+from typing import Callable, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
-def with_retry(max_attempts: int = 3, backoff_factor: float = 1.5, exceptions: tuple = (Exception,)):
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit '{name}' is open; not calling it for another {retry_in:.1f}s.")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an endpoint is down.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    `before_call` raises CircuitOpenError for `recovery_timeout` seconds.
+    Then one trial call is let through (half-open): success closes the
+    circuit, failure opens it again. Thread-safe.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may be made now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            retry_in = self._opened_at + self.recovery_timeout - self._clock()
+            if self._state == self.OPEN and retry_in <= 0:
+                self._state = self.HALF_OPEN
+                self._trial_running = False
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError(self.name, max(retry_in, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed; the endpoint is answering again.")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def release(self):
+        """Ends a call that neither proved nor disproved the endpoint (e.g. a cancelled one)."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                logger.warning(f"Circuit '{self.name}' opened after {self._failures} consecutive failures; "
+                               f"failing fast for {self.recovery_timeout:.0f}s.")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_running = False
+
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of recent traffic, so a partial outage does not
+    multiply the load on the failing service.
+
+    Over the trailing `window` seconds, at most `ratio` retries per first
+    attempt are allowed, plus `min_per_second` so rarely used calls can still
+    retry. Thread-safe.
+    """
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, window: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._clock = clock
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_request(self):
+        """Counts a first attempt."""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """Takes one retry from the budget; returns False if it is exhausted."""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            if len(self._retries) >= len(self._requests) * self.ratio + self.min_per_second * self.window:
+                return False
+            self._retries.append(now)
+            return True
+
+
+def decorrelated_jitter(previous: float, base: float, cap: float) -> float:
+    """
+    The next retry delay: random between `base` and three times the previous
+    delay, capped. Spreads retries of concurrent callers apart instead of
+    retrying them in lockstep.
+    """
+    return min(cap, random.uniform(base, max(base, previous * 3)))
+
+
+def with_retry(max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 20.0,
+               exceptions: tuple = (Exception,), retry_if: Optional[Callable[[Exception], bool]] = None,
+               budget: Optional[RetryBudget] = None, breaker: Optional[CircuitBreaker] = None,
+               sleep: Callable[[float], None] = time.sleep):
     """
-    A decorator to automatically retry a function call upon failure.
+    A decorator to automatically retry a function call upon failure. Works on
+    plain and coroutine functions; coroutines wait with asyncio.sleep.
 
     Args:
         max_attempts: The maximum number of times to try the function.
-        backoff_factor: Multiplier for the delay between retries.
+        base_delay: The shortest delay between attempts; delays grow with
+            decorrelated jitter up to `max_delay`.
         exceptions: A tuple of exception types to catch and trigger a retry.
+        retry_if: Optional predicate; caught exceptions it rejects are raised
+            at once and do not count against the circuit breaker.
+        budget: Optional RetryBudget shared by the callers of a service. When
+            it is exhausted, the failure is raised instead of retried.
+        breaker: Optional CircuitBreaker for the endpoint. While it is open,
+            calls raise CircuitOpenError without reaching the endpoint.
+        sleep: The blocking sleep used by plain functions (for tests).
     """
+    def is_retryable(error: Exception) -> bool:
+        return isinstance(error, exceptions) and (retry_if is None or retry_if(error))
+
+    def should_retry(func, attempts: int, error: Exception) -> bool:
+        if breaker is not None:
+            breaker.record_failure()
+        if attempts >= max_attempts:
+            logger.error(f"Function '{func.__name__}' failed after {max_attempts} attempts. Final error: {error}")
+            return False
+        if budget is not None and not budget.try_spend():
+            logger.error(f"Function '{func.__name__}' failed and the retry budget is exhausted: {error}")
+            return False
+        return True
+
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if budget is not None:
+                    budget.record_request()
+                attempts, delay = 0, base_delay
+                while True:
+                    if breaker is not None:
+                        breaker.before_call()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except exceptions as e:
+                        attempts += 1
+                        if not is_retryable(e):
+                            # The endpoint answered; the error is about the request.
+                            if breaker is not None:
+                                breaker.record_success()
+                            raise
+                        if not should_retry(func, attempts, e):
+                            raise
+                        delay = decorrelated_jitter(delay, base_delay, max_delay)
+                        _log_retry(func, attempts, max_attempts, e, delay)
+                        await asyncio.sleep(delay)
+                        continue
+                    except BaseException:
+                        if breaker is not None:
+                            breaker.release()
+                        raise
+                    if breaker is not None:
+                        breaker.record_success()
+                    return result
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            attempts = 0
-            while attempts < max_attempts:
+            if budget is not None:
+                budget.record_request()
+            attempts, delay = 0, base_delay
+            while True:
+                if breaker is not None:
+                    breaker.before_call()
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
                 except exceptions as e:
                     attempts += 1
-                    if attempts >= max_attempts:
-                        logger.error(f"Function '{func.__name__}' failed after {max_attempts} attempts. Final error: {e}")
+                    if not is_retryable(e):
+                        # The endpoint answered; the error is about the request.
+                        if breaker is not None:
+                            breaker.record_success()
                         raise
-
-                    wait_time = backoff_factor ** attempts
-                    logger.warning(
-                        f"Attempt {attempts}/{max_attempts} for '{func.__name__}' failed with error: {e}. "
-                        f"Retrying in {wait_time:.2f} seconds..."
-                    )
-                    time.sleep(wait_time)
+                    if not should_retry(func, attempts, e):
+                        raise
+                    delay = decorrelated_jitter(delay, base_delay, max_delay)
+                    _log_retry(func, attempts, max_attempts, e, delay)
+                    sleep(delay)
+                    continue
+                except BaseException:
+                    if breaker is not None:
+                        breaker.release()
+                    raise
+                if breaker is not None:
+                    breaker.record_success()
+                return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def _log_retry(func, attempts: int, max_attempts: int, error: Exception, delay: float):
+    logger.warning(
+        f"Attempt {attempts}/{max_attempts} for '{func.__name__}' failed with error: {error}. "
+        f"Retrying in {delay:.2f} seconds..."
+    )
+
+
+_shared_breakers: Dict[str, CircuitBreaker] = {}
+_shared_budgets: Dict[str, RetryBudget] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_circuit_breaker(name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0) -> CircuitBreaker:
+    """Returns the process-wide CircuitBreaker called `name`, creating it on first use."""
+    with _shared_lock:
+        breaker = _shared_breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, failure_threshold, recovery_timeout)
+            _shared_breakers[name] = breaker
+        return breaker
+
+
+def shared_retry_budget(name: str, ratio: float = 0.2, min_per_second: float = 1.0) -> RetryBudget:
+    """Returns the process-wide RetryBudget called `name`, creating it on first use."""
+    with _shared_lock:
+        budget = _shared_budgets.get(name)
+        if budget is None:
+            budget = RetryBudget(ratio, min_per_second)
+            _shared_budgets[name] = budget
+        return budget
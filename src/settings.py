@@ -1,6 +1,6 @@
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Dict, Optional
+from typing import List, Dict, Literal, Optional
 
 class AppSettings(BaseSettings):
     """
@@ -10,12 +10,31 @@ class AppSettings(BaseSettings):
     # Telegram
     BOT_TOKEN: str
     TELEGRAM_ADMIN_CHAT_ID: Optional[int] = None
+    BOT_MODE: Literal['polling', 'webhook'] = 'polling'
+    UPDATE_WORKERS: int = 8
+    PROGRESS_EDIT_DELAY: float = 0.7
+    PROGRESS_MIN_INTERVAL: float = 1.5
+    # Seconds between .env change checks for hot reload; 0 disables (SIGHUP still reloads)
+    CONFIG_WATCH_INTERVAL: float = 0
+
+    # Webhook mode (only used when BOT_MODE=webhook)
+    WEBHOOK_URL: Optional[str] = None
+    WEBHOOK_LISTEN: str = '0.0.0.0'
+    WEBHOOK_PORT: int = 8443
+    WEBHOOK_PATH: str = 'telegram'
+    WEBHOOK_SECRET_TOKEN: Optional[str] = None
 
     # Exchange
     EXCHANGE_API_KEY: str
     EXCHANGE_API_SECRET: str
     EXCHANGE_API_PASSWORD: str
     SANDBOX_MODE: bool = True
+    # REST requests per second shared by every fetcher in the process (OKX history candles: 20 per 2s)
+    EXCHANGE_RATE_LIMIT: float = 10.0
+    # Live candles over WebSocket for the watchlist (URL defaults to the live/demo endpoint)
+    STREAM_ENABLED: bool = False
+    STREAM_TIMEFRAMES: List[str] = ["5m", "15m", "1h"]
+    STREAM_URL: Optional[str] = None
 
     # Trading - with default values
     WATCHLIST: List[str] = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'LINK/USDT', 'DOGE/USDT']
@@ -30,7 +49,57 @@ class AppSettings(BaseSettings):
         "1D": 360
     }
     ANALYSIS_INTERVAL_MINUTES: int = 15
+    ANALYSIS_MAX_CONCURRENCY: int = 4
+    ANALYSIS_PER_USER_INFLIGHT: int = 1
+    ANALYSIS_PER_USER_PENDING: int = 3
+    # Analysis processes, each owning a fixed shard of the symbols; 0 analyzes in the bot process
+    ANALYSIS_WORKERS: int = 0
     TRADE_AMOUNT: str = "0.001"
+    TEMPLATE_AUTO_RELOAD: bool = False
+
+    # Candle cache
+    CACHE_DB_PATH: str = 'data/cache.db'
+    # 'rows' (one SQLite row per candle) or 'chunked' (compressed columnar chunks)
+    CACHE_STORAGE: Literal['rows', 'chunked'] = 'rows'
+    # Persist fetched candles on a background writer instead of in the request
+    CACHE_WRITE_BEHIND: bool = True
+    # Retention per timeframe ('default' applies to the rest); 0 keeps everything
+    CACHE_RETENTION_BARS: Dict[str, int] = {
+        "default": 10000
+    }
+    CACHE_RETENTION_DAYS: Dict[str, int] = {
+        "1m": 30,
+        "5m": 90
+    }
+    # Size budget for live data; least recently read series are evicted beyond it (0 disables)
+    CACHE_MAX_SIZE_MB: int = 512
+    CACHE_MAINTENANCE_INTERVAL_MINUTES: int = 60
+    # Fetch the missing ranges of cached series (0 disables)
+    CACHE_BACKFILL_INTERVAL_MINUTES: int = 30
+    CACHE_BACKFILL_MAX_GAPS: int = 20
+    CACHE_BACKFILL_MAX_ATTEMPTS: int = 3
+    # Answer from expired cached data up to this old while it refreshes (0 always waits for the refresh)
+    CACHE_STALE_MAX_AGE_HOURS: int = 72
+
+    # Alerts
+    SUBSCRIPTIONS_DB_PATH: str = 'data/subscriptions.db'
+    ALERT_GLOBAL_RATE: float = 25.0
+    ALERT_PER_CHAT_INTERVAL: float = 1.0
+    ALERT_SEND_CONCURRENCY: int = 10
+
+    # Durable job queue for periodic analysis and backfill
+    JOBS_DB_PATH: str = 'data/jobs.db'
+    JOB_RUNNER_CONCURRENCY: int = 2
+    JOB_LEASE_SECONDS: float = 120.0
+    JOB_MAX_ATTEMPTS: int = 5
+
+    # Prometheus metrics at http://METRICS_LISTEN:METRICS_PORT/metrics (0 disables the server)
+    METRICS_LISTEN: str = '127.0.0.1'
+    METRICS_PORT: int = 0
+
+    # Share of analysis requests traced span by span into TRACE_FILE (0 disables tracing)
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_FILE: str = 'data/traces.jsonl'
 
     # Risk Management - with default values
     MAX_DRAWDOWN: float = 150.5
@@ -1,9 +1,11 @@
 import pandas as pd
 import logging
 from typing import Dict, Any, List
-from scipy.signal import find_peaks
 from src.data_retrieval.data_fetcher import DataFetcher
 
+from src.config import get_strategy_params
+from src.metrics import STAGE_SECONDS
+from src.tracing import traced
 from src.strategies.base_strategy import BaseStrategy
 from src.strategies.exceptions import InsufficientDataError
 from src.utils.indicators import (
@@ -24,10 +26,7 @@ class FiboAnalyzer(BaseStrategy):
         super().__init__(config)
         self.fetcher = fetcher
 
-        base_params = config.get('strategy_params', {}).get('fibo_strategy', {})
-        timeframe_overrides = base_params.get('timeframe_overrides', {})
-        specific_params = timeframe_overrides.get(timeframe, {})
-        p = {**base_params, **specific_params}
+        p = get_strategy_params(config, 'fibo_strategy', timeframe)
 
         self.sma_fast_period = p.get('sma_period_fast', 50)
         self.sma_slow_period = p.get('sma_period_slow', 200)
@@ -219,6 +218,8 @@ class FiboAnalyzer(BaseStrategy):
 
         return {"scenario1": primary, "scenario2": secondary}
 
+    @traced('swing_search')
+    @STAGE_SECONDS.labels(stage='swing_search').timed
     def _find_recent_swing_points(self, data: pd.DataFrame) -> (Dict, Dict):
         """
         Finds the most recent valid swing high and swing low based on a simple
@@ -279,6 +280,8 @@ class FiboAnalyzer(BaseStrategy):
 
         return swing_high, swing_low
 
+    @traced('prepare_data')
+    @STAGE_SECONDS.labels(stage='prepare_data').timed
     def _prepare_data(self, data: pd.DataFrame) -> pd.DataFrame:
         data['adx'] = calculate_adx(data, window=self.adx_window)
         data['atr'] = calculate_atr(data, window=self.atr_window)
@@ -300,6 +303,8 @@ class FiboAnalyzer(BaseStrategy):
         result.update({"swing_high": p_high, "swing_low": p_low})
         return True
 
+    @traced('scoring')
+    @STAGE_SECONDS.labels(stage='scoring').timed
     def _analyze_fibonacci_and_score(self, data: pd.DataFrame, result: Dict):
         p_high, p_low = result['swing_high'], result['swing_low']
         fibo_trend = 'up' if p_high['index'] > p_low['index'] else 'down'
@@ -375,6 +380,7 @@ class FiboAnalyzer(BaseStrategy):
         levels.sort(key=lambda x: x['level'], reverse=True)
         result['key_levels'] = levels
 
+    @STAGE_SECONDS.labels(stage='analysis').timed
     def get_analysis(self, data: pd.DataFrame, symbol: str, timeframe: str, higher_tf_trend_info: Dict[str, Any] = None) -> Dict[str, Any]:
         # Ensure critical columns are numeric before any calculations
         numeric_cols = ['open', 'high', 'low', 'close', 'volume']
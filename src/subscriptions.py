@@ -0,0 +1,155 @@
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.utils.symbol_util import normalize_symbol
+
+logger = logging.getLogger(__name__)
+
+# 'ANY' matches both BUY and SELL alerts.
+VALID_SIGNALS = ('BUY', 'SELL', 'ANY')
+
+
+class SubscriptionManager:
+    """
+    Stores which chats want alerts for which (symbol, timeframe, signal) combinations.
+
+    Subscriptions are persisted in SQLite and mirrored in an in-memory index
+    keyed by series, so finding the recipients of an alert never touches disk.
+    """
+    def __init__(self, db_path: str = 'data/subscriptions.db'):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # (symbol, timeframe) -> {chat_id: {signal, ...}}
+        self._index: Dict[Tuple[str, str], Dict[int, Set[str]]] = {}
+        self._connect()
+        self._init_db()
+        self._load_index()
+
+    def _connect(self):
+        """Establishes a connection to the SQLite database."""
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            logger.info(f"Successfully connected to subscriptions database: {self.db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Error connecting to subscriptions database {self.db_path}: {e}")
+            raise
+
+    def _init_db(self):
+        """Initializes the database schema if it doesn't exist."""
+        try:
+            with self._conn:
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS subscriptions (
+                        chat_id INTEGER NOT NULL,
+                        symbol TEXT NOT NULL,
+                        timeframe TEXT NOT NULL,
+                        signal TEXT NOT NULL,
+                        created_at TIMESTAMP NOT NULL,
+                        PRIMARY KEY (chat_id, symbol, timeframe, signal)
+                    )
+                ''')
+        except sqlite3.Error as e:
+            logger.error(f"Error initializing subscriptions table: {e}")
+
+    def _load_index(self):
+        try:
+            rows = self._conn.execute('SELECT chat_id, symbol, timeframe, signal FROM subscriptions').fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error loading subscriptions: {e}")
+            return
+        for row in rows:
+            self._index.setdefault((row['symbol'], row['timeframe']), {}).setdefault(row['chat_id'], set()).add(row['signal'])
+        logger.info(f"Loaded {len(rows)} subscriptions.")
+
+    def subscribe(self, chat_id: int, symbol: str, timeframe: str, signal: str = 'ANY') -> bool:
+        """
+        Adds a subscription.
+
+        Returns:
+            True if the subscription was added, False if it already existed.
+
+        Raises:
+            ValueError: If the signal is not one of VALID_SIGNALS.
+        """
+        signal = signal.upper()
+        if signal not in VALID_SIGNALS:
+            raise ValueError(f"Invalid signal '{signal}'. Expected one of {VALID_SIGNALS}.")
+        symbol = normalize_symbol(symbol)
+
+        with self._lock:
+            signals = self._index.get((symbol, timeframe), {}).get(chat_id, set())
+            if signal in signals:
+                return False
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        'INSERT OR IGNORE INTO subscriptions (chat_id, symbol, timeframe, signal, created_at) VALUES (?, ?, ?, ?, ?)',
+                        (chat_id, symbol, timeframe, signal, datetime.utcnow())
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Error saving subscription for chat {chat_id}: {e}")
+                raise
+            self._index.setdefault((symbol, timeframe), {}).setdefault(chat_id, set()).add(signal)
+        return True
+
+    def unsubscribe(self, chat_id: int, symbol: str, timeframe: str, signal: Optional[str] = None) -> int:
+        """
+        Removes a chat's subscription for a series (all signals if `signal` is None).
+
+        Returns:
+            The number of subscriptions removed.
+        """
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            chats = self._index.get((symbol, timeframe), {})
+            signals = chats.get(chat_id, set())
+            to_remove = set(signals) if signal is None else signals & {signal.upper()}
+            if not to_remove:
+                return 0
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        'DELETE FROM subscriptions WHERE chat_id = ? AND symbol = ? AND timeframe = ? AND signal = ?',
+                        [(chat_id, symbol, timeframe, s) for s in to_remove]
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Error removing subscription for chat {chat_id}: {e}")
+                raise
+            signals -= to_remove
+            if not signals:
+                chats.pop(chat_id, None)
+            if not chats:
+                self._index.pop((symbol, timeframe), None)
+        return len(to_remove)
+
+    def remove_chat(self, chat_id: int) -> int:
+        """Removes every subscription of a chat, e.g. after the user blocked the bot."""
+        removed = 0
+        for symbol, timeframe, _ in self.list_for_chat(chat_id):
+            removed += self.unsubscribe(chat_id, symbol, timeframe)
+        return removed
+
+    def list_for_chat(self, chat_id: int) -> List[Tuple[str, str, str]]:
+        """Returns the (symbol, timeframe, signal) subscriptions of a chat."""
+        with self._lock:
+            return sorted(
+                (symbol, timeframe, signal)
+                for (symbol, timeframe), chats in self._index.items()
+                for signal in chats.get(chat_id, ())
+            )
+
+    def subscribers_for(self, symbol: str, timeframe: str, signal: str) -> List[int]:
+        """Returns the chats subscribed to a signal on a series (including 'ANY' subscribers)."""
+        chats = self._index.get((normalize_symbol(symbol), timeframe), {})
+        return [chat_id for chat_id, signals in list(chats.items()) if signal in signals or 'ANY' in signals]
+
+    def close(self):
+        """Closes the database connection."""
+        if self._conn:
+            self._conn.close()
+            logger.info("Subscriptions database connection closed.")
@@ -2,7 +2,14 @@ import logging
 import asyncio
 import os
 import json
+import functools
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Tuple
+import anyio
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.error import BadRequest
 from telegram.constants import ParseMode
@@ -13,20 +20,39 @@ from telegram.ext import (
     ConversationHandler,
     CallbackQueryHandler,
 )
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from .config import get_config
-from .data_retrieval.data_fetcher import DataFetcher
+from .config import get_app_config, on_config_reload, reload_config, watch_config_file
+from .analysis_coordinator import AnalysisCoordinator
+from .analysis_workers import ShardedAnalysisCoordinator
+from .analysis_queue import AnalysisQueue, QueueFullError
+from .progress_reporter import ProgressReporter
+from .rate_limiter import shared_rate_limiter
+from .subscriptions import SubscriptionManager, VALID_SIGNALS
+from .alert_delivery import AlertDispatcher
+from .job_queue import JobQueue, JobRunner, PRIORITY_BACKFILL, PRIORITY_PERIODIC
 from .data_retrieval.exceptions import APIError, NetworkError
-from .strategies.fibo_analyzer import FiboAnalyzer
 from .strategies.exceptions import InsufficientDataError
-from .utils.formatter import format_analysis_from_template
-from .utils.chart_generator import generate_analysis_chart
+from .utils.formatter import format_analysis_from_template, get_template_engine
 from .utils.symbol_util import normalize_symbol
 from .cache_manager import CacheManager
-from .validators import DataValidator
+from .cache_maintenance import RetentionPolicy
 from .localization import get_text
-import pandas as pd
+from . import tracing
+from .metrics import MetricsServer, STAGE_SECONDS, TELEGRAM_SENDS, registry as metrics_registry
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas, the analyzer, the exchange client, mplfinance and APScheduler take
+# seconds to import. They are imported where they are used and preloaded in the
+# background by post_init, so the bot starts answering before they are loaded.
+_BACKGROUND_IMPORTS = (
+    'pandas',
+    'src.validators',
+    'src.data_retrieval.data_fetcher',
+    'src.strategies.fibo_analyzer',
+    'src.utils.chart_generator',
+)
 
 # --- Basic Logging ---
 logging.basicConfig(
@@ -35,6 +61,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# A single worker keeps matplotlib usage on one thread while freeing the event loop.
+_chart_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart')
+
+# One CacheManager (and write-behind writer) per cache configuration, shared by all requests.
+_cache_managers: Dict[Tuple[str, str, bool], CacheManager] = {}
+
 # --- Conversation States ---
 SYMBOL, TERM, TIMEFRAME = range(3)
 
@@ -169,15 +201,46 @@ async def select_timeframe(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     )
     return TIMEFRAME
 
-async def _fetch_and_prepare_data(config: dict, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+def _preload_modules():
+    """Imports the heavy modules; run off the event loop after startup."""
+    import importlib
+    for module_name in _BACKGROUND_IMPORTS:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Background import of {module_name} failed: {e}")
+
+def _get_cache_manager(config: dict) -> CacheManager:
+    """Returns the shared CacheManager for the configured cache, creating it on first use."""
+    cache_config = config.get('cache', {})
+    key = (cache_config.get('DB_PATH', 'data/cache.db'), cache_config.get('STORAGE', 'rows'),
+           cache_config.get('WRITE_BEHIND', True))
+    cache_manager = _cache_managers.get(key)
+    if cache_manager is None:
+        cache_manager = CacheManager(key[0], storage=key[1], write_behind=key[2],
+                                     max_gap_attempts=cache_config.get('BACKFILL_MAX_ATTEMPTS', 3))
+        _cache_managers[key] = cache_manager
+    return cache_manager
+
+async def _fetch_and_prepare_data(config: dict, symbol: str, timeframe: str, limit: int) -> 'pd.DataFrame':
     """
     Fetches historical data by first consulting the CacheManager (which now uses SQLite),
     and falling back to the API if the cache is a miss.
     """
-    cache_manager = CacheManager()
+    from .data_retrieval.data_fetcher import DataFetcher
+    from .validators import DataValidator
+
+    cache_manager = _get_cache_manager(config)
+    # SQLite reads and writes, rate-limit waits and retry backoff all block the
+    # calling thread; they run on worker threads so the event loop keeps serving
+    # other chats, the webhook and the job leases meanwhile. anyio, since this
+    # loader also runs under trio (see tests/test_integration.py).
 
     # 1. Attempt to get data from cache
-    cached_data = cache_manager.get(symbol, timeframe)
+    with tracing.span('cache_read', symbol=symbol, timeframe=timeframe) as span:
+        cached_data = await anyio.to_thread.run_sync(tracing.in_context(cache_manager.get, symbol, timeframe, limit))
+        if span:
+            span.set(hit=bool(cached_data))
 
     data_to_process = None
 
@@ -188,12 +251,15 @@ async def _fetch_and_prepare_data(config: dict, symbol: str, timeframe: str, lim
         logger.info(f"Cache miss for {symbol} on {timeframe}. Fetching from API.")
         fetcher = DataFetcher(config)
         try:
-            api_result = fetcher.fetch_historical_data(symbol, timeframe, limit=limit)
+            with tracing.span('exchange_fetch', symbol=symbol, timeframe=timeframe, limit=limit):
+                api_result = await anyio.to_thread.run_sync(tracing.in_context(
+                    fetcher.fetch_historical_data, symbol, timeframe, limit))
 
             if api_result and api_result.get("data"):
                 fresh_data = api_result["data"]
                 # 3. Save the fresh data back to the cache
-                cache_manager.set(symbol, timeframe, fresh_data)
+                with tracing.span('cache_write', candles=len(fresh_data)):
+                    await anyio.to_thread.run_sync(tracing.in_context(cache_manager.set, symbol, timeframe, fresh_data))
                 data_to_process = fresh_data
             else:
                  logger.warning(f"API returned no data for {symbol} on {timeframe}.")
@@ -207,68 +273,176 @@ async def _fetch_and_prepare_data(config: dict, symbol: str, timeframe: str, lim
         raise InsufficientDataError(f"No data could be retrieved for {symbol} on {timeframe}, either from cache or API.")
 
     try:
-        df = DataValidator.validate_and_clean_dataframe(data_to_process)
+        with tracing.span('validate', candles=len(data_to_process)):
+            df = DataValidator.validate_and_clean_dataframe(data_to_process)
         return df
     except ValueError as e:
         logger.error(f"Data validation failed for {symbol} on {timeframe}: {e}")
         raise InsufficientDataError(f"Data for {symbol} on {timeframe} failed validation: {e}") from e
 
+async def _load_stale_data(config: dict, symbol: str, timeframe: str, limit: int, expired_only: bool = False):
+    """
+    Returns (df, age in seconds, expired) for a series from the cache whatever
+    its TTL, or None if nothing servable is cached (see CACHE_STALE_MAX_AGE_HOURS).
+    With `expired_only`, a series that is still fresh is not loaded either.
+    """
+    from .validators import DataValidator
+
+    max_age_hours = config.get('cache', {}).get('STALE_MAX_AGE_HOURS', 0)
+    if max_age_hours <= 0:
+        return None
+    # Off the event loop: the read may wait for the cache's write-behind writer.
+    cached = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+        _get_cache_manager(config).get_stale, symbol, timeframe, limit=limit, max_age=max_age_hours * 3600,
+        expired_only=expired_only))
+    if cached is None:
+        return None
+    candles, age, expired = cached
+    try:
+        return DataValidator.validate_and_clean_dataframe(candles), age, expired
+    except ValueError as e:
+        logger.warning(f"Cached data for {symbol} on {timeframe} cannot be served stale: {e}")
+        return None
+
+def _close_cache_managers() -> None:
+    """Persists queued cache writes and closes every cache database of this process."""
+    while _cache_managers:
+        _, cache_manager = _cache_managers.popitem()
+        cache_manager.close()
+
+def _get_coordinator(bot_data: dict) -> AnalysisCoordinator:
+    """
+    Returns the application-wide analysis coordinator, creating it on first use:
+    sharded over worker processes if ANALYSIS_WORKERS is set, else in-process.
+    """
+    coordinator = bot_data.get('analysis_coordinator')
+    if coordinator is None:
+        config = bot_data['config']
+        workers = config.get('trading', {}).get('ANALYSIS_WORKERS', 0)
+        if workers > 0:
+            coordinator = ShardedAnalysisCoordinator(config, workers, _fetch_and_prepare_data,
+                                                     on_worker_exit=_close_cache_managers,
+                                                     stale_loader=_load_stale_data)
+        else:
+            # Takes back the full budget, e.g. after a reload turned the workers off.
+            rate = config.get('exchange', {}).get('RATE_LIMIT', 10.0)
+            shared_rate_limiter('okx-rest', rate).set_rate(rate)
+            coordinator = AnalysisCoordinator(config, functools.partial(_fetch_and_prepare_data, config),
+                                              stale_loader=functools.partial(_load_stale_data, config))
+        bot_data['analysis_coordinator'] = coordinator
+    return coordinator
+
+def _generate_chart(df: 'pd.DataFrame', analysis_info: dict, display_symbol: str) -> bytes:
+    from .utils.chart_generator import generate_analysis_chart
+    return generate_analysis_chart(df, analysis_info, display_symbol)
+
+async def _render_chart(df: 'pd.DataFrame', analysis_info: dict, display_symbol: str) -> bytes:
+    """Runs chart generation on the dedicated chart thread (matplotlib is not thread-safe)."""
+    loop = asyncio.get_running_loop()
+    # The executor does not carry the context; bind it so chart spans join the trace.
+    return await loop.run_in_executor(_chart_executor,
+                                      tracing.in_context(_generate_chart, df, analysis_info, display_symbol))
+
+def _get_analysis_queue(bot_data: dict) -> AnalysisQueue:
+    """Returns the application-wide AnalysisQueue, creating it on first use."""
+    analysis_queue = bot_data.get('analysis_queue')
+    if analysis_queue is None:
+        trading_config = bot_data['config'].get('trading', {})
+        analysis_queue = AnalysisQueue(
+            max_concurrent=trading_config.get('ANALYSIS_MAX_CONCURRENCY', 4),
+            per_user_inflight=trading_config.get('ANALYSIS_PER_USER_INFLIGHT', 1),
+            per_user_pending=trading_config.get('ANALYSIS_PER_USER_PENDING', 3),
+        )
+        bot_data['analysis_queue'] = analysis_queue
+    return analysis_queue
+
 async def run_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Runs the Multi-Timeframe-Aware analysis and sends the formatted result."""
+    """Queues the Multi-Timeframe-Aware analysis for the selected symbol and timeframe."""
     query = update.callback_query
     await query.answer()
 
+    received_at = time.time()
     context.user_data['timeframe'] = query.data.split('_', 1)[1]
     display_symbol = context.user_data['symbol']
-    normalized_symbol = normalize_symbol(display_symbol)
     timeframe = context.user_data['timeframe']
-    config = context.bot_data['config']
-    fetcher = DataFetcher(config) # Still needed for FiboAnalyzer
-
-    trading_config = config.get('trading', {})
-    candle_limits = trading_config.get('CANDLE_FETCH_LIMITS', {})
-    hierarchy = trading_config.get('TIMEFRAME_HIERARCHY', {})
-
-    limit = candle_limits.get(timeframe, candle_limits.get('default', 1000))
-    parent_timeframe = hierarchy.get(timeframe)
-    higher_tf_trend_info = None
 
+    analysis_queue = _get_analysis_queue(context.bot_data)
     try:
-        if parent_timeframe:
-            await query.edit_message_text(text=f"جاري جلب بيانات الإطار الزمني الأعلى ({parent_timeframe})...")
-            parent_limit = candle_limits.get(parent_timeframe, candle_limits.get('default', 1000))
-            # Pass config instead of fetcher directly
-            parent_df = await _fetch_and_prepare_data(config, normalized_symbol, parent_timeframe, limit=parent_limit)
-
-            parent_analyzer = FiboAnalyzer(config, fetcher, timeframe=parent_timeframe)
-            parent_analysis = parent_analyzer.get_analysis(parent_df, normalized_symbol, parent_timeframe)
-            higher_tf_trend_info = {
-                'trend': parent_analysis.get('trend', 'N/A'),
-                'timeframe': parent_timeframe
-            }
-
-        await query.edit_message_text(text=f"جاري جلب البيانات لـ {display_symbol} على فريم {timeframe}...")
-        # Pass config instead of fetcher directly
-        df = await _fetch_and_prepare_data(config, normalized_symbol, timeframe, limit=limit)
-
-        await query.edit_message_text(text=f"جاري تحليل {display_symbol} على فريم {timeframe}...")
+        # The selection is captured now; user_data may change while the job waits.
+        position = analysis_queue.submit(
+            update.effective_chat.id,
+            functools.partial(_perform_analysis, update, context, display_symbol, timeframe, received_at)
+        )
+    except QueueFullError:
+        await query.message.reply_text("لديك طلبات تحليل كثيرة قيد الانتظار. يرجى الانتظار حتى تكتمل.")
+        return ConversationHandler.END
 
-        analyzer = FiboAnalyzer(config, fetcher, timeframe=timeframe)
-        analysis_info = analyzer.get_analysis(df, normalized_symbol, timeframe, higher_tf_trend_info=higher_tf_trend_info)
+    if position:
+        await query.edit_message_text(text=f"تمت إضافة طلبك إلى قائمة الانتظار، ترتيبك: {position}")
+    return ConversationHandler.END
 
-        # Generate the chart
-        await query.edit_message_text(text="جاري إنشاء الرسم البياني...")
-        chart_bytes = generate_analysis_chart(df, analysis_info, display_symbol)
+async def _perform_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE, display_symbol: str, timeframe: str,
+                            received_at: float = None) -> None:
+    """
+    Runs one queued request inside a trace (sampled by TRACE_SAMPLE_RATE) whose
+    root span starts when the request was received, so queue wait is included.
+    """
+    received_at = received_at or time.time()
+    with tracing.trace('analysis_request', start=received_at, update_id=update.update_id,
+                       chat_id=update.effective_chat.id, symbol=display_symbol, timeframe=timeframe) as root:
+        tracing.record('queued', received_at, time.time())
+        await _analyze_and_reply(update, context, display_symbol, timeframe)
+    if root:
+        logger.info(f"Trace {root.trace_id}: {display_symbol} on {timeframe} for chat {update.effective_chat.id} "
+                    f"took {root.end - root.start:.2f}s")
+
+async def _analyze_and_reply(update: Update, context: ContextTypes.DEFAULT_TYPE, display_symbol: str, timeframe: str) -> None:
+    """Runs the analysis for one queued request and sends the formatted result."""
+    query = update.callback_query
+    normalized_symbol = normalize_symbol(display_symbol)
+    coordinator = _get_coordinator(context.bot_data)
+    telegram_config = context.bot_data['config'].get('telegram', {})
+
+    # Status edits are sent in the background and only for stages that take a while.
+    progress = ProgressReporter(
+        lambda text: query.edit_message_text(text=text),
+        delay=telegram_config.get('PROGRESS_EDIT_DELAY', 0.7),
+        min_interval=telegram_config.get('PROGRESS_MIN_INTERVAL', 1.5),
+    )
 
-        # Format the text report
-        formatted_report = format_analysis_from_template(analysis_info, display_symbol, timeframe)
+    async def report_stage(stage: str, symbol: str, stage_timeframe: str) -> None:
+        # Only stages that actually run are reported; memoized parents are skipped.
+        if stage_timeframe != timeframe:
+            if stage == 'fetching':
+                progress.stage(f"جاري جلب بيانات الإطار الزمني الأعلى ({stage_timeframe})...")
+        elif stage == 'fetching':
+            progress.stage(f"جاري جلب البيانات لـ {display_symbol} على فريم {timeframe}...")
+        else:
+            progress.stage(f"جاري تحليل {display_symbol} على فريم {timeframe}...")
 
-        if chart_bytes:
-            # Send the photo directly from the bytes in memory
-            await query.message.reply_photo(photo=chart_bytes, caption=formatted_report)
+    try:
+        stale = None
+        try:
+            stale = await coordinator.peek(normalized_symbol, timeframe)
+        except Exception as e:
+            logger.warning(f"Could not analyze cached data for {display_symbol} on {timeframe}: {e}")
+
+        if stale is not None:
+            # Answer from the expired cache now; the refresh runs in the background.
+            df, analysis_info, age = stale
+            await _send_analysis(query.message, df, analysis_info, display_symbol, timeframe, progress=progress,
+                                 header=f"⏳ بيانات مخزنة منذ {_format_age(age)}؛ جاري تحديثها، "
+                                        f"وسنرسل تحديثاً إذا تغيرت الإشارة.")
+            task = asyncio.create_task(_revalidate(context.bot_data, query.message, display_symbol, timeframe,
+                                                   analysis_info.get('signal')))
+            revalidations = context.bot_data.setdefault('revalidation_tasks', set())
+            revalidations.add(task)
+            task.add_done_callback(revalidations.discard)
         else:
-            # Fallback to sending text only if chart generation fails
-            await query.message.reply_text(formatted_report)
+            # The coordinator resolves the parent timeframe chain and reuses any
+            # series already analyzed during the current bar.
+            df, analysis_info = await coordinator.analyze(normalized_symbol, timeframe, on_stage=report_stage)
+            await _send_analysis(query.message, df, analysis_info, display_symbol, timeframe, progress=progress)
 
     except InsufficientDataError as e:
         logger.warning(f"Caught InsufficientDataError for {display_symbol} on {timeframe}: {e}")
@@ -289,68 +463,289 @@ async def run_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     except Exception as e:
         logger.error(f"An unexpected error occurred during analysis for {display_symbol} on {timeframe}: {e}", exc_info=True)
         await query.message.reply_text("حدث خطأ غير متوقع. يرجى مراجعة سجلات الأخطاء.")
+    finally:
+        await progress.close()
 
     await start(update, context)
-    return ConversationHandler.END
+
+async def _send_analysis(message, df: 'pd.DataFrame', analysis_info: dict, display_symbol: str, timeframe: str,
+                         progress: ProgressReporter = None, header: str = None) -> None:
+    """Replies to `message` with the chart and formatted report, `header` first."""
+    # Generate the chart off the event loop so progress edits and other users keep flowing
+    if progress:
+        progress.stage("جاري إنشاء الرسم البياني...")
+    chart_bytes = await _render_chart(df, analysis_info, display_symbol)
+
+    # Format the text report
+    formatted_report = format_analysis_from_template(analysis_info, display_symbol, timeframe)
+    if header:
+        formatted_report = f"{header}\n\n{formatted_report}"
+
+    # No status edit may land after the result
+    if progress:
+        await progress.close()
+    with STAGE_SECONDS.labels(stage='telegram_send').time(), tracing.span('telegram_send'):
+        if chart_bytes:
+            # Send the photo directly from the bytes in memory
+            await message.reply_photo(photo=chart_bytes, caption=formatted_report)
+        else:
+            # Fallback to sending text only if chart generation fails
+            await message.reply_text(formatted_report)
+    TELEGRAM_SENDS.labels(outcome='sent').inc()
+
+async def _revalidate(bot_data: dict, message, display_symbol: str, timeframe: str, served_signal: str) -> None:
+    """Refreshes a series served from stale data and follows up only if its signal changed."""
+    try:
+        df, analysis_info = await _get_coordinator(bot_data).analyze(normalize_symbol(display_symbol), timeframe)
+    except Exception as e:
+        logger.warning(f"Background refresh of {display_symbol} on {timeframe} failed: {e}")
+        return
+    signal = analysis_info.get('signal')
+    if signal == served_signal:
+        logger.info(f"Refreshed {display_symbol} on {timeframe}; the {signal} signal is unchanged.")
+        return
+    try:
+        await _send_analysis(message, df, analysis_info, display_symbol, timeframe,
+                             header=f"🔄 تغيرت الإشارة بعد تحديث البيانات: {served_signal} ← {signal}")
+    except Exception as e:
+        logger.error(f"Could not send the refreshed analysis of {display_symbol} on {timeframe}: {e}")
+
+def _format_age(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{max(minutes, 1)} دقيقة"
+    hours = minutes // 60
+    if hours < 48:
+        return f"{hours} ساعة"
+    return f"{hours // 24} يوم"
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.error("Exception while handling an update:", exc_info=context.error)
 
+def _get_subscriptions(bot_data: dict) -> SubscriptionManager:
+    """Returns the application-wide SubscriptionManager, creating it on first use."""
+    subscriptions = bot_data.get('subscriptions')
+    if subscriptions is None:
+        db_path = bot_data['config'].get('alerts', {}).get('SUBSCRIPTIONS_DB_PATH', 'data/subscriptions.db')
+        subscriptions = SubscriptionManager(db_path)
+        bot_data['subscriptions'] = subscriptions
+    return subscriptions
+
+def _get_alert_dispatcher(application: Application) -> AlertDispatcher:
+    """Returns the application-wide AlertDispatcher, creating it on first use."""
+    dispatcher = application.bot_data.get('alert_dispatcher')
+    if dispatcher is None:
+        alerts_config = application.bot_data['config'].get('alerts', {})
+        subscriptions = _get_subscriptions(application.bot_data)
+        dispatcher = AlertDispatcher(
+            application.bot,
+            global_rate=alerts_config.get('GLOBAL_RATE', 25.0),
+            per_chat_interval=alerts_config.get('PER_CHAT_INTERVAL', 1.0),
+            concurrency=alerts_config.get('SEND_CONCURRENCY', 10),
+            on_blocked=subscriptions.remove_chat,
+        )
+        application.bot_data['alert_dispatcher'] = dispatcher
+    return dispatcher
+
+def _parse_subscription_args(config: dict, args: list):
+    """
+    Validates `/subscribe`-style arguments against the configured watchlist and timeframes.
+
+    Returns:
+        (symbol, timeframe, signal) with the configured spellings, or None if invalid.
+    """
+    if len(args) not in (2, 3):
+        return None
+    trading_config = config.get('trading', {})
+    symbols = {normalize_symbol(s): s for s in trading_config.get('WATCHLIST', [])}
+    timeframes = {tf.lower(): tf for tf in trading_config.get('TIMEFRAMES', [])}
+
+    symbol = normalize_symbol(args[0])
+    timeframe = timeframes.get(args[1].lower())
+    signal = args[2].upper() if len(args) == 3 else 'ANY'
+    if symbol not in symbols or timeframe is None or signal not in VALID_SIGNALS:
+        return None
+    return symbol, timeframe, signal
+
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles /subscribe <SYMBOL> <TIMEFRAME> [BUY|SELL|ANY]."""
+    config = context.bot_data['config']
+    parsed = _parse_subscription_args(config, context.args or [])
+    if parsed is None:
+        watchlist = ', '.join(config.get('trading', {}).get('WATCHLIST', []))
+        timeframes = ', '.join(config.get('trading', {}).get('TIMEFRAMES', []))
+        await update.message.reply_text(
+            "الاستخدام: /subscribe <العملة> <الإطار الزمني> [BUY|SELL|ANY]\n"
+            f"العملات المتاحة: {watchlist}\nالأطر الزمنية المتاحة: {timeframes}"
+        )
+        return
+
+    symbol, timeframe, signal = parsed
+    added = _get_subscriptions(context.bot_data).subscribe(update.effective_chat.id, symbol, timeframe, signal)
+    if added:
+        await update.message.reply_text(f"تم الاشتراك في تنبيهات {signal} لـ {symbol} على فريم {timeframe}.")
+    else:
+        await update.message.reply_text(f"أنت مشترك بالفعل في تنبيهات {signal} لـ {symbol} على فريم {timeframe}.")
+
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles /unsubscribe <SYMBOL> <TIMEFRAME> [BUY|SELL|ANY]."""
+    config = context.bot_data['config']
+    args = context.args or []
+    parsed = _parse_subscription_args(config, args)
+    if parsed is None:
+        await update.message.reply_text("الاستخدام: /unsubscribe <العملة> <الإطار الزمني> [BUY|SELL|ANY]")
+        return
+
+    symbol, timeframe, signal = parsed
+    removed = _get_subscriptions(context.bot_data).unsubscribe(
+        update.effective_chat.id, symbol, timeframe, signal if len(args) == 3 else None
+    )
+    if removed:
+        await update.message.reply_text(f"تم إلغاء الاشتراك في تنبيهات {symbol} على فريم {timeframe}.")
+    else:
+        await update.message.reply_text(f"لا يوجد اشتراك لـ {symbol} على فريم {timeframe}.")
+
+async def list_subscriptions_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles /subscriptions by listing the chat's alert subscriptions."""
+    entries = _get_subscriptions(context.bot_data).list_for_chat(update.effective_chat.id)
+    if not entries:
+        await update.message.reply_text("ليس لديك أي اشتراكات في التنبيهات.")
+        return
+    lines = [f"- {symbol} | {timeframe} | {signal}" for symbol, timeframe, signal in entries]
+    await update.message.reply_text("اشتراكاتك الحالية:\n" + "\n".join(lines))
+
+async def _send_signal_alerts(application: Application, display_symbol: str, timeframe: str,
+                              df: 'pd.DataFrame', analysis_info: dict) -> None:
+    """Sends a BUY/SELL analysis to the admin chat and the matching subscribers."""
+    signal = analysis_info.get('signal')
+    if signal not in ['BUY', 'SELL']:
+        return
+    admin_chat_id = application.bot_data['config'].get('telegram', {}).get('ADMIN_CHAT_ID')
+    recipients = _get_subscriptions(application.bot_data).subscribers_for(
+        normalize_symbol(display_symbol), timeframe, signal
+    )
+    if admin_chat_id:
+        recipients.insert(0, admin_chat_id)
+    if not recipients:
+        return
+
+    # Render once; the dispatcher uploads the chart once and reuses its file_id.
+    report = format_analysis_from_template(analysis_info, display_symbol, timeframe)
+    chart_bytes = await _render_chart(df, analysis_info, display_symbol)
+    await _get_alert_dispatcher(application).broadcast(recipients, report, photo=chart_bytes or None)
+
+    logger.info(get_text("periodic_sent_alert_log").format(
+        signal=signal, symbol=display_symbol, timeframe=timeframe
+    ))
+
 async def run_periodic_analysis(application: Application):
-    """Runs analysis periodically and sends formatted alerts."""
+    """
+    Queues a durable analysis job per watchlist series; the job runner analyzes
+    them and fans formatted alerts out to subscribers (see `_run_analysis_job`).
+    A series whose previous job has not finished is not queued again.
+
+    Timeframes covered by the live candle stream are skipped; those series are
+    analyzed as soon as their bars close (see `_on_bar_close`).
+    """
     config = application.bot_data['config']
-    fetcher = DataFetcher(config) # Analyzer still needs this
     admin_chat_id = config.get('telegram', {}).get('ADMIN_CHAT_ID')
     if not admin_chat_id:
         logger.warning(get_text("warning_no_admin_id"))
-        return
 
     watchlist = config.get('trading', {}).get('WATCHLIST', [])
     # Ensure we check all timeframes defined in the groups
     timeframe_groups = config.get('trading', {}).get('TIMEFRAME_GROUPS', {})
-    all_timeframes = [tf for tfs in timeframe_groups.values() for tf in tfs]
+    streamed = _streamed_timeframes(application)
+    all_timeframes = [tf for tfs in timeframe_groups.values() for tf in tfs if tf not in streamed]
+    if not all_timeframes:
+        return
 
-    candle_limits = config.get('trading', {}).get('CANDLE_FETCH_LIMITS', {})
     logger.info(get_text("periodic_start_log").format(count=len(watchlist)))
+    job_queue = _get_job_queue(application.bot_data)
 
-    for display_symbol in watchlist:
-        normalized_symbol = normalize_symbol(display_symbol)
-        for timeframe in all_timeframes:
-            try:
-                analyzer = FiboAnalyzer(config, fetcher, timeframe=timeframe)
-                limit = candle_limits.get(timeframe, candle_limits.get('default', 1000))
-                # Pass config to the data fetching function
-                df = await _fetch_and_prepare_data(config, normalized_symbol, timeframe, limit=limit)
-                analysis_info = analyzer.get_analysis(df, normalized_symbol, timeframe)
-
-                if analysis_info.get('signal') in ['BUY', 'SELL']:
-                    report = format_analysis_from_template(analysis_info, display_symbol, timeframe)
-                    chart_bytes = generate_analysis_chart(df, analysis_info, display_symbol)
-
-                    if chart_bytes:
-                        await application.bot.send_photo(
-                            chat_id=admin_chat_id,
-                            photo=chart_bytes,
-                            caption=report
-                        )
-                    else:
-                        # Fallback to text if chart generation fails
-                        await application.bot.send_message(chat_id=admin_chat_id, text=report)
-
-                    logger.info(get_text("periodic_sent_alert_log").format(
-                        signal=analysis_info['signal'], symbol=display_symbol, timeframe=timeframe
-                    ))
-            except Exception as e:
-                logger.error(f"Error in periodic analysis for {display_symbol} on {timeframe}: {e}")
-            await asyncio.sleep(2)
-    logger.info(get_text("periodic_end_log"))
+    def enqueue_all():
+        for display_symbol in watchlist:
+            normalized_symbol = normalize_symbol(display_symbol)
+            for timeframe in all_timeframes:
+                job_queue.enqueue(
+                    'analyze', {'symbol': display_symbol, 'timeframe': timeframe}, priority=PRIORITY_PERIODIC,
+                    dedupe_key=f'analyze:{normalized_symbol}:{timeframe}'
+                )
+
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, enqueue_all)
+    except Exception as e:
+        logger.error(f"Could not queue the periodic analysis: {e}")
+        return
+    _wake_job_runner(application)
+    await _log_job_stats(job_queue)
+
+async def _run_analysis_job(application: Application, payload: dict) -> None:
+    """Analyzes one queued series and alerts its subscribers. Errors fail the attempt."""
+    display_symbol, timeframe = payload['symbol'], payload['timeframe']
+    # Parents analyzed by earlier jobs are reused, so every child gets MTA
+    # confirmation without a second parent analysis.
+    df, analysis_info = await _get_coordinator(application.bot_data).analyze(normalize_symbol(display_symbol), timeframe)
+    await _send_signal_alerts(application, display_symbol, timeframe, df, analysis_info)
+
+def _streamed_timeframes(application: Application) -> set:
+    """Returns the timeframes the running candle stream analyzes on bar close."""
+    if 'candle_stream' not in application.bot_data:
+        return set()
+    return set(application.bot_data['config'].get('exchange', {}).get('STREAM_TIMEFRAMES', []))
+
+async def _on_bar_close(application: Application, symbol: str, timeframe: str, candle: dict) -> None:
+    """Re-analyzes exactly the series whose bar confirmed and alerts its subscribers."""
+    watchlist = application.bot_data['config'].get('trading', {}).get('WATCHLIST', [])
+    display_symbol = next((s for s in watchlist if normalize_symbol(s) == symbol), symbol.replace('-', '/'))
+    try:
+        df, analysis_info = await _get_coordinator(application.bot_data).on_bar_close(symbol, timeframe, candle)
+        await _send_signal_alerts(application, display_symbol, timeframe, df, analysis_info)
+    except Exception as e:
+        logger.error(f"Error in bar-close analysis for {display_symbol} on {timeframe}: {e}")
+
+def _configure_tracing(config: dict) -> None:
+    tracing_config = config.get('tracing', {})
+    tracing.configure(tracing_config.get('SAMPLE_RATE', 0.0), tracing_config.get('FILE', tracing.DEFAULT_TRACE_FILE))
 
 async def post_init(application: Application) -> None:
     """Initializes the background scheduler and loads config."""
-    config = application.bot_data.get('config', get_config())
+    config = application.bot_data.get('config') or get_app_config()
     application.bot_data['config'] = config
 
+    # --- Config Hot Reload ---
+    def apply_config(new_config):
+        application.bot_data['config'] = new_config
+        _configure_tracing(new_config)
+        # Analyzers and the timeframe hierarchy come from the config; rebuild on next use.
+        coordinator = application.bot_data.pop('analysis_coordinator', None)
+        if isinstance(coordinator, ShardedAnalysisCoordinator):
+            # Workers finish their in-flight requests before they stop.
+            threading.Thread(target=coordinator.close, name='analysis-workers-close', daemon=True).start()
+
+    _configure_tracing(config)
+    on_config_reload(apply_config)
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_config)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # No SIGHUP on Windows, and signal handlers only work in the main thread.
+        logger.debug("SIGHUP config reload is not available on this platform.")
+    watch_interval = config.get('telegram', {}).get('CONFIG_WATCH_INTERVAL', 0)
+    if watch_interval > 0:
+        application.bot_data['config_watcher'] = asyncio.create_task(watch_config_file('.env', watch_interval))
+
+    # Load and compile the report templates before the first request needs them.
+    get_template_engine()
+
+    _start_candle_stream(application)
+    _start_job_runner(application)
+    await _start_metrics(application)
+
+    # Load the analysis stack in the background; handlers import it on demand anyway.
+    application.bot_data['preload'] = asyncio.get_running_loop().run_in_executor(None, _preload_modules)
+
     # --- Scheduler Setup ---
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
     scheduler = AsyncIOScheduler(timezone="UTC")
 
     # Get analysis interval from config, default to 4 hours
@@ -365,10 +760,207 @@ async def post_init(application: Application) -> None:
         name="periodic_analysis_job"
     )
 
+    maintenance_minutes = config.get('cache', {}).get('MAINTENANCE_INTERVAL_MINUTES', 0)
+    if maintenance_minutes > 0:
+        scheduler.add_job(
+            run_cache_maintenance,
+            "interval",
+            minutes=maintenance_minutes,
+            args=[application],
+            name="cache_maintenance_job",
+            max_instances=1,
+            coalesce=True
+        )
+
+    backfill_minutes = config.get('cache', {}).get('BACKFILL_INTERVAL_MINUTES', 0)
+    if backfill_minutes > 0:
+        scheduler.add_job(
+            run_gap_backfill,
+            "interval",
+            minutes=backfill_minutes,
+            args=[application],
+            name="gap_backfill_job",
+            max_instances=1,
+            coalesce=True
+        )
+
     # Start the scheduler
     scheduler.start()
     logger.info(f"Scheduler started. Periodic analysis will run every {interval_hours} hours.")
 
+async def run_cache_maintenance(application: Application) -> None:
+    """Trims, evicts and compacts the candle cache off the event loop."""
+    cache_config = application.bot_data['config'].get('cache', {})
+    policy = RetentionPolicy(cache_config.get('RETENTION_BARS'), cache_config.get('RETENTION_DAYS'))
+    max_bytes = cache_config.get('MAX_SIZE_MB', 0) * 1024 * 1024
+    cache_manager = _get_cache_manager(application.bot_data['config'])
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, cache_manager.maintain, policy, max_bytes)
+    except Exception as e:
+        logger.error(f"Cache maintenance failed: {e}")
+
+async def run_gap_backfill(application: Application) -> None:
+    """Queues a gap backfill job, which runs after any queued analysis."""
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+            _get_job_queue(application.bot_data).enqueue, 'backfill',
+            priority=PRIORITY_BACKFILL, dedupe_key='backfill'
+        ))
+    except Exception as e:
+        logger.error(f"Could not queue the gap backfill: {e}")
+        return
+    _wake_job_runner(application)
+
+async def _run_backfill_job(application: Application, payload: dict) -> None:
+    """Fetches the missing ranges of cached series off the event loop."""
+    from .data_retrieval.data_fetcher import DataFetcher
+
+    config = application.bot_data['config']
+    cache_config = config.get('cache', {})
+    cache_manager = _get_cache_manager(config)
+    await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+        cache_manager.backfill_gaps, DataFetcher(config),
+        max_gaps=cache_config.get('BACKFILL_MAX_GAPS', 20),
+        max_attempts=cache_config.get('BACKFILL_MAX_ATTEMPTS', 3),
+    ))
+
+def _get_job_queue(bot_data: dict) -> JobQueue:
+    """Returns the shared durable job queue, opening it on first use."""
+    job_queue = bot_data.get('job_queue')
+    if job_queue is None:
+        jobs_config = bot_data['config'].get('jobs', {})
+        job_queue = JobQueue(
+            jobs_config.get('DB_PATH', 'data/jobs.db'),
+            lease_seconds=jobs_config.get('LEASE_SECONDS', 120.0),
+            max_attempts=jobs_config.get('MAX_ATTEMPTS', 5),
+        )
+        bot_data['job_queue'] = job_queue
+    return job_queue
+
+def _start_job_runner(application: Application) -> None:
+    """Runs queued jobs, including those left over from a previous run, on the event loop."""
+    config = application.bot_data['config']
+    # With analysis workers, jobs for symbols on different workers run concurrently.
+    concurrency = max(config.get('jobs', {}).get('CONCURRENCY', 2),
+                      config.get('trading', {}).get('ANALYSIS_WORKERS', 0))
+    runner = JobRunner(_get_job_queue(application.bot_data), {
+        'analyze': functools.partial(_run_analysis_job, application),
+        'backfill': functools.partial(_run_backfill_job, application),
+    }, concurrency=concurrency)
+    application.bot_data['job_runner'] = runner
+    application.bot_data['job_runner_task'] = asyncio.create_task(runner.run())
+
+def _wake_job_runner(application: Application) -> None:
+    runner = application.bot_data.get('job_runner')
+    if runner is not None:
+        runner.wake()
+
+def _format_job_stats(stats: dict) -> str:
+    depth = ', '.join(f"{state} {count}" for state, count in sorted(stats['depth'].items())) or 'empty'
+    return (f"Job queue: {depth}; {stats['ready']} ready, oldest waiting {stats['oldest_ready_age']:.0f}s; "
+            f"last 5 min: {stats['completed']} done ({stats['throughput'] * 60:.1f}/min), "
+            f"{stats['failed']} failed, avg queue latency {stats['avg_latency']:.1f}s")
+
+async def _log_job_stats(job_queue: JobQueue) -> None:
+    try:
+        stats = await asyncio.get_running_loop().run_in_executor(None, job_queue.stats)
+    except Exception as e:
+        logger.error(f"Could not read the job queue stats: {e}")
+        return
+    logger.info(_format_job_stats(stats))
+
+async def jobs_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles /jobs by reporting the job queue depth, latency and throughput to the admin."""
+    admin_chat_id = context.bot_data['config'].get('telegram', {}).get('ADMIN_CHAT_ID')
+    if not admin_chat_id or str(update.effective_chat.id) != str(admin_chat_id):
+        return
+    stats = await asyncio.get_running_loop().run_in_executor(None, _get_job_queue(context.bot_data).stats)
+    await update.message.reply_text(_format_job_stats(stats))
+
+async def _start_metrics(application: Application) -> None:
+    """
+    Serves the metrics registry on METRICS_LISTEN:METRICS_PORT. Not on the
+    webhook server: that one is public and has no authentication.
+    """
+    job_queue = _get_job_queue(application.bot_data)
+    ready_jobs = metrics_registry.gauge('job_queue_ready_jobs', 'Jobs waiting for a worker.')
+    oldest_ready = metrics_registry.gauge('job_queue_oldest_ready_seconds', 'How long the oldest ready job has waited.')
+
+    def collect_job_stats():
+        stats = job_queue.stats()
+        ready_jobs.set(stats['ready'])
+        oldest_ready.set(stats['oldest_ready_age'])
+
+    metrics_registry.add_collector(collect_job_stats)
+
+    metrics_config = application.bot_data['config'].get('metrics', {})
+    if metrics_config.get('PORT', 0) > 0:
+        server = MetricsServer(metrics_registry, metrics_config.get('LISTEN', '127.0.0.1'), metrics_config['PORT'])
+        try:
+            await server.start()
+        except OSError as e:
+            logger.error(f"Could not start the metrics server: {e}")
+            return
+        application.bot_data['metrics_server'] = server
+
+def _start_candle_stream(application: Application) -> None:
+    """Streams the watchlist's candles into the cache if STREAM_ENABLED is set."""
+    config = application.bot_data['config']
+    exchange_config = config.get('exchange', {})
+    if not exchange_config.get('STREAM_ENABLED'):
+        return
+    from .candle_stream import CandleStream, OKX_DEMO_WS_URL, OKX_WS_URL
+
+    url = exchange_config.get('STREAM_URL') or (OKX_DEMO_WS_URL if exchange_config.get('SANDBOX_MODE', True) else OKX_WS_URL)
+    series = [
+        (symbol, timeframe)
+        for symbol in config.get('trading', {}).get('WATCHLIST', [])
+        for timeframe in exchange_config.get('STREAM_TIMEFRAMES', [])
+    ]
+    stream = CandleStream(series, url=url)
+    cache_manager = _get_cache_manager(config)
+    stream.add_listener(lambda symbol, timeframe, candle: cache_manager.append_live(symbol, timeframe, [candle]))
+
+    # Analyses run as tasks so a slow analysis or broadcast never stalls the stream.
+    analysis_tasks = application.bot_data.setdefault('bar_close_tasks', set())
+
+    def analyze_on_close(symbol, timeframe, candle):
+        task = asyncio.create_task(_on_bar_close(application, symbol, timeframe, candle))
+        analysis_tasks.add(task)
+        task.add_done_callback(analysis_tasks.discard)
+
+    stream.add_listener(analyze_on_close)
+    application.bot_data['candle_stream'] = stream
+    application.bot_data['candle_stream_task'] = asyncio.create_task(stream.run())
+
+async def post_shutdown(application: Application) -> None:
+    """
+    Stops the candle stream, the job runner and the analysis workers, persists
+    queued cache writes and closes the databases. Jobs the runner had not
+    started stay queued for the next run.
+    """
+    loop = asyncio.get_running_loop()
+    metrics_server = application.bot_data.pop('metrics_server', None)
+    if metrics_server is not None:
+        await metrics_server.stop()
+    stream = application.bot_data.pop('candle_stream', None)
+    if stream is not None:
+        stream.stop()
+        await asyncio.gather(application.bot_data.pop('candle_stream_task'), return_exceptions=True)
+    await asyncio.gather(*application.bot_data.pop('bar_close_tasks', ()), return_exceptions=True)
+    await asyncio.gather(*application.bot_data.pop('revalidation_tasks', ()), return_exceptions=True)
+    runner = application.bot_data.pop('job_runner', None)
+    if runner is not None:
+        runner.stop()
+        await asyncio.gather(application.bot_data.pop('job_runner_task'), return_exceptions=True)
+    job_queue = application.bot_data.pop('job_queue', None)
+    if job_queue is not None:
+        job_queue.close()
+    coordinator = application.bot_data.pop('analysis_coordinator', None)
+    if isinstance(coordinator, ShardedAnalysisCoordinator):
+        await loop.run_in_executor(None, coordinator.close)
+    await loop.run_in_executor(None, _close_cache_managers)
+
 conv_handler = ConversationHandler(
     entry_points=[CallbackQueryHandler(analyze_entry, pattern='^analyze_start$')],
     states={
@@ -0,0 +1,215 @@
+"""
+Per-request trace spans, written as JSON lines to a local file.
+
+A request opens a root span with `trace(...)`; every `span(...)` (or
+`@traced` function) entered while it is active becomes a child, across
+awaits and tasks, through a context variable. Work handed to an executor
+keeps the trace when submitted through `in_context`.
+
+Sampling is decided once per trace by `configure(sample_rate=...)`. Outside
+a sampled trace, `span` does nothing beyond one context variable lookup.
+Print a trace with `python trace_waterfall.py`.
+"""
+import contextvars
+import inspect
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_FILE = 'data/traces.jsonl'
+
+
+class Span:
+    """One timed operation of a trace. Times are epoch seconds."""
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, attributes: Dict[str, Any],
+                 start: Optional[float] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        """Adds attributes, e.g. results only known at the end of the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id,
+            'name': self.name, 'start': self.start, 'duration': (self.end or self.start) - self.start,
+            'attributes': self.attributes, 'error': self.error,
+        }
+
+
+class JsonlSpanSink:
+    """Appends finished spans to a file, one JSON object per line."""
+    def __init__(self, path: str = DEFAULT_TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + '\n'
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning(f"Could not record trace span {span.name}: {e}")
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('trace_span', default=None)
+_sink: Optional[JsonlSpanSink] = None
+_sample_rate = 0.0
+
+
+def configure(sample_rate: float, path: str = DEFAULT_TRACE_FILE):
+    """Traces `sample_rate` (0..1) of the requests into `path`; 0 disables tracing."""
+    global _sink, _sample_rate
+    _sample_rate = max(0.0, min(1.0, sample_rate))
+    _sink = JsonlSpanSink(path) if _sample_rate > 0 else None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+@contextmanager
+def _enter(span: Span) -> Iterator[Span]:
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        span.end = time.time()
+        if _sink is not None:
+            _sink.write(span)
+
+
+@contextmanager
+def trace(name: str, start: Optional[float] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Opens the root span of a request if it is sampled; yields the span or
+    None. `start` backdates the span, e.g. to when the request arrived.
+    """
+    if _sink is None or random.random() >= _sample_rate:
+        yield None
+        return
+    with _enter(Span(secrets.token_hex(8), None, name, attributes, start)) as root:
+        yield root
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Opens a child of the current span; does nothing outside a sampled trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    with _enter(Span(parent.trace_id, parent.span_id, name, attributes)) as child:
+        yield child
+
+
+def record(name: str, start: float, end: float, **attributes: Any):
+    """Records an already finished child span of the current span, e.g. a queue wait."""
+    parent = _current.get()
+    if parent is None or _sink is None:
+        return
+    finished = Span(parent.trace_id, parent.span_id, name, attributes, start)
+    finished.end = end
+    _sink.write(finished)
+
+
+def traced(name: str):
+    """Decorator: runs each call of a plain or coroutine function in a `span`."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def in_context(func: Callable, *args: Any) -> Callable[[], Any]:
+    """Binds `func(*args)` to the current context, for executors that do not copy it."""
+    context = contextvars.copy_context()
+    return lambda: context.run(func, *args)
+
+
+def load_traces(path: str = DEFAULT_TRACE_FILE) -> Dict[str, List[Dict[str, Any]]]:
+    """Reads a span file into {trace_id: spans ordered by start}, skipping damaged lines."""
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                traces.setdefault(entry['trace_id'], []).append(entry)
+            except (ValueError, KeyError):
+                continue
+    for spans in traces.values():
+        spans.sort(key=lambda s: s['start'])
+    return traces
+
+
+def format_waterfall(spans: List[Dict[str, Any]], width: int = 50) -> str:
+    """Renders one trace as an indented span tree with a timeline bar per span."""
+    if not spans:
+        return ''
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s['span_id'] for s in spans}
+    for s in spans:
+        parent = s['parent_id'] if s['parent_id'] in ids else None
+        children.setdefault(parent, []).append(s)
+    begin = min(s['start'] for s in spans)
+    total = max(s['start'] + s['duration'] for s in spans) - begin or 1e-9
+
+    root = children.get(None, [spans[0]])[0]
+    header = f"trace {root['trace_id']}  {total * 1000:.1f} ms"
+    attributes = ' '.join(f'{k}={v}' for k, v in root['attributes'].items())
+    lines = [header + (f"  ({attributes})" if attributes else '')]
+
+    def walk(parent: Optional[str], depth: int):
+        for s in children.get(parent, []):
+            offset = int((s['start'] - begin) / total * width)
+            length = max(1, int(s['duration'] / total * width))
+            bar = ' ' * offset + '█' * min(length, width - offset)
+            label = ('  ' * depth + s['name'])[:36]
+            error = f"  ! {s['error']}" if s.get('error') else ''
+            lines.append(f"{label:<36} {s['duration'] * 1000:>9.1f} ms |{bar:<{width}}|{error}")
+            walk(s['span_id'], depth + 1)
+
+    walk(None, 0)
+    return '\n'.join(lines)
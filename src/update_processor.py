@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def _chat_key(update: object) -> Optional[Hashable]:
+    """The conversation an update belongs to: its chat, else its user, else None."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat is not None:
+        return ('chat', update.effective_chat.id)
+    if update.effective_user is not None:
+        return ('user', update.effective_user.id)
+    return None
+
+
+class ChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes up to `max_concurrent_updates` updates at once, but the updates
+    of one chat one at a time, in arrival order.
+
+    ConversationHandler keeps its state per chat and relies on each chat's
+    updates being handled one by one; with plain `concurrent_updates`, rapid
+    taps in one chat would run against stale conversation state. Different
+    chats still proceed in parallel; an update waiting for its chat's turn
+    holds one of the slots.
+    """
+    __slots__ = ('_chats',)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # key -> (lock, updates holding or waiting for it); dropped when unused.
+        self._chats: Dict[Hashable, Tuple[asyncio.Lock, int]] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = _chat_key(update)
+        if key is None:
+            await coroutine
+            return
+        lock, users = self._chats.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._chats[key] = (lock, users + 1)
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            lock, users = self._chats[key]
+            if users == 1:
+                del self._chats[key]
+            else:
+                self._chats[key] = (lock, users - 1)
+
+    async def initialize(self) -> None:
+        """Nothing to set up."""
+
+    async def shutdown(self) -> None:
+        """Nothing to release."""
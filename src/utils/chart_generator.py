@@ -4,9 +4,13 @@ from typing import Dict, Any
 import io
 import logging
 
+from src.metrics import STAGE_SECONDS
+from src.tracing import traced
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+@traced('generate_analysis_chart')
 def generate_analysis_chart(df: pd.DataFrame, analysis_data: Dict[str, Any], symbol: str) -> bytes:
     """
     Generates a candlestick chart with technical analysis overlays and returns it as bytes.
@@ -77,19 +81,20 @@ def generate_analysis_chart(df: pd.DataFrame, analysis_data: Dict[str, Any], sym
         buffer = io.BytesIO()
         savefig_settings = dict(fname=buffer, format='png', dpi=100)
 
-        mpf.plot(
-            chart_df,
-            type='candle',
-            style=style,
-            title=title,
-            ylabel='السعر (USDT)',
-            volume=True,
-            ylabel_lower='حجم التداول',
-            addplot=plots_to_add if plots_to_add else None,
-            hlines=dict(hlines=hlines_data, colors=colors, linestyle='--'),
-            figratio=(16, 9),
-            savefig=savefig_settings
-        )
+        with STAGE_SECONDS.labels(stage='chart_plot').time():
+            mpf.plot(
+                chart_df,
+                type='candle',
+                style=style,
+                title=title,
+                ylabel='السعر (USDT)',
+                volume=True,
+                ylabel_lower='حجم التداول',
+                addplot=plots_to_add if plots_to_add else None,
+                hlines=dict(hlines=hlines_data, colors=colors, linestyle='--'),
+                figratio=(16, 9),
+                savefig=savefig_settings
+            )
 
         buffer.seek(0)
         image_bytes = buffer.getvalue()
@@ -1,7 +1,152 @@
 import os
-from datetime import datetime
-from typing import Dict, Any
-from src.config import get_config
+import logging
+import threading
+import time
+from string import Formatter
+from typing import Dict, Any, List, Optional
+from src.config import get_app_config, on_config_reload
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+TEMPLATE_SUFFIX = '_template.md'
+
+class CompiledTemplate:
+    """
+    A template pre-split into a '%s' format string and the ordered placeholder names.
+
+    Rendering is then a single `%` operation: no template parsing happens per call.
+    Placeholders without a value are left in the output as '{name}'.
+    """
+    __slots__ = ('format_string', 'fields', 'specs')
+
+    def __init__(self, template: str):
+        parts, fields, specs = [], [], []
+        for literal, field_name, format_spec, conversion in Formatter().parse(template):
+            parts.append(literal.replace('*', '').replace('%', '%%'))
+            if field_name is not None:
+                parts.append('%s')
+                fields.append(field_name)
+                specs.append(format_spec or None)
+        self.format_string = ''.join(parts)
+        self.fields = tuple(fields)
+        self.specs = tuple(specs)
+
+    def render(self, values: Dict[str, Any]) -> str:
+        rendered = []
+        for name, spec in zip(self.fields, self.specs):
+            value = values.get(name, _MISSING)
+            if value is _MISSING:
+                rendered.append(f'{{{name}}}')
+            elif spec is not None:
+                rendered.append(format(value, spec).replace('*', ''))
+            elif isinstance(value, str):
+                rendered.append(value.replace('*', '') if '*' in value else value)
+            else:
+                rendered.append(str(value).replace('*', ''))
+        return self.format_string % tuple(rendered)
+
+_MISSING = object()
+
+class TemplateEngine:
+    """
+    Loads and pre-parses every report template once and renders them without file I/O.
+
+    Templates are compiled up front (with the markdown '*' characters already
+    removed from the literal text, see CompiledTemplate), and the
+    timeframe -> term lookup is precomputed from TIMEFRAME_GROUPS. With
+    `auto_reload`, template files are re-read when their mtime changes, checked
+    at most once every `reload_check_interval` seconds.
+    """
+    def __init__(self, timeframe_groups: Dict[str, List[str]], templates_dir: str = TEMPLATES_DIR,
+                 auto_reload: bool = False, reload_check_interval: float = 2.0):
+        self.templates_dir = templates_dir
+        self.auto_reload = auto_reload
+        self.reload_check_interval = reload_check_interval
+        self.term_by_timeframe = self._build_term_map(timeframe_groups)
+        self._templates: Dict[str, CompiledTemplate] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._last_check = time.monotonic()
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _build_term_map(timeframe_groups: Dict[str, List[str]]) -> Dict[str, str]:
+        # short_term wins over medium_term, matching the original lookup order.
+        term_map = {}
+        for term in ('medium_term', 'short_term'):
+            for tf in timeframe_groups.get(term, []):
+                term_map[tf] = term
+        return term_map
+
+    def load(self):
+        """(Re)loads every template in the templates directory."""
+        templates, mtimes = {}, {}
+        for filename in os.listdir(self.templates_dir):
+            if not filename.endswith(TEMPLATE_SUFFIX):
+                continue
+            path = os.path.join(self.templates_dir, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                templates[filename[:-len(TEMPLATE_SUFFIX)]] = CompiledTemplate(f.read())
+            mtimes[path] = os.path.getmtime(path)
+        with self._lock:
+            self._templates, self._mtimes = templates, mtimes
+        logger.info(f"Loaded {len(templates)} report templates from {self.templates_dir}")
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._last_check < self.reload_check_interval:
+            return
+        self._last_check = now
+        try:
+            filenames = {f for f in os.listdir(self.templates_dir) if f.endswith(TEMPLATE_SUFFIX)}
+            changed = filenames != {os.path.basename(p) for p in self._mtimes} or any(
+                os.path.getmtime(path) != mtime for path, mtime in self._mtimes.items()
+            )
+        except OSError:
+            changed = True
+        if changed:
+            try:
+                self.load()
+            except OSError as e:
+                logger.error(f"Failed to reload report templates: {e}")
+
+    def term_for(self, timeframe: str) -> str:
+        return self.term_by_timeframe.get(timeframe, 'long_term')
+
+    def render(self, term: str, values: Dict[str, str]) -> Optional[str]:
+        """Renders a term's template, or returns None if the template does not exist."""
+        if self.auto_reload:
+            self._reload_if_changed()
+        compiled = self._templates.get(term)
+        if compiled is None:
+            return None
+        return compiled.render(values)
+
+_engine: Optional[TemplateEngine] = None
+_engine_lock = threading.Lock()
+
+def get_template_engine() -> TemplateEngine:
+    """Returns the shared TemplateEngine, building it from the config on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                config = get_app_config()
+                trading_config = config.get('trading', {})
+                _engine = TemplateEngine(
+                    trading_config.get('TIMEFRAME_GROUPS', {}),
+                    auto_reload=trading_config.get('TEMPLATE_AUTO_RELOAD', False),
+                )
+    return _engine
+
+def _reset_template_engine(_config):
+    # The term map depends on TIMEFRAME_GROUPS; rebuild the engine on next use.
+    global _engine
+    with _engine_lock:
+        _engine = None
+
+on_config_reload(_reset_template_engine)
 
 def format_dynamic_price(price: float) -> str:
     """Formats a price with a dynamic number of decimal places as a plain string."""
@@ -19,26 +164,8 @@ def format_analysis_from_template(analysis_data: Dict[str, Any], symbol: str, ti
     """
     Formats the analysis data into a clean, text-based report based on the final template.
     """
-    config = get_config()
-    timeframe_groups = config.get('trading', {}).get('TIMEFRAME_GROUPS', {})
-
-    # Determine which template to use
-    term = 'long_term'
-    if timeframe in timeframe_groups.get('short_term', []):
-        term = 'short_term'
-    elif timeframe in timeframe_groups.get('medium_term', []):
-        term = 'medium_term'
-
-    template_filename = f'{term}_template.md'
-    template_path = os.path.join('src', 'templates', template_filename)
-
-    try:
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
-    except FileNotFoundError:
-        return f"Error: Template '{template_filename}' not found."
-    except Exception as e:
-        return f"Error reading template: {e}"
+    engine = get_template_engine()
+    term = engine.term_for(timeframe)
 
     # --- Safe Data Extraction ---
     latest_data = analysis_data.get('latest_data', {})
@@ -109,11 +236,8 @@ def format_analysis_from_template(analysis_data: Dict[str, Any], symbol: str, ti
         "trade_recommendation_section": trade_recommendation_section,
     }
 
-    class SafeFormatter(dict):
-        def __missing__(self, key): return f'{{{key}}}'
-
-    # Format the template and then remove markdown for clean text
-    formatted_text = template.format_map(SafeFormatter(replacements))
-    clean_text = formatted_text.replace('**', '').replace('*', '')
-
-    return clean_text
\ No newline at end of file
+    # Render the pre-parsed template; markdown is stripped during compilation.
+    report = engine.render(term, replacements)
+    if report is None:
+        return f"Error: Template '{term}{TEMPLATE_SUFFIX}' not found."
+    return report
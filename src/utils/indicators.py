@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-from scipy.signal import find_peaks
 from typing import Dict, List, Any
 
 
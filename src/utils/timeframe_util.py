@@ -0,0 +1,53 @@
+import time
+from typing import Optional
+
+# Bar length of one unit for every suffix the OKX API accepts.
+_UNIT_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'H': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'D': 24 * 60 * 60 * 1000,
+    'W': 7 * 24 * 60 * 60 * 1000,
+}
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """
+    Converts a timeframe string into the length of one bar in milliseconds.
+
+    Args:
+        timeframe (str): The timeframe (e.g., '5m', '1H', '4h', '1D').
+
+    Returns:
+        int: The bar length in milliseconds.
+
+    Raises:
+        ValueError: If the timeframe is not in a recognised format.
+    """
+    if not isinstance(timeframe, str) or len(timeframe) < 2:
+        raise ValueError(f"Invalid timeframe: {timeframe!r}")
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if not amount.isdigit() or unit not in _UNIT_MS:
+        raise ValueError(f"Invalid timeframe: {timeframe!r}")
+    return int(amount) * _UNIT_MS[unit]
+
+# OKX opens bars on Hong Kong time (UTC+8): 6H/12H bars at 04:00/16:00 UTC,
+# daily bars at 16:00 UTC and weekly bars on Monday 00:00 UTC+8. Shorter bars
+# divide 8 hours, so the offset does not move them.
+_EXCHANGE_UTC_OFFSET_MS = 8 * 60 * 60 * 1000
+# Monday 1970-01-05 00:00 UTC+8; the epoch itself was a Thursday.
+_FIRST_WEEK_START_MS = 4 * _UNIT_MS['D'] - _EXCHANGE_UTC_OFFSET_MS
+
+def current_bar_start(timeframe: str, now: Optional[float] = None) -> int:
+    """
+    Returns the open timestamp (ms) of the bar that contains `now`, aligned
+    the way OKX aligns its candles (see _EXCHANGE_UTC_OFFSET_MS).
+
+    Args:
+        timeframe (str): The timeframe of the bar.
+        now (float, optional): A Unix timestamp in seconds. Defaults to the current time.
+    """
+    bar_ms = timeframe_to_ms(timeframe)
+    now_ms = int((time.time() if now is None else now) * 1000)
+    anchor = _FIRST_WEEK_START_MS if timeframe[-1] == 'W' else -_EXCHANGE_UTC_OFFSET_MS
+    return now_ms - ((now_ms - anchor) % bar_ms)
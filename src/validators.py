@@ -1,11 +1,14 @@
 import pandas as pd
 from typing import List, Dict, Any
 
+from src.metrics import STAGE_SECONDS
+
 class DataValidator:
     """
     A class to handle validation of market data.
     """
     @staticmethod
+    @STAGE_SECONDS.labels(stage='validate').timed
     def validate_and_clean_dataframe(data: List[Dict[str, Any]]) -> pd.DataFrame:
         """
         Converts a list of candle data into a cleaned and validated DataFrame.
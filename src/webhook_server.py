@@ -0,0 +1,244 @@
+import asyncio
+import hmac
+import ipaddress
+import json
+import logging
+import signal
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import Bot, Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+# Telegram never sends updates anywhere near this size; anything larger is rejected.
+MAX_BODY_BYTES = 1024 * 1024
+READ_TIMEOUT_SECONDS = 10
+SECRET_TOKEN_HEADER = 'x-telegram-bot-api-secret-token'
+
+class WebhookServer:
+    """
+    A minimal asyncio HTTP server that receives Telegram webhook updates.
+
+    Every connection is handled in its own task, so updates are accepted
+    concurrently and handed to `enqueue` (normally the application's update
+    queue, which is drained by `UPDATE_WORKERS` concurrent workers, one
+    update at a time per chat).
+
+    Endpoints:
+        POST /<path>   Telegram update JSON.
+        GET  /healthz  Liveness: the server is accepting connections.
+        GET  /readyz   Readiness: `is_ready()` reports the bot can process updates.
+    """
+    def __init__(self, bot: Bot, enqueue: Callable[[Update], Awaitable[Any]],
+                 listen: str = '0.0.0.0', port: int = 8443, path: str = 'telegram',
+                 secret_token: Optional[str] = None,
+                 is_ready: Optional[Callable[[], bool]] = None):
+        self.bot = bot
+        self.enqueue = enqueue
+        self.listen = listen
+        self.port = port
+        self.path = '/' + path.strip('/')
+        self.secret_token = secret_token
+        self.is_ready = is_ready or (lambda: True)
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Extra GET routes, e.g. a metrics endpoint: path -> () -> (status, content_type, body)
+        self.routes: Dict[str, Callable[[], Tuple[HTTPStatus, str, bytes]]] = {}
+
+    @property
+    def bound_port(self) -> Optional[int]:
+        """The actual listening port (useful when started with port=0)."""
+        if not self._server or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self):
+        if not self.secret_token and not _is_loopback(self.listen):
+            # Anyone who reaches the port could post forged updates, e.g. commands as any chat.
+            raise ValueError(f"Refusing to listen on {self.listen} without a secret token; "
+                             f"set WEBHOOK_SECRET_TOKEN or listen on a loopback address.")
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        logger.info(f"Webhook server listening on {self.listen}:{self.bound_port}{self.path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            logger.info("Webhook server stopped.")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, headers, body = await asyncio.wait_for(
+                self._read_request(reader), timeout=READ_TIMEOUT_SECONDS
+            )
+            status, content_type, payload = await self._route(method, path, headers, body)
+        except _RequestError as e:
+            status, content_type, payload = e.status, 'text/plain', e.status.phrase.encode()
+        except (ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            status, content_type, payload = HTTPStatus.BAD_REQUEST, 'text/plain', b'Bad Request'
+        except Exception as e:
+            logger.error(f"Unexpected error while handling webhook request: {e}", exc_info=True)
+            status, content_type, payload = HTTPStatus.INTERNAL_SERVER_ERROR, 'text/plain', b'Internal Server Error'
+
+        try:
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n".encode('latin-1') + payload
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        method, target, _ = request_line.split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY_BYTES:
+            raise _RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target.split('?', 1)[0], headers, body
+
+    async def _route(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        if path == self.path:
+            if method != 'POST':
+                raise _RequestError(HTTPStatus.METHOD_NOT_ALLOWED)
+            return await self._handle_update(headers, body)
+        if path not in ('/healthz', '/readyz') and path not in self.routes:
+            raise _RequestError(HTTPStatus.NOT_FOUND)
+        if method != 'GET':
+            raise _RequestError(HTTPStatus.METHOD_NOT_ALLOWED)
+        if path == '/healthz':
+            return HTTPStatus.OK, 'text/plain', b'ok'
+        if path == '/readyz':
+            if self.is_ready():
+                return HTTPStatus.OK, 'text/plain', b'ready'
+            return HTTPStatus.SERVICE_UNAVAILABLE, 'text/plain', b'not ready'
+        return self.routes[path]()
+
+    async def _handle_update(self, headers: Dict[str, str], body: bytes):
+        if self.secret_token and not hmac.compare_digest(headers.get(SECRET_TOKEN_HEADER, '').encode(),
+                                                         self.secret_token.encode()):
+            logger.warning("Rejected webhook request with a missing or invalid secret token.")
+            raise _RequestError(HTTPStatus.FORBIDDEN)
+        if not self.is_ready():
+            # Telegram retries non-2xx deliveries, so nothing is lost while starting up.
+            raise _RequestError(HTTPStatus.SERVICE_UNAVAILABLE)
+
+        try:
+            data = json.loads(body)
+            if not isinstance(data, dict):
+                raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+            update = Update.de_json(data, self.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Rejected malformed webhook update: {e}")
+            raise _RequestError(HTTPStatus.BAD_REQUEST)
+
+        await self.enqueue(update)
+        return HTTPStatus.OK, 'text/plain', b'ok'
+
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class _RequestError(Exception):
+    """Short-circuits request handling with the given HTTP status."""
+    def __init__(self, status: HTTPStatus):
+        super().__init__(status.phrase)
+        self.status = status
+
+
+async def serve_webhook(application: Application, webhook_config: Dict[str, Any]) -> None:
+    """
+    Runs the application in webhook mode until SIGINT/SIGTERM is received.
+
+    The application must have been built with `.updater(None)`. Updates are
+    processed by the application's own update workers, so the concurrency is
+    whatever was passed to `ApplicationBuilder.concurrent_updates`.
+    """
+    server = WebhookServer(
+        application.bot,
+        application.update_queue.put,
+        listen=webhook_config.get('LISTEN', '0.0.0.0'),
+        port=webhook_config.get('PORT', 8443),
+        path=webhook_config.get('PATH', 'telegram'),
+        secret_token=webhook_config.get('SECRET_TOKEN'),
+        is_ready=lambda: application.running,
+    )
+    application.bot_data['webhook_server'] = server
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:  # e.g. on Windows
+            pass
+
+    async with application:
+        # run_polling/run_webhook normally call post_init; this lifecycle is manual.
+        if application.post_init:
+            await application.post_init(application)
+
+        # Bound before the webhook is registered, so a refused listener registers nothing;
+        # updates answer 503 until the application runs.
+        await server.start()
+        try:
+            webhook_url = webhook_config.get('URL')
+            if webhook_url:
+                await application.bot.set_webhook(
+                    url=webhook_url,
+                    secret_token=webhook_config.get('SECRET_TOKEN') or None,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+                logger.info(f"Webhook registered with Telegram: {webhook_url}")
+            else:
+                logger.warning("WEBHOOK_URL is not set; the webhook is not registered with Telegram.")
+
+            await application.start()
+            await stop_event.wait()
+        finally:
+            await server.stop()
+            if application.running:
+                await application.stop()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+if __name__ == '__main__':
+    # Replays a recorded Telegram update against a locally running webhook:
+    # python -m src.webhook_server <update.json> [url] [secret_token]
+    import sys
+    import urllib.request
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.webhook_server <update.json> [url] [secret_token]")
+        sys.exit(1)
+
+    url = sys.argv[2] if len(sys.argv) > 2 else 'http://127.0.0.1:8443/telegram'
+    with open(sys.argv[1], 'rb') as f:
+        request = urllib.request.Request(url, data=f.read(), method='POST',
+                                         headers={'Content-Type': 'application/json'})
+    if len(sys.argv) > 3:
+        request.add_header('X-Telegram-Bot-Api-Secret-Token', sys.argv[3])
+    with urllib.request.urlopen(request) as response:
+        print(response.status, response.read().decode())
@@ -0,0 +1,134 @@
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.database import DatabaseManager
+from src.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# (symbol, timeframe, candles, ttl_hours, updated_at)
+CandleWrite = Tuple[str, str, List[Dict[str, Any]], Optional[int], datetime]
+# A queued write and the (start_ts, end_ts) gaps its candles came back with
+_QueuedWrite = Tuple[CandleWrite, List[Tuple[int, int]]]
+
+
+class CandleWriter:
+    """
+    Persists candle writes on a background thread.
+
+    `submit` only enqueues the write. The writer thread takes everything that
+    has queued up since its last commit and applies it in submission order in
+    a single transaction (group commit), so many small series writes cost one
+    fsync instead of two each. The writer owns its connection and switches the
+    database to WAL, so readers on other connections are not blocked while it
+    commits.
+
+    Readers that need their own writes call `wait_for` (one series) or `flush`
+    (everything). `close` drains the queue; it also runs at interpreter exit.
+
+    A batch that cannot be committed is logged and dropped, so the writer
+    waits up to `busy_timeout` seconds for other connections' locks, e.g. the
+    one-time VACUUM of DatabaseManager.compact.
+    """
+    def __init__(self, db: DatabaseManager, max_batch: int = 512, busy_timeout: float = 600.0):
+        self.db = db
+        self.max_batch = max_batch
+        self.db.enable_wal()
+        self.db.set_busy_timeout(busy_timeout)
+        self._queue: 'queue.Queue[Any]' = queue.Queue()
+        self._pending: Counter = Counter()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='candle-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, symbol: str, timeframe: str, candles: List[Dict[str, Any]], ttl_hours: Optional[int],
+               gaps: Sequence[Tuple[int, int]] = ()):
+        """
+        Queues candles and a metadata refresh for a series (see
+        DatabaseManager.save_candles_many for ttl_hours=None), and an attempt
+        for each of the series' `gaps` that the candles did not fill (see
+        DatabaseManager.record_refetched_gaps).
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("CandleWriter is closed.")
+            self._pending[(symbol, timeframe)] += 1
+        self._queue.put(((symbol, timeframe, candles, ttl_hours, datetime.utcnow()), list(gaps)))
+
+    def pending(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> int:
+        """Returns the number of queued writes, for one series or in total."""
+        with self._cond:
+            if symbol is None:
+                return sum(self._pending.values())
+            return self._pending[(symbol, timeframe)]
+
+    def wait_for(self, symbol: str, timeframe: str, timeout: Optional[float] = None) -> bool:
+        """Blocks until queued writes for a series are applied. Returns False on timeout."""
+        key = (symbol, timeframe)
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending[key], timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every queued write is applied. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not any(self._pending.values()), timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Applies the remaining writes, stops the thread and closes the connection."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Candle writer did not finish within {timeout}s; {self.pending()} writes not persisted.")
+            return
+        self.db.close()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            writes: List[_QueuedWrite] = [item for item in batch if item is not _STOP]
+            if writes:
+                self._apply(writes)
+            if stop:
+                return
+
+    def _apply(self, writes: List[_QueuedWrite]):
+        try:
+            with STAGE_SECONDS.labels(stage='cache_write').time():
+                self.db.save_candles_many([write for write, _ in writes])
+                for (symbol, timeframe, *_), gaps in writes:
+                    if gaps:
+                        self.db.record_refetched_gaps(symbol, timeframe, gaps)
+            logger.debug(f"Candle writer committed {len(writes)} series writes.")
+        except sqlite3.Error as e:
+            logger.error(f"Candle writer failed to persist {len(writes)} series writes: {e}")
+        except Exception:
+            logger.exception("Unexpected error in the candle writer.")
+        finally:
+            with self._cond:
+                for (symbol, timeframe, *_), _ in writes:
+                    key = (symbol, timeframe)
+                    self._pending[key] -= 1
+                    if not self._pending[key]:
+                        del self._pending[key]
+                self._cond.notify_all()
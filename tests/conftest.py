@@ -23,4 +23,9 @@ def mock_fetcher(mock_config):
     """
     # Ensure sandbox mode is explicitly True for tests
     mock_config['exchange']['SANDBOX_MODE'] = True
-    return DataFetcher(mock_config)
\ No newline at end of file
+    return DataFetcher(mock_config)
+
+@pytest.fixture
+def anyio_backend():
+    """Runs the @pytest.mark.anyio tests on asyncio, the loop the bot runs on (modules may override it)."""
+    return 'asyncio'
@@ -0,0 +1,66 @@
+import pytest
+from types import SimpleNamespace
+from telegram.error import Forbidden, RetryAfter, TimedOut
+from src.alert_delivery import AlertDispatcher
+
+class FakeBot:
+    """Records sends and raises queued errors for specific chats."""
+    def __init__(self, errors=None):
+        self.calls = []
+        self.errors = errors or {}
+
+    async def _send(self, kind, chat_id, payload):
+        self.calls.append((kind, chat_id, payload))
+        queued = self.errors.get(chat_id)
+        if queued:
+            raise queued.pop(0)
+        return SimpleNamespace(photo=[SimpleNamespace(file_id='small'), SimpleNamespace(file_id='FILE-ID')])
+
+    async def send_photo(self, chat_id, photo, caption):
+        return await self._send('photo', chat_id, photo)
+
+    async def send_message(self, chat_id, text):
+        return await self._send('message', chat_id, text)
+
+@pytest.mark.anyio
+async def test_chart_is_uploaded_once_and_reused_by_file_id():
+    bot = FakeBot()
+    dispatcher = AlertDispatcher(bot, global_rate=1000, per_chat_interval=0)
+
+    report = await dispatcher.broadcast([1, 2, 3, 2], "alert", photo=b'PNG')
+
+    assert report == {'sent': 3, 'failed': 0, 'blocked': []}
+    payloads = [payload for _, _, payload in bot.calls]
+    assert payloads[0] == b'PNG'
+    assert payloads[1:] == ['FILE-ID', 'FILE-ID']
+
+@pytest.mark.anyio
+async def test_retry_after_and_transient_errors_are_retried():
+    bot = FakeBot(errors={2: [RetryAfter(0)], 3: [TimedOut()]})
+    dispatcher = AlertDispatcher(bot, global_rate=1000, per_chat_interval=0)
+
+    report = await dispatcher.broadcast([1, 2, 3], "alert")
+
+    assert report['sent'] == 3
+    assert [chat for _, chat, _ in bot.calls].count(2) == 2
+
+@pytest.mark.anyio
+async def test_blocked_chats_are_reported_and_dropped():
+    dropped = []
+    bot = FakeBot(errors={2: [Forbidden("bot was blocked by the user")]})
+    dispatcher = AlertDispatcher(bot, global_rate=1000, per_chat_interval=0, on_blocked=dropped.append)
+
+    report = await dispatcher.broadcast([1, 2], "alert")
+
+    assert report == {'sent': 1, 'failed': 0, 'blocked': [2]}
+    assert dropped == [2]
+
+@pytest.mark.anyio
+async def test_failed_upload_falls_back_to_next_recipient():
+    bot = FakeBot(errors={1: [Forbidden("blocked")]})
+    dispatcher = AlertDispatcher(bot, global_rate=1000, per_chat_interval=0)
+
+    await dispatcher.broadcast([1, 2, 3], "alert", photo=b'PNG')
+
+    payloads = [(chat, payload) for _, chat, payload in bot.calls]
+    assert payloads == [(1, b'PNG'), (2, b'PNG'), (3, 'FILE-ID')]
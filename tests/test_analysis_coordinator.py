@@ -0,0 +1,174 @@
+import pytest
+import pandas as pd
+from src.analysis_coordinator import AnalysisCoordinator
+from src.utils.timeframe_util import current_bar_start
+from tests.helpers import FakeClock
+
+FIVE_MINUTES = 300_000
+
+@pytest.fixture
+def mock_config():
+    """Provides a mock configuration with a short timeframe hierarchy."""
+    return {
+        'trading': {
+            'TIMEFRAME_HIERARCHY': {'5m': '30m', '15m': '30m', '30m': '4H'},
+            'CANDLE_FETCH_LIMITS': {'default': 100},
+        },
+        'strategy_params': {
+            'fibo_strategy': {
+                'sma_period_fast': 5, 'sma_period_slow': 10,
+                'swing_lookback_period': 50, 'swing_comparison_window': 3,
+                'adx_trend_threshold': 20, 'signal_threshold': 3,
+                'require_adx_confirmation': False,
+            }
+        },
+        'risk_management': {'atr_multiplier_sl': 2.0}
+    }
+
+def _sample_data(data_len=100):
+    base_price = 100
+    close = [base_price + (0.1 if i % 2 == 0 else -0.1) for i in range(data_len)]
+    for i in range(data_len - 5, data_len):
+        close[i] = close[i - 1] + 5.0
+    df = pd.DataFrame({
+        'timestamp': [1672531200000 + i * 60000 for i in range(data_len)],
+        'open': [c - 1.0 for c in close],
+        'high': [c + 1.0 for c in close],
+        'low': [c - 1.0 for c in close],
+        'close': close,
+        'volume': [1000] * data_len,
+    })
+    df.loc[70, 'low'] = base_price - 10
+    df.loc[90, 'high'] = base_price + 5
+    return df
+
+class CountingLoader:
+    """Stands in for the cache/API loader and records every series it loads."""
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, symbol, timeframe, limit):
+        self.calls.append((symbol, timeframe))
+        return _sample_data()
+
+@pytest.mark.anyio
+async def test_parent_is_analyzed_once_for_all_children(mock_config):
+    loader = CountingLoader()
+    coordinator = AnalysisCoordinator(mock_config, loader, fetcher=object(), clock=FakeClock(1_700_000_000.0))
+
+    _, result_5m = await coordinator.analyze('BTC/USDT', '5m')
+    _, result_15m = await coordinator.analyze('BTC-USDT', '15m')
+
+    assert loader.calls.count(('BTC-USDT', '30m')) == 1
+    assert loader.calls.count(('BTC-USDT', '4H')) == 1
+    assert result_5m['higher_tf_trend_info']['timeframe'] == '30m'
+    assert result_15m['higher_tf_trend_info']['timeframe'] == '30m'
+
+@pytest.mark.anyio
+async def test_series_is_reanalyzed_on_a_new_bar(mock_config):
+    loader = CountingLoader()
+    clock = FakeClock(1_700_000_000.0)
+    coordinator = AnalysisCoordinator(mock_config, loader, fetcher=object(), clock=clock)
+
+    await coordinator.analyze('BTC-USDT', '5m')
+    await coordinator.analyze('BTC-USDT', '5m')
+    assert loader.calls.count(('BTC-USDT', '5m')) == 1
+
+    clock.now += 300
+    await coordinator.analyze('BTC-USDT', '5m')
+    assert loader.calls.count(('BTC-USDT', '5m')) == 2
+
+@pytest.mark.anyio
+async def test_stage_callback_skips_memoized_series(mock_config):
+    coordinator = AnalysisCoordinator(mock_config, CountingLoader(), fetcher=object(), clock=FakeClock(1_700_000_000.0))
+    await coordinator.analyze('BTC-USDT', '30m')
+
+    stages = []
+    async def on_stage(stage, symbol, timeframe):
+        stages.append((stage, timeframe))
+
+    await coordinator.analyze('BTC-USDT', '5m', on_stage=on_stage)
+    assert stages == [('fetching', '5m'), ('analyzing', '5m')]
+
+class LiveLoader(CountingLoader):
+    """Returns 5m-spaced candles that end with the last bar closed before the clock."""
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    async def __call__(self, symbol, timeframe, limit):
+        self.calls.append((symbol, timeframe))
+        df = _sample_data()
+        last_closed = current_bar_start('5m', self.clock()) - FIVE_MINUTES
+        df['timestamp'] = [last_closed - (len(df) - 1 - i) * FIVE_MINUTES for i in range(len(df))]
+        return df
+
+@pytest.mark.anyio
+async def test_bar_close_extends_the_window_without_reloading(mock_config):
+    clock = FakeClock(1_700_000_010.0)
+    loader = LiveLoader(clock)
+    coordinator = AnalysisCoordinator(mock_config, loader, fetcher=object(), clock=clock)
+    await coordinator.analyze('BTC-USDT', '5m')
+
+    closed_bar = current_bar_start('5m', clock())
+    clock.now += 300
+    candle = {'timestamp': closed_bar, 'open': 120, 'high': 126, 'low': 119, 'close': 125, 'volume': 1000, 'confirm': True}
+    df, result = await coordinator.on_bar_close('BTC/USDT', '5m', candle)
+
+    assert loader.calls.count(('BTC-USDT', '5m')) == 1
+    assert df['timestamp'].iloc[-1] == closed_bar
+    assert result['current_price'] == 125
+    # A later request in the same bar reuses the bar-close analysis.
+    assert (await coordinator.analyze('BTC-USDT', '5m'))[1] is result
+
+@pytest.mark.anyio
+async def test_bar_close_after_a_missed_bar_reloads_the_series(mock_config):
+    clock = FakeClock(1_700_000_010.0)
+    loader = LiveLoader(clock)
+    coordinator = AnalysisCoordinator(mock_config, loader, fetcher=object(), clock=clock)
+    await coordinator.analyze('BTC-USDT', '5m')
+
+    clock.now += 600
+    candle = {'timestamp': current_bar_start('5m', clock()) - FIVE_MINUTES,
+              'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 1, 'confirm': True}
+    await coordinator.on_bar_close('BTC-USDT', '5m', candle)
+    assert loader.calls.count(('BTC-USDT', '5m')) == 2
+
+class StaleCache:
+    """Stands in for the cache read that ignores the TTL."""
+    def __init__(self, expired, age=7200.0):
+        self.expired = expired
+        self.age = age
+
+    async def __call__(self, symbol, timeframe, limit, expired_only):
+        if expired_only and not self.expired:
+            return None
+        return _sample_data(), self.age, self.expired
+
+@pytest.mark.anyio
+async def test_peek_serves_expired_data_without_loading(mock_config):
+    loader = CountingLoader()
+    coordinator = AnalysisCoordinator(mock_config, loader, fetcher=object(), clock=FakeClock(1_700_000_000.0),
+                                      stale_loader=StaleCache(expired=True))
+
+    df, result, age = await coordinator.peek('BTC/USDT', '5m')
+    assert loader.calls == []
+    assert age == 7200.0
+    assert result['higher_tf_trend_info']['timeframe'] == '30m'
+    assert len(df) == 100
+
+    # Once analyzed for the current bar, there is nothing stale to serve.
+    await coordinator.analyze('BTC-USDT', '5m')
+    assert await coordinator.peek('BTC-USDT', '5m') is None
+
+@pytest.mark.anyio
+async def test_peek_defers_to_analyze_when_the_cache_is_fresh(mock_config):
+    coordinator = AnalysisCoordinator(mock_config, CountingLoader(), fetcher=object(), clock=FakeClock(1_700_000_000.0),
+                                      stale_loader=StaleCache(expired=False))
+    assert await coordinator.peek('BTC-USDT', '5m') is None
+    assert await AnalysisCoordinator(mock_config, CountingLoader(), fetcher=object()).peek('BTC-USDT', '5m') is None
+
+def test_cyclic_hierarchy_is_rejected(mock_config):
+    mock_config['trading']['TIMEFRAME_HIERARCHY'] = {'5m': '30m', '30m': '5m'}
+    with pytest.raises(ValueError):
+        AnalysisCoordinator(mock_config, CountingLoader())
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from src.analysis_queue import AnalysisQueue, QueueFullError
+
+class Gate:
+    """A job factory that records when it starts and blocks until released."""
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.log.append(self.name)
+        await self.release.wait()
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.anyio
+async def test_jobs_are_scheduled_round_robin_across_users():
+    queue = AnalysisQueue(max_concurrent=1, per_user_inflight=1, per_user_pending=5)
+    started = []
+    jobs = {name: Gate(name, started) for name in ['a1', 'a2', 'a3', 'b1', 'c1']}
+
+    assert queue.submit('a', jobs['a1']) == 0
+    assert queue.submit('a', jobs['a2']) == 1
+    assert queue.submit('a', jobs['a3']) == 2
+    # b1 and c1 overtake the rest of user a's backlog, one job per user per round
+    assert queue.submit('b', jobs['b1']) == 2
+    assert queue.submit('c', jobs['c1']) == 3
+    assert queue.position(jobs['a3']) == 4
+
+    for name in ['a1', 'a2', 'b1', 'c1', 'a3']:
+        await _settle()
+        assert started[-1] == name
+        jobs[name].release.set()
+    await queue.join()
+    assert started == ['a1', 'a2', 'b1', 'c1', 'a3']
+
+@pytest.mark.anyio
+async def test_global_and_per_user_limits_are_respected():
+    queue = AnalysisQueue(max_concurrent=2, per_user_inflight=1, per_user_pending=5)
+    started = []
+    a1, a2, b1 = Gate('a1', started), Gate('a2', started), Gate('b1', started)
+
+    queue.submit('a', a1)
+    queue.submit('a', a2)
+    queue.submit('b', b1)
+    await _settle()
+
+    # a2 waits for a1 even though a global slot would be free for it
+    assert sorted(started) == ['a1', 'b1']
+    assert queue.running == 2 and queue.pending == 1
+
+    a1.release.set()
+    await _settle()
+    assert started[-1] == 'a2'
+    a2.release.set()
+    b1.release.set()
+    await queue.join()
+    assert queue.running == 0 and queue.pending == 0
+
+@pytest.mark.anyio
+async def test_submit_rejects_when_user_backlog_is_full():
+    queue = AnalysisQueue(max_concurrent=1, per_user_inflight=1, per_user_pending=1)
+    started = []
+    first, second = Gate('first', started), Gate('second', started)
+
+    queue.submit('a', first)
+    await _settle()
+    queue.submit('a', second)
+    with pytest.raises(QueueFullError):
+        queue.submit('a', Gate('third', started))
+
+    first.release.set()
+    second.release.set()
+    await queue.join()
+
+@pytest.mark.anyio
+async def test_failing_job_frees_its_slot():
+    queue = AnalysisQueue(max_concurrent=1)
+
+    async def boom():
+        raise RuntimeError("boom")
+
+    queue.submit('a', boom)
+    await queue.join()
+    assert queue.running == 0
+    done = []
+
+    async def ok():
+        done.append(True)
+
+    assert queue.submit('a', ok) == 0
+    await queue.join()
+    assert done == [True]
@@ -0,0 +1,97 @@
+import os
+import pytest
+import pandas as pd
+from src.analysis_coordinator import AnalysisCoordinator
+from src.analysis_workers import ShardedAnalysisCoordinator, shard_for
+from src.strategies.exceptions import InsufficientDataError
+
+CONFIG = {
+    'trading': {
+        'TIMEFRAME_HIERARCHY': {'5m': '30m', '30m': '4H'},
+        'CANDLE_FETCH_LIMITS': {'default': 100},
+    },
+    'strategy_params': {
+        'fibo_strategy': {
+            'sma_period_fast': 5, 'sma_period_slow': 10,
+            'swing_lookback_period': 50, 'swing_comparison_window': 3,
+            'adx_trend_threshold': 20, 'signal_threshold': 3,
+            'require_adx_confirmation': False,
+        }
+    },
+    'risk_management': {'atr_multiplier_sl': 2.0}
+}
+
+async def load_sample(config, symbol, timeframe, limit):
+    """Module-level so the spawned workers can import it."""
+    if symbol == 'EMPTY-USDT':
+        raise InsufficientDataError(f"No data for {symbol}", required=limit, available=0)
+    if symbol == 'CRASH-USDT':
+        os._exit(3)
+    seed = sum(map(ord, symbol)) % 5
+    close = [100 + seed + (0.1 if i % 2 == 0 else -0.1) for i in range(limit)]
+    for i in range(limit - 5, limit):
+        close[i] = close[i - 1] + 1.0 + seed
+    df = pd.DataFrame({
+        'timestamp': [1672531200000 + i * 60000 for i in range(limit)],
+        'open': [c - 1.0 for c in close], 'high': [c + 1.0 for c in close],
+        'low': [c - 1.0 for c in close], 'close': close, 'volume': [1000] * limit,
+    })
+    df.loc[70, 'low'] = 90
+    df.loc[90, 'high'] = 105
+    return df
+
+@pytest.fixture(scope='module')
+def sharded():
+    coordinator = ShardedAnalysisCoordinator(CONFIG, workers=2, data_loader=load_sample)
+    yield coordinator
+    coordinator.close()
+
+def test_shards_are_stable_and_spread_the_watchlist():
+    symbols = [f'C{i}-USDT' for i in range(100)]
+    shards = [shard_for(symbol, 4) for symbol in symbols]
+    assert shards == [shard_for(symbol.replace('-', '/'), 4) for symbol in symbols]
+    assert all(shards.count(shard) > 10 for shard in range(4))
+
+@pytest.mark.anyio
+async def test_workers_return_the_in_process_analysis(sharded):
+    local = AnalysisCoordinator(CONFIG, lambda *args: load_sample(CONFIG, *args), fetcher=object())
+    for symbol in ('BTC/USDT', 'ETH-USDT', 'SOL-USDT'):
+        df, result = await sharded.analyze(symbol, '5m')
+        _, expected = await local.analyze(symbol, '5m')
+        assert isinstance(df, pd.DataFrame)
+        assert (result['signal'], result['confidence'], result['higher_tf_trend_info']) == \
+               (expected['signal'], expected['confidence'], expected['higher_tf_trend_info'])
+
+@pytest.mark.anyio
+async def test_stages_are_relayed_and_results_stay_memoized_on_the_owning_worker(sharded):
+    stages = []
+    async def on_stage(stage, symbol, timeframe):
+        stages.append((stage, timeframe))
+
+    await sharded.analyze('LINK-USDT', '30m', on_stage=on_stage)
+    assert stages == [('fetching', '4H'), ('analyzing', '4H'), ('fetching', '30m'), ('analyzing', '30m')]
+    stages.clear()
+    await sharded.analyze('LINK/USDT', '5m', on_stage=on_stage)
+    assert stages == [('fetching', '5m'), ('analyzing', '5m')]
+
+@pytest.mark.anyio
+async def test_errors_propagate_and_a_crashed_worker_is_replaced(sharded):
+    with pytest.raises(InsufficientDataError):
+        await sharded.analyze('EMPTY-USDT', '4H')
+    with pytest.raises(RuntimeError, match='exited unexpectedly'):
+        await sharded.analyze('CRASH-USDT', '4H')
+    neighbour = next(f'C{i}-USDT' for i in range(100) if shard_for(f'C{i}-USDT', 2) == shard_for('CRASH-USDT', 2))
+    _, result = await sharded.analyze(neighbour, '4H')
+    assert result['signal']
+
+def test_this_process_keeps_one_share_of_the_rate_budget():
+    from src.rate_limiter import shared_rate_limiter
+    limiter = shared_rate_limiter('okx-rest', 12.0)
+    limiter.set_rate(12.0)
+    config = {**CONFIG, 'exchange': {'RATE_LIMIT': 12.0}}
+    coordinator = ShardedAnalysisCoordinator(config, workers=2, data_loader=load_sample)
+    try:
+        assert limiter.rate == 4.0 and limiter.burst == 4
+        assert coordinator._worker_config['exchange']['RATE_LIMIT'] == 4.0
+    finally:
+        coordinator.close()
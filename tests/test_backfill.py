@@ -0,0 +1,158 @@
+import time
+import pytest
+from src.backfill import GapBackfiller
+from src.cache_manager import CacheManager
+from src.data_retrieval.exceptions import NetworkError
+from src.database import create_database_manager
+
+MINUTE = 60_000
+START = 1672531200000
+
+def _columns(indexes, step=MINUTE):
+    timestamps = [START + i * step for i in indexes]
+    return (timestamps, *([100.0 + i for i in indexes] for _ in range(5)))
+
+class _FakeFetcher:
+    """Serves a complete series, except for ranges the 'exchange' has no data for."""
+    def __init__(self, missing_on_exchange=(), fail=False):
+        self.missing_on_exchange = set(missing_on_exchange)
+        self.fail = fail
+        self.calls = []
+
+    def fetch_range(self, symbol, timeframe, start_ts, end_ts):
+        self.calls.append((symbol, timeframe, start_ts, end_ts))
+        if self.fail:
+            raise NetworkError("exchange unreachable")
+        data = [
+            {'timestamp': ts, 'open': 1.0, 'high': 1.0, 'low': 1.0, 'close': 1.0, 'volume': 1.0}
+            for ts in range(start_ts, end_ts, MINUTE) if ts not in self.missing_on_exchange
+        ]
+        return {'symbol': symbol, 'data': data}
+
+@pytest.fixture(params=['rows', 'chunked'])
+def db(request, tmp_path):
+    manager = create_database_manager(str(tmp_path / "cache.db"), storage=request.param)
+    yield manager
+    manager.close()
+
+def test_find_gaps_uses_bar_spacing_per_timeframe(db):
+    db.bulk_insert_candles('BTC-USDT', '1m', [_columns([*range(0, 10), *range(13, 20), 40])])
+    db.bulk_insert_candles('BTC-USDT', '1H', [_columns([0, 1, 2, 5], step=60 * MINUTE)])
+    db.bulk_insert_candles('ETH-USDT', '1m', [_columns(range(100))])
+
+    assert sorted(db.find_gaps()) == [
+        ('BTC-USDT', '1H', START + 3 * 60 * MINUTE, START + 5 * 60 * MINUTE),
+        ('BTC-USDT', '1m', START + 10 * MINUTE, START + 13 * MINUTE),
+        ('BTC-USDT', '1m', START + 20 * MINUTE, START + 40 * MINUTE),
+    ]
+    assert db.find_gaps('ETH-USDT', '1m') == []
+
+def test_backfill_fetches_only_missing_ranges(db):
+    db.bulk_insert_candles('BTC-USDT', '1m', [_columns([*range(0, 10), *range(13, 20)])])
+    fetcher = _FakeFetcher()
+
+    report = GapBackfiller(db, fetcher).run()
+    assert fetcher.calls == [('BTC-USDT', '1m', START + 10 * MINUTE, START + 13 * MINUTE)]
+    assert report == {'open': 1, 'attempted': 1, 'filled': 1, 'inserted': 3, 'failed': 0}
+    assert db.find_gaps() == [] and db.get_gaps() == []
+    assert len(db.get_candles('BTC-USDT', '1m')) == 20
+
+def test_gaps_missing_on_the_exchange_are_given_up_after_max_attempts(db):
+    db.bulk_insert_candles('BTC-USDT', '1m', [_columns([0, 5])])
+    hole = range(START + MINUTE, START + 5 * MINUTE, MINUTE)
+    backfiller = GapBackfiller(db, _FakeFetcher(missing_on_exchange=hole), max_attempts=2)
+
+    for _ in range(3):
+        backfiller.run()
+    assert len(backfiller.fetcher.calls) == 2
+    assert db.get_gaps()[0]['attempts'] == 2
+
+    failing = GapBackfiller(db, _FakeFetcher(fail=True), max_attempts=5)
+    assert failing.run()['failed'] == 1
+    assert db.get_gaps()[0]['attempts'] == 3
+
+def test_long_gaps_are_filled_newest_first_without_counting_attempts(db):
+    db.bulk_insert_candles('BTC-USDT', '1m', [_columns([0, 101])])
+    backfiller = GapBackfiller(db, _FakeFetcher(), max_bars_per_gap=40)
+
+    backfiller.run()
+    assert db.get_gaps() == [{'symbol': 'BTC-USDT', 'timeframe': '1m', 'start_ts': START + MINUTE,
+                              'end_ts': START + 61 * MINUTE, 'attempts': 0, 'last_attempt': None}]
+    backfiller.run()
+    backfiller.run()
+    assert db.find_gaps() == []
+
+def test_cache_manager_treats_series_with_holes_as_a_miss(tmp_path):
+    manager = CacheManager(str(tmp_path / "cache.db"), default_ttl_hours=1)
+    candles = [{'timestamp': START + i * MINUTE, 'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 1}
+               for i in (0, 1, 2, 4)]
+    manager.set('BTC/USDT', '1m', candles)
+    assert manager.get('BTC/USDT', '1m') is None
+    manager.set('BTC/USDT', '1m', [{**candles[0], 'timestamp': START + 3 * MINUTE}])
+    assert len(manager.get('BTC/USDT', '1m')) == 5
+    manager.close()
+
+@pytest.mark.parametrize('storage,write_behind', [('rows', False), ('chunked', False), ('rows', True)])
+def test_cache_manager_serves_holes_the_exchange_keeps_sending(tmp_path, storage, write_behind):
+    manager = CacheManager(str(tmp_path / "cache.db"), default_ttl_hours=1, storage=storage,
+                           write_behind=write_behind, max_gap_attempts=2)
+    if write_behind:
+        # The attempts are counted by the writer, never on the request path.
+        manager.db.record_refetched_gaps = None
+    candles = [{'timestamp': START + i * MINUTE, 'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 1}
+               for i in (0, 1, 2, 4)]
+    manager.set('BTC/USDT', '1m', candles)
+    assert manager.get('BTC/USDT', '1m') is None and manager.get_stale('BTC/USDT', '1m') is None
+
+    # The refetch brings back the same hole: from now on it is served.
+    manager.set('BTC/USDT', '1m', candles)
+    assert manager.get('BTC/USDT', '1m') == candles
+    assert manager.get_stale('BTC/USDT', '1m')[0] == candles
+    assert manager.db.get_gaps(symbol='BTC-USDT', timeframe='1m')[0]['attempts'] == 2
+
+    # A new hole is a miss again until it, too, has been refetched enough.
+    manager.set('BTC/USDT', '1m', [{**candles[0], 'timestamp': START + 6 * MINUTE}])
+    assert manager.get('BTC/USDT', '1m') is None
+    manager.close()
+
+def test_cache_manager_serves_holes_the_backfiller_gave_up_on(tmp_path):
+    manager = CacheManager(str(tmp_path / "cache.db"), default_ttl_hours=1, max_gap_attempts=1)
+    manager.db.bulk_insert_candles('BTC-USDT', '1m', [_columns([0, 5])])
+    manager.db.update_cache_metadata('BTC-USDT', '1m', 1)
+    assert manager.get('BTC/USDT', '1m') is None
+
+    hole = range(START + MINUTE, START + 5 * MINUTE, MINUTE)
+    GapBackfiller(manager.db, _FakeFetcher(missing_on_exchange=hole), max_attempts=1).run()
+    assert len(manager.get('BTC/USDT', '1m')) == 2
+    manager.close()
+
+def test_full_store_check_runs_in_bulk(tmp_path):
+    db = create_database_manager(str(tmp_path / "cache.db"))
+    for s in range(20):
+        db.bulk_insert_candles(f'S{s}-USDT', '1m', [_columns([i for i in range(10_000) if i % 1000 != 999])])
+    started = time.perf_counter()
+    gaps = db.refresh_gap_index()
+    assert len(gaps) == 20 * 9
+    assert time.perf_counter() - started < 5
+    db.close()
+
+def test_fetch_range_pages_backwards_with_the_after_cursor():
+    from src.data_retrieval.data_fetcher import DataFetcher
+
+    class _MarketAPI:
+        """OKX semantics: `after` returns candles older than the cursor, newest first."""
+        def __init__(self):
+            self.cursors = []
+
+        def get_history_candlesticks(self, instId, bar, limit, after='', before=''):
+            self.cursors.append(after)
+            newest = int(after) - MINUTE if after else START + 999 * MINUTE
+            rows = [[str(ts), '1', '1', '1', '1', '1', '0', '0', '1']
+                    for ts in range(newest, max(newest - int(limit) * MINUTE, START - MINUTE), -MINUTE)]
+            return {'code': '0', 'data': rows}
+
+    fetcher = DataFetcher.__new__(DataFetcher)
+    fetcher.market_api = _MarketAPI()
+    data = fetcher.fetch_range('BTC/USDT', '1m', START + 750 * MINUTE, START + 900 * MINUTE)['data']
+    assert [c['timestamp'] for c in data] == [START + i * MINUTE for i in range(750, 900)]
+    assert fetcher.market_api.cursors == [str(START + 900 * MINUTE), str(START + 800 * MINUTE)]
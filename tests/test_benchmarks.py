@@ -0,0 +1,52 @@
+import pytest
+from src import benchmarks
+from src.benchmarks import BenchmarkSeries, Stage, compare, measure, run_suite, synthetic_candles
+
+@pytest.fixture(scope="module")
+def series(mock_config):
+    return BenchmarkSeries('synthetic-600', 'SYN-USDT', '1m', synthetic_candles(600), mock_config)
+
+def test_synthetic_candles_are_reproducible_and_consistent():
+    candles = synthetic_candles(500, seed=3)
+    assert candles == synthetic_candles(500, seed=3)
+    assert candles != synthetic_candles(500, seed=4)
+    assert all(c['low'] <= min(c['open'], c['close']) and c['high'] >= max(c['open'], c['close']) for c in candles)
+    assert candles[1]['timestamp'] - candles[0]['timestamp'] == 60_000
+
+def test_measure_times_calls_with_fresh_arguments_and_traces_memory(series):
+    prepared = []
+
+    def allocate(values):
+        prepared.append(values)
+        return bytearray(1 << 20)
+
+    result = measure(Stage('allocate', allocate, lambda s: ([],)), series, repeat=3)
+    assert result['runs'] == 3 and result['number'] >= 1
+    assert 0 < result['min'] <= result['median']
+    assert result['peak_bytes'] >= 1 << 20
+    # One argument set per call, none reused.
+    assert len({id(values) for values in prepared}) == len(prepared)
+
+def test_suite_covers_the_stages_and_reports_failures(series):
+    stages = [stage for stage in benchmarks.default_stages() if stage.name != 'generate_analysis_chart']
+    stages.append(Stage('broken', lambda: 1 / 0, lambda s: ()))
+    stages.append(Stage('too_long', lambda: None, lambda s: (), max_bars=100))
+    report = run_suite([series], stages, repeat=1, budget=0)
+
+    results = report['results']
+    assert 'too_long@synthetic-600' not in results
+    assert results['broken@synthetic-600']['error'].startswith('ZeroDivisionError')
+    for name in ('calculate_adx', 'get_candlestick_pattern', 'find_recent_swing_points', 'get_analysis',
+                 'validate_and_clean_dataframe', 'format_analysis_from_template'):
+        assert results[f'{name}@synthetic-600']['min'] > 0
+
+def test_compare_flags_only_regressions_beyond_tolerance_and_noise():
+    def report(**results):
+        return {'results': {key: {'min': t, 'peak_bytes': m} for key, (t, m) in results.items()}}
+
+    baseline = report(slow=(0.010, 1 << 20), fat=(0.010, 1 << 20), noise=(0.00001, 1000), same=(0.010, 1 << 20))
+    current = report(slow=(0.020, 1 << 20), fat=(0.010, 4 << 20), noise=(0.00003, 9000), same=(0.011, 1 << 20),
+                     new=(1.0, 1 << 30))
+    regressions = compare(current, baseline, tolerance=0.25)
+    assert {(r['key'], r['metric']) for r in regressions} == {('slow', 'min'), ('fat', 'peak_bytes')}
+    assert next(r for r in regressions if r['key'] == 'slow')['ratio'] == pytest.approx(2.0)
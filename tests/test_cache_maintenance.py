@@ -0,0 +1,86 @@
+import os
+import pytest
+from src.cache_maintenance import DAY_MS, RetentionPolicy, apply_retention, evict_to_budget, maintain_cache
+from src.cache_manager import CacheManager
+from src.database import create_database_manager
+
+MINUTE = 60_000
+START = 1672531200000
+
+def _columns(count, start=START, step=MINUTE):
+    timestamps = [start + i * step for i in range(count)]
+    return (timestamps, *([100.0 + i for i in range(count)] for _ in range(5)))
+
+@pytest.fixture(params=['rows', 'chunked'])
+def db(request, tmp_path):
+    manager = create_database_manager(str(tmp_path / "cache.db"), storage=request.param)
+    yield manager
+    manager.close()
+
+def test_retention_keeps_newest_bars_and_days_per_timeframe(db):
+    db.bulk_insert_candles('BTC-USDT', '1m', [_columns(1000)])
+    db.bulk_insert_candles('BTC-USDT', '1H', [_columns(50, step=60 * MINUTE)])
+    db.bulk_insert_candles('ETH-USDT', '5m', [_columns(100, step=5 * MINUTE)])
+    policy = RetentionPolicy(bars={'default': 0, '1m': 300}, days={'5m': 1})
+
+    # 'now' is one day after the 20th 5m bar: the first 20 are out of the window.
+    deleted = apply_retention(db, policy, now_ms=START + 20 * 5 * MINUTE + DAY_MS)
+    assert deleted == 700 + 20
+
+    candles = db.get_candles('BTC-USDT', '1m', 10_000)
+    assert len(candles) == 300 and candles[0]['timestamp'] == START + 700 * MINUTE
+    assert len(db.get_candles('BTC-USDT', '1H', 10_000)) == 50
+    assert db.get_candles('ETH-USDT', '5m', 1)[0]['timestamp'] == START + 99 * 5 * MINUTE
+    assert len(db.get_candles('ETH-USDT', '5m', 10_000)) == 80
+
+def test_eviction_drops_least_recently_read_series_first(db):
+    for symbol in ('AAA-USDT', 'BBB-USDT', 'CCC-USDT'):
+        db.save_candles(symbol, '1m', [
+            {'timestamp': ts, 'open': 1.0, 'high': 1.0, 'low': 1.0, 'close': 1.0, 'volume': 1.0}
+            for ts in _columns(3000)[0]
+        ], ttl_hours=1)
+    db.touch_series({('AAA-USDT', '1m'): '2030-01-02 00:00:00', ('BBB-USDT', '1m'): '2030-01-01 00:00:00'})
+
+    assert evict_to_budget(db, max_bytes=1 << 40) == []
+    stats = db.page_stats()
+    live = (stats['page_count'] - stats['freelist_count']) * stats['page_size']
+    evicted = evict_to_budget(db, max_bytes=int(live * 0.5))
+    # CCC was never read, BBB was read before AAA.
+    assert evicted == [('CCC-USDT', '1m'), ('BBB-USDT', '1m')]
+    assert db.get_cache_metadata('CCC-USDT', '1m') is None
+    assert [s['symbol'] for s in db.list_series()] == ['AAA-USDT']
+
+def test_maintenance_shrinks_the_file_and_keeps_metadata_reads(tmp_path):
+    path = str(tmp_path / "cache.db")
+    manager = CacheManager(path, default_ttl_hours=1)
+    manager.db.bulk_insert_candles('BTC-USDT', '1m', [_columns(50_000)])
+    manager.set('ETH/USDT', '1H', [
+        {'timestamp': START, 'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 1}
+    ])
+    assert manager.get('ETH/USDT', '1H') is not None
+    size_before = os.path.getsize(path)
+
+    report = manager.maintain(RetentionPolicy(bars={'default': 1000}))
+    assert report['deleted'] == 49_000 and report['evicted'] == []
+    assert report['released_pages'] > 0
+    assert os.path.getsize(path) < size_before / 5
+    eth = next(s for s in manager.db.list_series() if s['symbol'] == 'ETH-USDT')
+    assert eth['last_accessed'] is not None
+    assert manager.db._conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    manager.close()
+
+def test_legacy_file_is_converted_to_incremental_auto_vacuum(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE cache_metadata (symbol TEXT NOT NULL, timeframe TEXT NOT NULL, '
+                 'last_updated TIMESTAMP NOT NULL, ttl_hours INTEGER NOT NULL, PRIMARY KEY (symbol, timeframe))')
+    conn.commit()
+    conn.close()
+
+    db = create_database_manager(path)
+    assert db._conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 0
+    report = maintain_cache(db, RetentionPolicy())
+    assert report['deleted'] == 0
+    assert db._conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    db.close()
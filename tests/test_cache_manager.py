@@ -72,6 +72,34 @@ def test_cache_expiration(cache_manager):
 
     assert retrieved_data is None
 
+def test_get_stale_serves_expired_data_with_its_age(cache_manager, monkeypatch):
+    """
+    Tests that get_stale() serves expired data, and skips the candle read when
+    the metadata rules the series out.
+    """
+    symbol = "ETH/USDT"
+    timeframe = "4h"
+    test_data = [
+        {'timestamp': 1672531200000, 'open': 2000, 'high': 2100, 'low': 1900, 'close': 2050, 'volume': 5000}
+    ]
+    cache_manager.set(symbol, timeframe, test_data)
+    reads = []
+    get_candles = cache_manager.db.get_candles
+    monkeypatch.setattr(cache_manager.db, 'get_candles', lambda *args: reads.append(args) or get_candles(*args))
+
+    # Still fresh: nothing to serve stale.
+    assert cache_manager.get_stale(symbol, timeframe, expired_only=True) is None
+    assert reads == []
+    assert cache_manager.get_stale(symbol, timeframe)[2] is False
+
+    time.sleep(1.1)
+    candles, age, expired = cache_manager.get_stale(symbol, timeframe, expired_only=True)
+    assert candles == test_data
+    assert expired and age >= 1.0
+    assert cache_manager.get_stale(symbol, timeframe, max_age=1.0) is None
+    assert len(reads) == 2
+    assert cache_manager.get_stale("XRP/USDT", timeframe) is None
+
 def test_set_empty_data_does_not_save(cache_manager):
     """
     Tests that calling set() with empty data does not create a cache entry.
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import pytest
+from websockets.asyncio.server import serve
+from src.cache_manager import CacheManager
+from src.candle_stream import CandleStream
+
+MINUTE = 60_000
+START = 1672531200000
+
+class FakeOkxServer:
+    """
+    A local stand-in for the OKX business WebSocket endpoint.
+
+    Acknowledges subscribe/unsubscribe like OKX, answers 'ping' with 'pong',
+    and lets tests push candle rows to subscribers or drop every connection.
+    """
+    def __init__(self):
+        self.subscriptions = []  # every subscribe arg received, in order
+        self.connections = set()
+        self.subscribed = asyncio.Event()
+        self.pings = 0
+        self.answer_pings = True
+        self._server = None
+
+    @property
+    def url(self):
+        port = self._server.sockets[0].getsockname()[1]
+        return f'ws://127.0.0.1:{port}/ws/v5/business'
+
+    async def __aenter__(self):
+        self._server = await serve(self._handler, '127.0.0.1', 0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handler(self, websocket):
+        self.connections.add(websocket)
+        try:
+            async for message in websocket:
+                if message == 'ping':
+                    self.pings += 1
+                    if self.answer_pings:
+                        await websocket.send('pong')
+                    continue
+                request = json.loads(message)
+                for arg in request['args']:
+                    if request['op'] == 'subscribe':
+                        self.subscriptions.append(arg)
+                    await websocket.send(json.dumps({'event': request['op'], 'arg': arg, 'connId': 'test'}))
+                self.subscribed.set()
+        finally:
+            self.connections.discard(websocket)
+
+    async def push(self, channel, inst_id, ts, close, confirm):
+        row = [str(ts), '1', '2', '0.5', str(close), '10', '100', '100', '1' if confirm else '0']
+        message = json.dumps({'arg': {'channel': channel, 'instId': inst_id}, 'data': [row]})
+        for websocket in list(self.connections):
+            await websocket.send(message)
+
+    async def drop_connections(self):
+        for websocket in list(self.connections):
+            await websocket.close()
+
+async def _until(predicate, timeout=5.0):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+@pytest.mark.anyio
+async def test_tracks_the_open_bar_and_emits_each_confirmed_bar_once():
+    async with FakeOkxServer() as server:
+        stream = CandleStream([('BTC/USDT', '1m'), ('ETH/USDT', '1h')], url=server.url)
+        confirmed = []
+        stream.add_listener(lambda symbol, timeframe, candle: confirmed.append((symbol, timeframe, candle['close'])))
+        task = asyncio.create_task(stream.run())
+        await asyncio.wait_for(server.subscribed.wait(), 5)
+        assert sorted(a['channel'] for a in server.subscriptions) == ['candle1H', 'candle1m']
+
+        await server.push('candle1m', 'BTC-USDT', START, 100.0, confirm=False)
+        await server.push('candle1m', 'BTC-USDT', START, 101.0, confirm=True)
+        await server.push('candle1m', 'BTC-USDT', START, 101.0, confirm=True)
+        await server.push('candle1m', 'BTC-USDT', START + MINUTE, 102.0, confirm=False)
+        await server.push('candle1H', 'ETH-USDT', START, 50.0, confirm=True)
+        await _until(lambda: len(confirmed) == 2 and stream.current_bar('BTC-USDT', '1m')['close'] == 102.0)
+
+        assert confirmed == [('BTC-USDT', '1m', 101.0), ('ETH-USDT', '1h', 50.0)]
+        assert stream.current_bar('BTC/USDT', '1m')['confirm'] is False
+        stream.stop()
+        await asyncio.wait_for(task, 5)
+
+@pytest.mark.anyio
+async def test_reconnects_and_resubscribes_after_the_connection_drops():
+    async with FakeOkxServer() as server:
+        stream = CandleStream([('BTC-USDT', '5m')], url=server.url, reconnect_delay=0.01)
+        task = asyncio.create_task(stream.run())
+        await asyncio.wait_for(server.subscribed.wait(), 5)
+        await stream.subscribe('SOL/USDT', '5m')
+        await _until(lambda: len(server.subscriptions) == 2)
+
+        server.subscribed.clear()
+        await server.drop_connections()
+        await asyncio.wait_for(server.subscribed.wait(), 5)
+        await _until(lambda: len(server.subscriptions) == 4)
+
+        assert stream.connections == 2
+        assert sorted(a['instId'] for a in server.subscriptions[2:]) == ['BTC-USDT', 'SOL-USDT']
+        stream.stop()
+        await asyncio.wait_for(task, 5)
+
+@pytest.mark.anyio
+async def test_pings_an_idle_connection_and_reconnects_without_a_pong():
+    async with FakeOkxServer() as server:
+        server.answer_pings = False
+        stream = CandleStream([('BTC-USDT', '1m')], url=server.url, ping_interval=0.05, reconnect_delay=0.01)
+        task = asyncio.create_task(stream.run())
+        await _until(lambda: stream.connections >= 2)
+        assert server.pings >= 1
+        stream.stop()
+        await asyncio.wait_for(task, 5)
+
+@pytest.mark.anyio
+async def test_confirmed_bars_are_persisted_without_marking_new_series_fresh(tmp_path):
+    manager = CacheManager(str(tmp_path / "cache.db"), default_ttl_hours=1, write_behind=True)
+    history = [{'timestamp': START + i * MINUTE, 'open': 1, 'high': 2, 'low': 0.5, 'close': 1, 'volume': 10}
+               for i in range(3)]
+    manager.set('BTC/USDT', '1m', history)
+
+    async with FakeOkxServer() as server:
+        stream = CandleStream([('BTC-USDT', '1m'), ('ETH-USDT', '1m')], url=server.url)
+        stream.add_listener(lambda symbol, timeframe, candle: manager.append_live(symbol, timeframe, [candle]))
+        task = asyncio.create_task(stream.run())
+        await asyncio.wait_for(server.subscribed.wait(), 5)
+        await server.push('candle1m', 'BTC-USDT', START + 3 * MINUTE, 7.0, confirm=True)
+        await server.push('candle1m', 'ETH-USDT', START, 7.0, confirm=True)
+        await _until(lambda: manager.writer.pending() == 0 and len(manager.db.get_candles('ETH-USDT', '1m')) == 1)
+        stream.stop()
+        await asyncio.wait_for(task, 5)
+
+    candles = manager.get('BTC/USDT', '1m')
+    assert [c['close'] for c in candles] == [1, 1, 1, 7.0]
+    assert manager.get('ETH/USDT', '1m') is None
+    manager.close()
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from src.cache_manager import CacheManager
+from src.chunk_store import ChunkedDatabaseManager, encode_chunk, decode_chunk
+from src.database import DatabaseManager, create_database_manager
+
+MINUTE = 60_000
+START = 1672531200000
+
+def _candles(count, start=START, step=MINUTE, price=100.0):
+    return [
+        {'timestamp': start + i * step, 'open': price + i, 'high': price + i + 1.5,
+         'low': price + i - 1.25, 'close': price + i + 0.5, 'volume': 10.0 + i}
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def store(tmp_path):
+    manager = ChunkedDatabaseManager(str(tmp_path / "chunks.db"), chunk_size=16)
+    yield manager
+    manager.close()
+
+def test_encode_decode_roundtrip():
+    timestamps = np.array([START, START + MINUTE, START + 3 * MINUTE], dtype=np.int64)
+    values = np.array([[1.5, 2.0, 3.25], [4.0, 5.0, 6.0], [0.1, 0.2, 0.3], [7.0, 8.0, 9.0], [1e-8, 1e8, 0.0]])
+
+    decoded_timestamps, decoded_values = decode_chunk(encode_chunk(timestamps, values))
+    assert decoded_timestamps.tolist() == timestamps.tolist()
+    assert np.array_equal(decoded_values, values)
+
+def test_matches_row_store_across_chunks(tmp_path, store):
+    """
+    Tests that reads spanning several chunks return exactly what the row store returns.
+    """
+    rows = DatabaseManager(str(tmp_path / "rows.db"))
+    candles = _candles(100)
+    rows.save_candles('BTC-USDT', '1m', candles, ttl_hours=1)
+    store.save_candles('BTC-USDT', '1m', candles, ttl_hours=1)
+
+    for limit in (1, 10, 16, 17, 100, 1000):
+        assert store.get_candles('BTC-USDT', '1m', limit) == rows.get_candles('BTC-USDT', '1m', limit)
+    assert store.get_cache_metadata('BTC-USDT', '1m')['ttl_hours'] == 1
+    assert store.get_candles('ETH-USDT', '1m') == []
+    rows.close()
+
+def test_merge_keeps_existing_candles_and_counts_new_ones(store):
+    store.save_candles('BTC-USDT', '1m', _candles(10), ttl_hours=1)
+
+    # Overlaps the last 5 candles with different prices and adds 5 new ones.
+    inserted = store.bulk_insert_candles('BTC-USDT', '1m', [(
+        [START + i * MINUTE for i in range(5, 15)], *([999.0] * 10 for _ in range(5))
+    )])
+    assert inserted == 5
+
+    candles = store.get_candles('BTC-USDT', '1m', 100)
+    assert [c['timestamp'] for c in candles] == [START + i * MINUTE for i in range(15)]
+    assert candles[5]['open'] == 105.0
+    assert candles[14]['open'] == 999.0
+
+def test_index_tracks_chunk_ranges(store):
+    store.save_candles('BTC-USDT', '1m', _candles(40), ttl_hours=1)
+    chunks = store._conn.execute(
+        'SELECT chunk_id, first_ts, last_ts, count FROM candle_chunks ORDER BY chunk_id'
+    ).fetchall()
+    assert sum(row['count'] for row in chunks) == 40
+    assert all(row['first_ts'] // (16 * MINUTE) == row['chunk_id'] == row['last_ts'] // (16 * MINUTE) for row in chunks)
+
+def test_cache_manager_selects_storage_engine(tmp_path):
+    manager = CacheManager(db_path=str(tmp_path / "cache.db"), storage='chunked')
+    assert isinstance(manager.db, ChunkedDatabaseManager)
+    manager.set('BTC/USDT', '1H', _candles(3, step=60 * MINUTE))
+    assert len(manager.get('BTC/USDT', '1H')) == 3
+    manager.db.close()
+
+    with pytest.raises(ValueError):
+        create_database_manager(str(tmp_path / "other.db"), storage='parquet')
+
+def test_range_reads_match_row_store(tmp_path, store):
+    rows = DatabaseManager(str(tmp_path / "rows.db"))
+    candles = _candles(100)
+    rows.save_candles('BTC-USDT', '1m', candles, ttl_hours=1)
+    store.save_candles('BTC-USDT', '1m', candles, ttl_hours=1)
+
+    for kwargs in ({'limit': 5, 'start_ts': START + 30 * MINUTE},
+                   {'limit': 5, 'end_ts': START + 30 * MINUTE},
+                   {'limit': 50, 'start_ts': START + 14 * MINUTE, 'end_ts': START + 40 * MINUTE}):
+        assert store.get_candles('BTC-USDT', '1m', **kwargs) == rows.get_candles('BTC-USDT', '1m', **kwargs)
+    assert store.get_candles_batch([('BTC-USDT', '1m')], limit=3) == rows.get_candles_batch([('BTC-USDT', '1m')], limit=3)
+    rows.close()
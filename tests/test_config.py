@@ -0,0 +1,62 @@
+import pytest
+from src import config as config_module
+from src import settings as settings_module
+from src.config import (
+    freeze, get_app_config, get_config, get_strategy_params, on_config_reload, reload_config
+)
+
+@pytest.fixture
+def restore_config(monkeypatch):
+    """Restores the shared config, settings and reload listeners after a test."""
+    monkeypatch.setattr(config_module, '_app_config', get_app_config())
+    monkeypatch.setattr(settings_module, 'settings', settings_module.settings)
+    monkeypatch.setattr(config_module, '_reload_listeners', [])
+
+def test_app_config_is_built_once_and_read_only():
+    config = get_app_config()
+    assert get_app_config() is config
+    with pytest.raises(TypeError):
+        config['trading']['WATCHLIST'] = []
+    assert isinstance(config['trading']['WATCHLIST'], tuple)
+
+def test_get_config_returns_an_independent_mutable_copy():
+    copy = get_config()
+    copy['trading']['WATCHLIST'].append('XRP/USDT')
+    assert 'XRP/USDT' not in get_app_config()['trading']['WATCHLIST']
+    assert 'XRP/USDT' not in get_config()['trading']['WATCHLIST']
+
+def test_strategy_params_are_resolved_per_timeframe():
+    config = freeze({
+        'strategy_params': {'fibo_strategy': {
+            'sma_period_slow': 200, 'rsi_period': 14,
+            'timeframe_overrides': {'1D': {'sma_period_slow': 50}},
+        }},
+    })
+    # Without pre-resolved params the overrides are merged on the fly.
+    assert get_strategy_params(config, 'fibo_strategy', '1D')['sma_period_slow'] == 50
+    assert get_strategy_params(config, 'fibo_strategy', '5m')['sma_period_slow'] == 200
+
+    app_config = get_app_config()
+    daily = get_strategy_params(app_config, 'fibo_strategy', '1D')
+    assert daily is app_config['strategy_params_by_timeframe']['fibo_strategy']['1D']
+    assert daily['swing_lookback_period'] == 40
+    assert get_strategy_params(app_config, 'fibo_strategy', '5m') is app_config['strategy_params']['fibo_strategy']
+
+def test_reload_swaps_config_and_notifies_listeners(restore_config, monkeypatch):
+    old_config = get_app_config()
+    received = []
+    on_config_reload(received.append)
+    monkeypatch.setenv('RSI_PERIOD', '21')
+
+    assert reload_config() is True
+    new_config = get_app_config()
+    assert new_config is not old_config
+    assert new_config['strategy_params']['fibo_strategy']['rsi_period'] == 21
+    assert received == [new_config]
+
+def test_failed_reload_keeps_current_config(restore_config, monkeypatch):
+    old_config = get_app_config()
+    monkeypatch.setenv('RSI_PERIOD', 'not-a-number')
+
+    assert reload_config() is False
+    assert get_app_config() is old_config
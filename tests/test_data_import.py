@@ -0,0 +1,98 @@
+import json
+import pytest
+from src.database import DatabaseManager
+from src.data_import import iter_json_candles, iter_candle_batches, import_series, import_snapshots
+
+def _candle(i):
+    return {
+        "timestamp": 1758754800000 + i * 60000, "open": f"{100 + i}", "high": f"{101 + i}.5",
+        "low": f"{99 + i}", "close": f"{100 + i}.25", "volume": "230.30854863",
+        "volCcy": "26103908.17", "volCcyQuote": "26103908.17", "confirm": "1",
+    }
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "cache.db"))
+    yield manager
+    manager.close()
+
+def test_streams_pretty_printed_snapshot_across_chunk_boundaries(tmp_path):
+    """
+    Tests that candles are decoded correctly even when they span read chunks.
+    """
+    path = tmp_path / "5m.json"
+    path.write_text(json.dumps({"symbol": "BTC-USDT", "data": [_candle(i) for i in range(50)]}, indent=4))
+
+    candles = list(iter_json_candles(str(path), chunk_size=97))
+    assert len(candles) == 50
+    assert candles[0] == _candle(0) and candles[-1] == _candle(49)
+
+@pytest.mark.parametrize('document', [
+    {"symbol": "BTC-USDT", "data": [_candle(i) for i in range(50)]},
+    [[str(1758754800000 + i * 60000), "1", "2", "0.5", "1.5", "10", "0", "0", "1"] for i in range(50)],
+])
+def test_file_within_one_chunk_takes_the_fast_path(tmp_path, monkeypatch, document):
+    """
+    Tests that a bundled-style snapshot is decoded in bulk, not candle by candle.
+    """
+    path = tmp_path / "5m.json"
+    path.write_text(json.dumps(document, indent=4))
+    calls = []
+
+    class CountingDecoder(json.JSONDecoder):
+        """The one-candle-at-a-time decoder; json.loads keeps its own."""
+        def raw_decode(self, s, idx=0):
+            calls.append(idx)
+            return super().raw_decode(s, idx)
+
+    monkeypatch.setattr(json, 'JSONDecoder', CountingDecoder)
+    expected = document["data"] if isinstance(document, dict) else document
+
+    assert list(iter_json_candles(str(path))) == expected
+    assert calls == []
+
+def test_streams_bare_array_of_okx_rows(tmp_path):
+    path = tmp_path / "history.json"
+    rows = [[str(1758754800000 + i * 60000), "1", "2", "0.5", "1.5", "10", "0", "0", "1"] for i in range(5)]
+    path.write_text(json.dumps(rows))
+
+    batches = list(iter_candle_batches(iter_json_candles(str(path), chunk_size=16), batch_size=2))
+    assert [len(batch[0]) for batch in batches] == [2, 2, 1]
+    timestamps, opens, highs, lows, closes, volumes = batches[0]
+    assert timestamps == [1758754800000, 1758754860000]
+    assert opens == [1.0, 1.0] and volumes == [10.0, 10.0]
+
+def test_truncated_file_raises(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('{"data": [' + json.dumps(_candle(0)) + ', {"timestamp": 1')
+    with pytest.raises(ValueError):
+        list(iter_json_candles(str(path), chunk_size=32))
+
+def test_import_series_is_idempotent_and_keeps_metadata_stale(tmp_path, db):
+    path = tmp_path / "1H.json"
+    path.write_text(json.dumps({"symbol": "BTC-USDT", "data": [_candle(i) for i in range(20)]}, indent=4))
+
+    stats = import_series(db, "btc/usdt", "1H", str(path), batch_size=7)
+    assert stats['read'] == 20 and stats['inserted'] == 20
+    assert db.get_cache_metadata("BTC-USDT", "1H") is None
+
+    candles = db.get_candles("BTC-USDT", "1H")
+    assert len(candles) == 20
+    assert candles[0]['timestamp'] == 1758754800000
+    assert candles[0]['high'] == 101.5 and candles[-1]['close'] == 119.25
+
+    again = import_series(db, "BTC-USDT", "1H", str(path), mark_fresh=True)
+    assert again['read'] == 20 and again['inserted'] == 0
+    assert db.get_cache_metadata("BTC-USDT", "1H") is not None
+
+def test_import_snapshots_walks_symbol_term_layout(tmp_path, db):
+    for symbol, term, timeframe in [("BTC-USDT", "short_term", "5m"), ("ETH-USDT", "long_term", "1D")]:
+        directory = tmp_path / symbol / term
+        directory.mkdir(parents=True)
+        (directory / f"{timeframe}.json").write_text(json.dumps({"symbol": symbol, "data": [_candle(i) for i in range(3)]}))
+    (tmp_path / "cache.db-journal").write_text("")
+
+    results = import_snapshots(db, str(tmp_path))
+    assert sorted((r['symbol'], r['timeframe'], r['inserted']) for r in results) == [
+        ("BTC-USDT", "5m", 3), ("ETH-USDT", "1D", 3)
+    ]
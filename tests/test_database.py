@@ -0,0 +1,92 @@
+import sqlite3
+import pytest
+from src.database import DatabaseManager
+
+MINUTE = 60_000
+START = 1672531200000
+
+def _batch(count, start_index=0):
+    timestamps = [START + i * MINUTE for i in range(start_index, start_index + count)]
+    return (timestamps, *([float(i) for i in range(start_index, start_index + count)] for _ in range(5)))
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "cache.db"))
+    manager.bulk_insert_candles('BTC-USDT', '1m', [_batch(100)])
+    manager.bulk_insert_candles('ETH-USDT', '1m', [_batch(50)])
+    yield manager
+    manager.close()
+
+def _timestamps(candles):
+    return [(c['timestamp'] - START) // MINUTE for c in candles]
+
+def test_range_queries(db):
+    assert _timestamps(db.get_candles('BTC-USDT', '1m', limit=3)) == [97, 98, 99]
+    assert _timestamps(db.get_candles('BTC-USDT', '1m', limit=3, end_ts=START + 10 * MINUTE)) == [7, 8, 9]
+    assert _timestamps(db.get_candles('BTC-USDT', '1m', limit=3, start_ts=START + 10 * MINUTE)) == [10, 11, 12]
+    assert _timestamps(db.get_candles('BTC-USDT', '1m', limit=100,
+                                      start_ts=START + 10 * MINUTE, end_ts=START + 13 * MINUTE)) == [10, 11, 12]
+
+def test_batch_read_returns_every_requested_series(db):
+    result = db.get_candles_batch([('BTC-USDT', '1m'), ('ETH-USDT', '1m'), ('SOL-USDT', '1m')], limit=2)
+    assert _timestamps(result[('BTC-USDT', '1m')]) == [98, 99]
+    assert _timestamps(result[('ETH-USDT', '1m')]) == [48, 49]
+    assert result[('SOL-USDT', '1m')] == []
+
+    ranged = db.get_candles_batch([('BTC-USDT', '1m'), ('ETH-USDT', '1m')], limit=2, start_ts=START + 49 * MINUTE)
+    assert _timestamps(ranged[('BTC-USDT', '1m')]) == [49, 50]
+    assert _timestamps(ranged[('ETH-USDT', '1m')]) == [49]
+
+def _plans(db, read):
+    """Runs `read(db)` and returns the query plan of each SELECT it executed."""
+    statements = []
+    db._conn.set_trace_callback(statements.append)
+    try:
+        read(db)
+    finally:
+        db._conn.set_trace_callback(None)
+    selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+    assert selects
+    return [' | '.join(row['detail'] for row in db._conn.execute(f'EXPLAIN QUERY PLAN {sql}')) for sql in selects]
+
+def test_range_reads_seek_the_clustered_primary_key(db):
+    """
+    Tests that the statements get_candles and get_candles_batch run are
+    primary key seeks with no temp sort, i.e. the rows come straight off the
+    clustered WITHOUT ROWID B-tree.
+    """
+    (plan,) = _plans(db, lambda db: db.get_candles('BTC-USDT', '1m', limit=10,
+                                                   start_ts=START, end_ts=START + MINUTE))
+    assert 'SEARCH candles USING PRIMARY KEY (symbol=? AND timeframe=? AND timestamp>? AND timestamp<?)' in plan
+    assert 'TEMP B-TREE' not in plan
+
+    (latest_plan,) = _plans(db, lambda db: db.get_candles('BTC-USDT', '1m', limit=10))
+    assert 'SEARCH candles USING PRIMARY KEY (symbol=? AND timeframe=?)' in latest_plan
+    assert 'TEMP B-TREE' not in latest_plan
+
+    (batch_plan,) = _plans(db, lambda db: db.get_candles_batch([('BTC-USDT', '1m'), ('ETH-USDT', '1m')],
+                                                               limit=10, start_ts=START))
+    assert batch_plan.count('SEARCH candles USING PRIMARY KEY (symbol=? AND timeframe=? AND timestamp>?)') == 2
+    assert 'TEMP B-TREE' not in batch_plan
+
+def test_legacy_rowid_table_is_migrated(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE candles (
+            symbol TEXT NOT NULL, timeframe TEXT NOT NULL, timestamp INTEGER NOT NULL,
+            open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL, volume REAL NOT NULL,
+            PRIMARY KEY (symbol, timeframe, timestamp)
+        )
+    ''')
+    conn.execute("INSERT INTO candles VALUES ('BTC-USDT', '1m', ?, 1, 2, 0.5, 1.5, 10)", (START,))
+    conn.commit()
+    conn.close()
+
+    db = DatabaseManager(path)
+    sql = db._conn.execute("SELECT sql FROM sqlite_master WHERE name = 'candles'").fetchone()['sql']
+    assert 'WITHOUT ROWID' in sql.upper()
+    assert db.get_candles('BTC-USDT', '1m') == [
+        {'timestamp': START, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10.0}
+    ]
+    db.close()
@@ -1,5 +1,6 @@
 import pytest
-from src.utils.formatter import format_analysis_from_template
+import os
+from src.utils.formatter import format_analysis_from_template, CompiledTemplate, TemplateEngine
 
 # Fixtures provide mock data that closely resembles the output of FiboAnalyzer.
 @pytest.fixture
@@ -78,4 +79,46 @@ def test_formatter_selects_short_term_template_correctly(mock_buy_analysis_data)
     """
     report = format_analysis_from_template(mock_buy_analysis_data, "SOL/USDT", "5m")
     assert "تحليل شامل وقرار تداول: SOL/USDT | 5m (قصير المدى)" in report
-    assert '*' not in report and '}' not in report
\ No newline at end of file
+    assert '*' not in report and '}' not in report
+def test_compiled_template_strips_markdown_and_keeps_unknown_placeholders():
+    """
+    Tests that compilation removes '*' from the template and values, leaves literal
+    '%' alone and keeps placeholders that have no value.
+    """
+    compiled = CompiledTemplate("**{name}** at 100% {missing}")
+    assert compiled.fields == ('name', 'missing')
+    assert compiled.render({'name': '*BTC*'}) == "BTC at 100% {missing}"
+
+def test_template_engine_reloads_changed_templates(tmp_path):
+    """
+    Tests that an auto-reloading engine picks up an edited template file.
+    """
+    path = tmp_path / "short_term_template.md"
+    path.write_text("v1 {symbol}", encoding='utf-8')
+    engine = TemplateEngine({'short_term': ['5m']}, templates_dir=str(tmp_path),
+                            auto_reload=True, reload_check_interval=0)
+
+    assert engine.term_for('5m') == 'short_term'
+    assert engine.term_for('1D') == 'long_term'
+    assert engine.render('short_term', {'symbol': 'BTC'}) == "v1 BTC"
+    assert engine.render('long_term', {}) is None
+
+    path.write_text("v2 {symbol}", encoding='utf-8')
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert engine.render('short_term', {'symbol': 'BTC'}) == "v2 BTC"
+
+def test_template_engine_ignores_other_files_in_the_directory(tmp_path, monkeypatch):
+    """
+    Tests that files which are not templates do not trigger a reload.
+    """
+    (tmp_path / "short_term_template.md").write_text("v1 {symbol}", encoding='utf-8')
+    (tmp_path / "README").write_text("notes", encoding='utf-8')
+    (tmp_path / ".short_term_template.md.swp").write_bytes(b"\0")
+    engine = TemplateEngine({'short_term': ['5m']}, templates_dir=str(tmp_path),
+                            auto_reload=True, reload_check_interval=0)
+    loads = []
+    monkeypatch.setattr(engine, 'load', lambda: loads.append(1))
+
+    assert engine.render('short_term', {'symbol': 'BTC'}) == "v1 BTC"
+    assert loads == []
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules that must not be imported before the bot starts answering; they are
+# loaded on demand or in the background by post_init.
+HEAVY_MODULES = {'pandas', 'numpy', 'scipy', 'matplotlib', 'mplfinance', 'okx'}
+
+# Generous wall-clock budget for `import main` (it was ~2.5s with the eager imports).
+IMPORT_BUDGET_US = 1_500_000
+
+def _import_times(module: str) -> dict:
+    """Runs `python -X importtime -c 'import <module>'` and returns {module: cumulative_us}."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+def test_main_does_not_import_heavy_modules():
+    times = _import_times('main')
+    imported_heavy = {name.split('.')[0] for name in times} & HEAVY_MODULES
+    assert not imported_heavy, f"Heavy modules imported at startup: {sorted(imported_heavy)}"
+
+def test_main_import_time_within_budget():
+    times = _import_times('main')
+    assert times['main'] < IMPORT_BUDGET_US, f"import main took {times['main'] / 1e6:.2f}s"
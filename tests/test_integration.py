@@ -2,6 +2,11 @@ import pytest
 from src.strategies.fibo_analyzer import FiboAnalyzer
 from src.telegram_bot import _fetch_and_prepare_data
 
+@pytest.fixture(params=['asyncio', 'trio'])
+def anyio_backend(request):
+    """The end-to-end run also covers trio (conftest.py defaults to asyncio)."""
+    return request.param
+
 @pytest.mark.anyio
 async def test_btc_1d_analysis_runs_successfully(mock_config, mock_fetcher):
     """
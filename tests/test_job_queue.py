@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import pytest
+from src.job_queue import (
+    JobQueue, JobRunner, DONE, FAILED, QUEUED,
+    PRIORITY_BACKFILL, PRIORITY_INTERACTIVE, PRIORITY_PERIODIC,
+)
+from tests.helpers import FakeClock
+
+@pytest.fixture
+def clock():
+    return FakeClock(1000.0)
+
+@pytest.fixture
+def job_queue(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=30, max_attempts=3,
+                     backoff_base=10, clock=clock)
+    yield queue
+    queue.close()
+
+def test_claims_by_priority_then_age(job_queue, clock):
+    job_queue.enqueue('backfill', priority=PRIORITY_BACKFILL)
+    periodic = job_queue.enqueue('analyze', {'symbol': 'BTC/USDT'}, priority=PRIORITY_PERIODIC)
+    clock.now += 1
+    later = job_queue.enqueue('analyze', {'symbol': 'ETH/USDT'}, priority=PRIORITY_PERIODIC)
+    interactive = job_queue.enqueue('analyze', {'symbol': 'SOL/USDT'}, priority=PRIORITY_INTERACTIVE)
+
+    jobs = job_queue.claim('w1', limit=3)
+    assert [job['id'] for job in jobs] == [interactive, periodic, later]
+    assert jobs[1]['payload'] == {'symbol': 'BTC/USDT'}
+    assert [job['kind'] for job in job_queue.claim('w1', limit=3)] == ['backfill']
+    assert job_queue.claim('w1') == []
+
+def test_dedupes_active_jobs_and_keeps_the_higher_priority(job_queue):
+    first = job_queue.enqueue('analyze', priority=PRIORITY_PERIODIC, dedupe_key='analyze:BTC-USDT:1h')
+    job_queue.enqueue('backfill', priority=PRIORITY_BACKFILL)
+    again = job_queue.enqueue('analyze', priority=PRIORITY_INTERACTIVE, dedupe_key='analyze:BTC-USDT:1h')
+    assert again == first
+
+    job = job_queue.claim('w1')[0]
+    assert job['id'] == first and job['priority'] == PRIORITY_INTERACTIVE
+    # Still running: not queued twice.
+    assert job_queue.enqueue('analyze', dedupe_key='analyze:BTC-USDT:1h') == first
+    assert job_queue.complete(first, 'w1')
+    # Finished: the key is free again.
+    assert job_queue.enqueue('analyze', dedupe_key='analyze:BTC-USDT:1h') != first
+
+def test_expired_lease_is_claimed_by_another_worker(job_queue, clock):
+    job_id = job_queue.enqueue('analyze')
+    job_queue.claim('crashed')
+    assert job_queue.claim('w2') == []
+
+    clock.now += 31
+    job = job_queue.claim('w2')[0]
+    assert job['id'] == job_id and job['attempts'] == 2
+    # The first worker lost its lease and cannot finish the job.
+    assert not job_queue.complete(job_id, 'crashed')
+    assert not job_queue.heartbeat(job_id, 'crashed')
+    assert job_queue.complete(job_id, 'w2')
+
+def test_failures_back_off_exponentially_then_give_up(job_queue, clock):
+    job_id = job_queue.enqueue('analyze')
+    job_queue.claim('w1')
+    assert job_queue.fail(job_id, 'w1', 'boom') == QUEUED
+
+    clock.now += 9
+    assert job_queue.claim('w1') == []
+    clock.now += 1
+    job_queue.claim('w1')
+    assert job_queue.fail(job_id, 'w1', 'boom') == QUEUED
+
+    clock.now += 19
+    assert job_queue.claim('w1') == []
+    clock.now += 1
+    job_queue.claim('w1')
+    assert job_queue.fail(job_id, 'w1', 'boom') == FAILED
+    clock.now += 3600
+    assert job_queue.claim('w1') == []
+    assert job_queue.stats()['depth'] == {FAILED: 1}
+
+def test_stats_report_depth_latency_and_throughput(job_queue, clock):
+    for _ in range(3):
+        job_queue.enqueue('analyze')
+    clock.now += 4
+    for job in job_queue.claim('w1', limit=2):
+        job_queue.complete(job['id'], 'w1')
+
+    stats = job_queue.stats(window_seconds=60)
+    assert stats['depth'] == {DONE: 2, QUEUED: 1}
+    assert stats['ready'] == 1
+    assert stats['oldest_ready_age'] == 4
+    assert stats['completed'] == 2
+    assert stats['throughput'] == pytest.approx(2 / 60)
+    assert stats['avg_latency'] == pytest.approx(4)
+
+    clock.now += 8 * 24 * 3600
+    assert job_queue.purge() == 2
+
+def test_concurrent_claims_never_share_a_job(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    setup = JobQueue(path)
+    for _ in range(200):
+        setup.enqueue('analyze')
+    claimed = []
+
+    def work(worker_id):
+        queue = JobQueue(path)
+        while True:
+            jobs = queue.claim(worker_id, limit=3)
+            if not jobs:
+                break
+            claimed.extend(job['id'] for job in jobs)
+        queue.close()
+
+    threads = [threading.Thread(target=work, args=(f'w{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == list(range(1, 201))
+    setup.close()
+
+@pytest.mark.anyio
+async def test_runner_completes_jobs_and_retries_failures(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), backoff_base=0.01)
+    done = []
+    attempts = {'flaky': 0}
+
+    async def analyze(payload):
+        await asyncio.sleep(0.01)
+        done.append(payload['symbol'])
+
+    def flaky(payload):
+        attempts['flaky'] += 1
+        if attempts['flaky'] < 2:
+            raise RuntimeError("exchange timeout")
+        done.append('flaky')
+
+    for symbol in ['BTC/USDT', 'ETH/USDT', 'SOL/USDT']:
+        queue.enqueue('analyze', {'symbol': symbol})
+    queue.enqueue('flaky')
+    runner = JobRunner(queue, {'analyze': analyze, 'flaky': flaky}, concurrency=2, poll_interval=0.01)
+    task = asyncio.create_task(runner.run())
+
+    async def drained():
+        while queue.stats()['depth'].get(DONE, 0) < 4:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(drained(), 10)
+    runner.stop()
+    await asyncio.wait_for(task, 5)
+
+    assert sorted(done) == ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'flaky']
+    assert attempts['flaky'] == 2
+    queue.close()
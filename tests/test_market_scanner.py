@@ -0,0 +1,111 @@
+import threading
+import pytest
+from src.cache_manager import CacheManager
+from src.data_retrieval.exceptions import APIError
+from src.market_scanner import MarketScanner, rank
+from src.rate_limiter import RateLimiter
+
+MINUTE = 60_000
+START = 1672531200000
+
+CONFIG = {
+    'trading': {'CANDLE_FETCH_LIMITS': {'default': 100}},
+    'strategy_params': {
+        'fibo_strategy': {
+            'sma_period_fast': 5, 'sma_period_slow': 10,
+            'swing_lookback_period': 50, 'swing_comparison_window': 3,
+            'adx_trend_threshold': 20, 'signal_threshold': 3,
+            'require_adx_confirmation': False,
+        }
+    },
+    'risk_management': {'atr_multiplier_sl': 2.0}
+}
+
+def _candles(seed, data_len=100):
+    base = 100 + seed
+    close = [base + (0.1 if i % 2 == 0 else -0.1) * (1 + seed % 3) for i in range(data_len)]
+    for i in range(data_len - 5, data_len):
+        close[i] = close[i - 1] + 1.0 + seed
+    candles = [{'timestamp': START + i * MINUTE, 'open': c - 1.0, 'high': c + 1.0, 'low': c - 1.0,
+                'close': c, 'volume': 1000} for i, c in enumerate(close)]
+    candles[70]['low'] = base - 10
+    candles[90]['high'] = base + 5
+    return candles
+
+class _FakeFetcher:
+    def __init__(self, symbols, broken=()):
+        self.symbols = symbols
+        self.broken = set(broken)
+        self.fetched = []
+        self._lock = threading.Lock()
+
+    def fetch_instruments(self, quote='USDT'):
+        return [{'symbol': symbol, 'last': 1.0, 'volume_24h': 1000.0 * (len(self.symbols) - i)}
+                for i, symbol in enumerate(self.symbols)]
+
+    def fetch_historical_data(self, symbol, timeframe, limit=300):
+        with self._lock:
+            self.fetched.append(symbol)
+        if symbol in self.broken:
+            raise APIError(f"Invalid instrument ID: {symbol}", status_code='51001')
+        return {'symbol': symbol, 'data': _candles(self.symbols.index(symbol))}
+
+def test_discover_filters_by_volume_and_caps_the_universe():
+    fetcher = _FakeFetcher([f'C{i}-USDT' for i in range(10)])
+    scanner = MarketScanner(CONFIG, '1m', fetcher=fetcher, workers=0, min_volume=3000, max_instruments=5)
+    assert scanner.discover() == ['C0-USDT', 'C1-USDT', 'C2-USDT', 'C3-USDT', 'C4-USDT']
+
+def test_scan_ranks_setups_and_reports_failures():
+    symbols = [f'C{i}-USDT' for i in range(12)]
+    fetcher = _FakeFetcher(symbols, broken=['C3-USDT'])
+    report = MarketScanner(CONFIG, '1m', fetcher=fetcher, workers=0, batch_size=4).scan()
+
+    assert report['scanned'] == 12 and report['analyzed'] == 11
+    assert report['failed'] == [{'symbol': 'C3-USDT', 'error': 'Invalid instrument ID: C3-USDT'}]
+    assert report['results'] == rank(report['results'])
+    assert {row['symbol'] for row in report['results']} == set(symbols) - {'C3-USDT'}
+
+def test_process_pool_matches_in_process_analysis():
+    symbols = [f'C{i}-USDT' for i in range(6)]
+    in_process = MarketScanner(CONFIG, '1m', fetcher=_FakeFetcher(symbols), workers=0).scan(symbols)
+    pooled = MarketScanner(CONFIG, '1m', fetcher=_FakeFetcher(symbols), workers=2, batch_size=2).scan(symbols)
+    assert pooled['results'] == in_process['results']
+
+def test_fresh_cached_series_are_not_fetched(tmp_path):
+    symbols = ['C0-USDT', 'C1-USDT']
+    cache = CacheManager(str(tmp_path / "cache.db"), default_ttl_hours=1)
+    first = _FakeFetcher(symbols)
+    MarketScanner(CONFIG, '1m', fetcher=first, cache_manager=cache, workers=0).scan(symbols)
+    second = _FakeFetcher(symbols)
+    report = MarketScanner(CONFIG, '1m', fetcher=second, cache_manager=cache, workers=0).scan(symbols)
+    assert sorted(first.fetched) == symbols and second.fetched == []
+    assert report['analyzed'] == 2
+    cache.close()
+
+def test_rate_limiter_shares_one_budget_across_threads():
+    now = [0.0]
+    lock = threading.Lock()
+    def sleep(seconds):
+        with lock:
+            now[0] += seconds
+    limiter = RateLimiter(rate=8, burst=2, clock=lambda: now[0], sleep=sleep)
+    threads = [threading.Thread(target=lambda: [limiter.acquire() for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 requests with a burst of 2 take 18 refills at 8 per second.
+    assert now[0] == 2.25
+
+def test_rate_limiter_rate_can_be_lowered():
+    now = [0.0]
+    def sleep(seconds):
+        now[0] += seconds
+    limiter = RateLimiter(rate=10, clock=lambda: now[0], sleep=sleep)
+    limiter.set_rate(2)
+    # The burst shrinks with the rate, then tokens arrive at the new rate.
+    for _ in range(4):
+        limiter.acquire()
+    assert now[0] == 1.0
+    with pytest.raises(ValueError):
+        limiter.set_rate(0)
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from src.metrics import MetricsRegistry, MetricsServer
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    stages = registry.histogram('stage_duration_seconds', 'Time per stage.', ['stage'], buckets=(0.01, 0.1, 1.0))
+    fetch = stages.labels(stage='fetch')
+    for value in (0.005, 0.05, 0.05, 5.0):
+        fetch.observe(value)
+
+    text = registry.render()
+    assert '# TYPE stage_duration_seconds histogram' in text
+    assert 'stage_duration_seconds_bucket{stage="fetch",le="0.01"} 1' in text
+    assert 'stage_duration_seconds_bucket{stage="fetch",le="0.1"} 3' in text
+    assert 'stage_duration_seconds_bucket{stage="fetch",le="1"} 3' in text
+    assert 'stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 4' in text
+    assert 'stage_duration_seconds_count{stage="fetch"} 4' in text
+    assert 'stage_duration_seconds_sum{stage="fetch"} 5.105' in text
+
+def test_timers_observe_failures_and_counters_and_gauges_render():
+    registry = MetricsRegistry()
+    timer = registry.histogram('work_seconds', 'Work.').labels()
+    calls = registry.counter('calls_total', 'Calls.', ['outcome'])
+    registry.gauge('ratio', 'A ratio.').set_function(lambda: 0.75)
+
+    @timer.timed
+    def work(fail):
+        if fail:
+            raise RuntimeError("boom")
+
+    work(False)
+    with pytest.raises(RuntimeError):
+        work(True)
+    calls.labels(outcome='ok').inc()
+    calls.labels(outcome='ok').inc(2)
+
+    assert timer.count == 2
+    text = registry.render()
+    assert 'calls_total{outcome="ok"} 3' in text
+    assert 'ratio 0.75' in text
+    # Declaring the same metric again returns it; declaring it differently fails.
+    assert registry.counter('calls_total', 'Calls.', ['outcome']) is calls
+    with pytest.raises(ValueError):
+        registry.histogram('calls_total', 'Calls.')
+
+def test_collectors_run_once_per_render_and_failures_are_skipped():
+    registry = MetricsRegistry()
+    ready = registry.gauge('ready_jobs', 'Ready jobs.')
+    oldest = registry.gauge('oldest_ready_seconds', 'Oldest wait.')
+    queries = []
+
+    def collect():
+        queries.append(1)
+        ready.set(3)
+        oldest.set(1.5)
+
+    def broken():
+        raise RuntimeError("database is locked")
+
+    registry.add_collector(collect)
+    registry.add_collector(broken)
+    text = registry.render()
+    assert len(queries) == 1
+    assert 'ready_jobs 3' in text and 'oldest_ready_seconds 1.5' in text
+
+@pytest.mark.anyio
+async def test_server_exposes_metrics():
+    registry = MetricsRegistry()
+    registry.counter('requests_total', 'Requests.').inc()
+    server = MetricsServer(registry, port=0)
+    await server.start()
+    try:
+        async def get(path):
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.bound_port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+
+        response = await get('/metrics')
+        assert response.startswith('HTTP/1.1 200 OK')
+        assert 'text/plain; version=0.0.4' in response
+        assert response.endswith('requests_total 1\n')
+        assert (await get('/other')).startswith('HTTP/1.1 404')
+    finally:
+        await server.stop()
@@ -0,0 +1,84 @@
+import json
+import os
+import numpy as np
+import pytest
+from src.database import DatabaseManager
+from src.mmap_store import MmapCandleStore
+
+MINUTE = 60_000
+START = 1672531200000
+
+def _columns(start_index, count):
+    timestamps = [START + i * MINUTE for i in range(start_index, start_index + count)]
+    values = [[100.0 + i + offset for i in range(start_index, start_index + count)] for offset in range(5)]
+    return timestamps, values
+
+@pytest.fixture
+def store(tmp_path):
+    return MmapCandleStore(str(tmp_path / "mmap"))
+
+def test_append_and_read_zero_copy_ranges(store):
+    store.append('BTC/USDT', '1m', *_columns(0, 100))
+    series = store.open('BTC-USDT', '1m')
+
+    assert len(series) == 100
+    assert isinstance(series['close'], np.memmap)
+    window = series.range(START + 10 * MINUTE, START + 20 * MINUTE)
+    assert window['timestamp'].tolist() == [START + i * MINUTE for i in range(10, 20)]
+    assert window['open'][0] == 110.0
+    # Slices are views of the mapped file, not copies.
+    assert np.shares_memory(window['open'], series['open'])
+    assert series.tail(3)['timestamp'][-1] == START + 99 * MINUTE
+
+def test_append_only_skips_old_candles_and_refresh_sees_new_rows(store):
+    store.append('BTC-USDT', '1m', *_columns(0, 10))
+    series = store.open('BTC-USDT', '1m')
+
+    appended = store.append('BTC-USDT', '1m', *_columns(5, 10))
+    assert appended == 5
+    assert len(series) == 10
+    series.refresh()
+    assert len(series) == 15
+    assert series.timestamps.tolist() == [START + i * MINUTE for i in range(15)]
+
+    with pytest.raises(ValueError):
+        store.append('BTC-USDT', '1m', [START + 100 * MINUTE, START + 99 * MINUTE], [[1.0, 1.0]] * 5)
+
+def test_uncommitted_bytes_are_discarded_on_next_append(store):
+    store.append('BTC-USDT', '1m', *_columns(0, 5))
+    path = store.series_path('BTC-USDT', '1m')
+    # Simulate a crash after writing a column but before committing the header.
+    with open(os.path.join(path, 'open.bin'), 'ab') as f:
+        f.write(b'\xff' * 16)
+
+    store.append('BTC-USDT', '1m', *_columns(5, 2))
+    series = store.open('BTC-USDT', '1m')
+    assert series['open'].tolist() == [100.0 + i for i in range(7)]
+    assert os.path.getsize(os.path.join(path, 'open.bin')) == 7 * 8
+
+def test_header_records_schema_and_rejects_unknown_versions(store):
+    store.append('BTC-USDT', '1m', *_columns(0, 1))
+    header_path = os.path.join(store.series_path('BTC-USDT', '1m'), 'header.json')
+    with open(header_path) as f:
+        header = json.load(f)
+    assert header['version'] == 1 and header['count'] == 1
+    assert header['columns']['timestamp'] == '<i8'
+
+    header['version'] = 99
+    with open(header_path, 'w') as f:
+        json.dump(header, f)
+    with pytest.raises(ValueError):
+        store.open('BTC-USDT', '1m')
+
+def test_sync_from_database_and_to_frame(tmp_path, store):
+    db = DatabaseManager(str(tmp_path / "cache.db"))
+    timestamps, values = _columns(0, 20)
+    db.bulk_insert_candles('BTC-USDT', '1m', [(timestamps, *values)])
+
+    assert store.sync_from_database(db, 'BTC/USDT', '1m') == 20
+    assert store.sync_from_database(db, 'BTC/USDT', '1m') == 0
+
+    frame = store.open('BTC-USDT', '1m').to_frame(START + 18 * MINUTE)
+    assert list(frame.columns) == ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    assert frame['timestamp'].tolist() == [START + 18 * MINUTE, START + 19 * MINUTE]
+    db.close()
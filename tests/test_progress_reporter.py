@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from telegram.error import RetryAfter
+from src.progress_reporter import ProgressReporter
+
+class RecordingSender:
+    def __init__(self):
+        self.sent = []
+
+    async def __call__(self, text):
+        self.sent.append(text)
+
+@pytest.mark.anyio
+async def test_fast_stages_are_never_sent():
+    sender = RecordingSender()
+    progress = ProgressReporter(sender, delay=0.05, min_interval=0.0)
+
+    progress.stage("fetching")
+    progress.stage("analyzing")
+    progress.stage("charting")
+    await progress.close()
+
+    assert sender.sent == []
+
+@pytest.mark.anyio
+async def test_slow_stage_is_sent_once():
+    sender = RecordingSender()
+    progress = ProgressReporter(sender, delay=0.02, min_interval=0.0)
+
+    progress.stage("fetching")
+    await asyncio.sleep(0.1)
+    await progress.close()
+
+    assert sender.sent == ["fetching"]
+
+@pytest.mark.anyio
+async def test_rapid_changes_are_coalesced_to_latest_stage():
+    sender = RecordingSender()
+    progress = ProgressReporter(sender, delay=0.0, min_interval=0.1)
+
+    progress.stage("one")
+    await asyncio.sleep(0.02)
+    for text in ["two", "three", "four"]:
+        progress.stage(text)
+    await asyncio.sleep(0.2)
+    await progress.close()
+
+    assert sender.sent == ["one", "four"]
+
+@pytest.mark.anyio
+async def test_retry_after_delays_the_next_edit():
+    calls = []
+
+    async def flooded(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RetryAfter(1)
+
+    progress = ProgressReporter(flooded, delay=0.0, min_interval=0.0)
+    progress.stage("one")
+    await asyncio.sleep(0.02)
+    progress.stage("two")
+    await asyncio.sleep(0.1)
+    await progress.close()
+
+    assert calls == ["one"]
+
+@pytest.mark.anyio
+async def test_stage_after_close_is_ignored():
+    sender = RecordingSender()
+    progress = ProgressReporter(sender, delay=0.0, min_interval=0.0)
+    await progress.close()
+    progress.stage("late")
+    await asyncio.sleep(0.02)
+    assert sender.sent == []
@@ -0,0 +1,156 @@
+import json
+import httpx
+import pytest
+from src.data_retrieval.data_fetcher import DataFetcher
+from src.data_retrieval.exceptions import APIError
+from src.retry_handler import (
+    CircuitBreaker, CircuitOpenError, RetryBudget, decorrelated_jitter, with_retry,
+)
+from src import retry_handler
+from tests.helpers import FakeClock
+
+def test_decorrelated_jitter_stays_between_base_and_cap():
+    delays = [decorrelated_jitter(2.0, 0.5, 5.0) for _ in range(200)]
+    assert all(0.5 <= delay <= 5.0 for delay in delays)
+    # Jittered, not lockstep.
+    assert len(set(delays)) > 1
+    assert decorrelated_jitter(100.0, 0.5, 5.0) <= 5.0
+
+def test_retries_transient_errors_and_raises_others_at_once():
+    sleeps = []
+    calls = []
+
+    @with_retry(max_attempts=3, exceptions=(ConnectionError, ValueError),
+                retry_if=lambda e: not isinstance(e, ValueError), sleep=sleeps.append)
+    def flaky(fail_with):
+        calls.append(fail_with)
+        if len(calls) < 3:
+            raise fail_with("boom")
+        return 'ok'
+
+    assert flaky(ConnectionError) == 'ok'
+    assert len(sleeps) == 2 and all(0.5 <= delay <= 20 for delay in sleeps)
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        flaky(ValueError)
+    assert len(calls) == 1
+
+def test_retry_budget_limits_retries_to_a_share_of_traffic():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.5, min_per_second=0, window=10, clock=clock)
+    for _ in range(4):
+        budget.record_request()
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+
+    clock.now = 11
+    assert not budget.try_spend()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend()
+
+def test_exhausted_budget_stops_retrying():
+    budget = RetryBudget(ratio=0, min_per_second=0)
+    calls = []
+
+    @with_retry(max_attempts=5, exceptions=(ConnectionError,), budget=budget, sleep=lambda _: None)
+    def down():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        down()
+    assert len(calls) == 1
+
+def test_circuit_opens_fails_fast_and_recovers_after_a_trial_call():
+    clock = FakeClock()
+    breaker = CircuitBreaker('candles', failure_threshold=2, recovery_timeout=30, clock=clock)
+    calls = []
+    healthy = [False]
+
+    @with_retry(max_attempts=1, exceptions=(ConnectionError,), breaker=breaker)
+    def fetch():
+        calls.append(1)
+        if not healthy[0]:
+            raise ConnectionError("down")
+        return 'candles'
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            fetch()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        fetch()
+    assert len(calls) == 2
+
+    # A failed trial reopens the circuit.
+    clock.now = 31
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(ConnectionError):
+        fetch()
+    with pytest.raises(CircuitOpenError):
+        fetch()
+
+    clock.now = 62
+    healthy[0] = True
+    assert fetch() == 'candles'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.anyio
+async def test_retries_coroutines(monkeypatch):
+    monkeypatch.setattr(retry_handler.random, 'uniform', lambda low, high: 0.0)
+    attempts = []
+
+    @with_retry(max_attempts=3, exceptions=(httpx.TransportError,))
+    async def send():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise httpx.ConnectError("reset")
+        return 'sent'
+
+    assert await send() == 'sent'
+    assert len(attempts) == 2
+
+class FlakyMarketAPI:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get_tickers(self, instType):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+def test_fetcher_retries_transport_errors_and_busy_codes_but_not_bad_requests(monkeypatch):
+    monkeypatch.setattr(retry_handler.random, 'uniform', lambda low, high: 0.0)
+    ticker = {'instId': 'BTC-USDT', 'last': '1', 'volCcy24h': '5'}
+    fetcher = DataFetcher({'exchange': {'RATE_LIMIT': 1000.0}})
+    fetcher.market_api = FlakyMarketAPI([
+        httpx.ConnectError("reset"),
+        {'code': '50013', 'msg': 'Systems are busy', 'data': []},
+        {'code': '0', 'data': [ticker]},
+    ])
+    assert fetcher.fetch_instruments()[0]['symbol'] == 'BTC-USDT'
+    assert fetcher.market_api.calls == 3
+
+    fetcher.market_api = FlakyMarketAPI([{'code': '51000', 'msg': 'Parameter error', 'data': []}])
+    with pytest.raises(APIError):
+        fetcher.fetch_instruments()
+    assert fetcher.market_api.calls == 1
+
+def test_fetcher_retries_error_pages_but_not_other_value_errors(monkeypatch):
+    monkeypatch.setattr(retry_handler.random, 'uniform', lambda low, high: 0.0)
+    fetcher = DataFetcher({'exchange': {'RATE_LIMIT': 1000.0}})
+    fetcher.market_api = FlakyMarketAPI([
+        json.JSONDecodeError("Expecting value", "<html>502 Bad Gateway</html>", 0),
+        {'code': '0', 'data': []},
+    ])
+    assert fetcher.fetch_instruments() == []
+    assert fetcher.market_api.calls == 2
+
+    fetcher.market_api = FlakyMarketAPI([ValueError("a bug, not the exchange")])
+    with pytest.raises(ValueError):
+        fetcher.fetch_instruments()
+    assert fetcher.market_api.calls == 1
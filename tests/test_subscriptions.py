@@ -0,0 +1,46 @@
+import pytest
+from src.subscriptions import SubscriptionManager
+
+@pytest.fixture
+def subscriptions(tmp_path):
+    manager = SubscriptionManager(db_path=str(tmp_path / 'subscriptions.db'))
+    yield manager
+    manager.close()
+
+def test_subscribers_are_indexed_by_series_and_signal(subscriptions):
+    subscriptions.subscribe(1, 'BTC/USDT', '4H', 'BUY')
+    subscriptions.subscribe(2, 'BTC-USDT', '4H', 'ANY')
+    subscriptions.subscribe(3, 'BTC-USDT', '1D', 'SELL')
+
+    assert sorted(subscriptions.subscribers_for('BTC-USDT', '4H', 'BUY')) == [1, 2]
+    assert subscriptions.subscribers_for('BTC-USDT', '4H', 'SELL') == [2]
+    assert subscriptions.subscribers_for('ETH-USDT', '4H', 'BUY') == []
+
+def test_duplicate_subscription_is_not_added(subscriptions):
+    assert subscriptions.subscribe(1, 'BTC-USDT', '4H', 'buy') is True
+    assert subscriptions.subscribe(1, 'BTC-USDT', '4H', 'BUY') is False
+    assert subscriptions.list_for_chat(1) == [('BTC-USDT', '4H', 'BUY')]
+
+def test_invalid_signal_is_rejected(subscriptions):
+    with pytest.raises(ValueError):
+        subscriptions.subscribe(1, 'BTC-USDT', '4H', 'HOLD')
+
+def test_unsubscribe_and_remove_chat(subscriptions):
+    subscriptions.subscribe(1, 'BTC-USDT', '4H', 'BUY')
+    subscriptions.subscribe(1, 'BTC-USDT', '4H', 'SELL')
+    subscriptions.subscribe(1, 'ETH-USDT', '1D', 'ANY')
+
+    assert subscriptions.unsubscribe(1, 'BTC-USDT', '4H', 'SELL') == 1
+    assert subscriptions.subscribers_for('BTC-USDT', '4H', 'SELL') == []
+    assert subscriptions.remove_chat(1) == 2
+    assert subscriptions.list_for_chat(1) == []
+
+def test_subscriptions_survive_a_restart(tmp_path):
+    db_path = str(tmp_path / 'subscriptions.db')
+    first = SubscriptionManager(db_path=db_path)
+    first.subscribe(7, 'SOL-USDT', '15m', 'SELL')
+    first.close()
+
+    second = SubscriptionManager(db_path=db_path)
+    assert second.subscribers_for('SOL-USDT', '15m', 'SELL') == [7]
+    second.close()
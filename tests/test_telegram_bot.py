@@ -1,5 +1,8 @@
+import asyncio
+import time
 import unittest
 from unittest.mock import patch
+import pytest
 
 # Mock the configuration before importing the bot module. This prevents errors
 # related to missing config files or environment variables during testing.
@@ -63,5 +66,48 @@ class TestTelegramBotConversation(unittest.TestCase):
             "The 'Back' button's handler should call the `back_to_term_selection` function."
         )
 
+class _SlowFetcher:
+    """Blocks its thread like a rate-limit wait or a retry backoff would."""
+    def __init__(self, config):
+        pass
+
+    def fetch_historical_data(self, symbol, timeframe, limit=300):
+        time.sleep(0.3)
+        return {'data': [{'timestamp': 1672531200000 + i * 60_000, 'open': 1.0, 'high': 2.0, 'low': 0.5,
+                          'close': 1.5, 'volume': 10.0} for i in range(limit)]}
+
+class _EmptyCache:
+    def __init__(self):
+        self.saved = []
+
+    def get(self, symbol, timeframe, limit=1000):
+        return None
+
+    def set(self, symbol, timeframe, data):
+        self.saved.append((symbol, timeframe, len(data)))
+
+@pytest.mark.anyio
+async def test_fetching_does_not_block_the_event_loop(monkeypatch):
+    from src import telegram_bot
+
+    cache = _EmptyCache()
+    monkeypatch.setattr(telegram_bot, '_get_cache_manager', lambda config: cache)
+    monkeypatch.setattr('src.data_retrieval.data_fetcher.DataFetcher', _SlowFetcher)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.ensure_future(tick())
+    try:
+        df = await telegram_bot._fetch_and_prepare_data(mock_config, 'BTC/USDT', '1m', 50)
+    finally:
+        ticker.cancel()
+    assert len(df) == 50 and cache.saved == [('BTC/USDT', '1m', 50)]
+    assert ticks >= 10
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
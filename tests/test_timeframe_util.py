@@ -0,0 +1,28 @@
+import pytest
+from src.utils.timeframe_util import timeframe_to_ms, current_bar_start
+
+def test_timeframe_to_ms():
+    assert timeframe_to_ms('5m') == 5 * 60 * 1000
+    assert timeframe_to_ms('1H') == timeframe_to_ms('1h') == 60 * 60 * 1000
+    assert timeframe_to_ms('1D') == 24 * 60 * 60 * 1000
+
+@pytest.mark.parametrize('timeframe', ['', 'm', 'xm', '5x', None])
+def test_timeframe_to_ms_rejects_invalid_input(timeframe):
+    with pytest.raises(ValueError):
+        timeframe_to_ms(timeframe)
+
+def test_current_bar_start_aligns_to_bar_boundary():
+    # 2023-01-01 00:07:30 UTC falls in the 00:05 five-minute bar
+    assert current_bar_start('5m', now=1672531650) == 1672531500000
+
+@pytest.mark.parametrize('timeframe, now, expected', [
+    # 2023-01-01 00:07:30 UTC, a Sunday: 08:07 in UTC+8, where OKX opens its bars
+    ('4H', 1672531650, 1672531200000),   # 00:00 UTC, same as UTC alignment
+    ('6H', 1672531650, 1672524000000),   # 2022-12-31 22:00 UTC
+    ('1D', 1672531650, 1672502400000),   # 2022-12-31 16:00 UTC
+    ('1D', 1672592400, 1672588800000),   # 17:00 UTC is after the daily close at 16:00
+    ('1W', 1672531650, 1671984000000),   # Monday 2022-12-26 00:00 UTC+8
+    ('1W', 1672592400, 1672588800000),   # Monday 2023-01-02 00:00 UTC+8
+])
+def test_current_bar_start_follows_exchange_time_for_long_bars(timeframe, now, expected):
+    assert current_bar_start(timeframe, now=now) == expected
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src import tracing
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = str(tmp_path / 'traces.jsonl')
+    tracing.configure(1.0, path)
+    yield path
+    tracing.configure(0.0)
+
+def spans_by_name(path):
+    (spans,) = tracing.load_traces(path).values()
+    return {s['name']: s for s in spans}
+
+@pytest.mark.anyio
+async def test_spans_nest_across_awaits_tasks_and_executors(trace_file):
+    @tracing.traced('analyze')
+    def analyze():
+        with tracing.span('scoring'):
+            return threading.current_thread().name
+
+    async def fetch(page):
+        with tracing.span('fetch_page', after=page):
+            await asyncio.sleep(0)
+
+    with tracing.trace('analysis_request', chat_id=7) as root:
+        tracing.record('queued', root.start - 0.5, root.start)
+        await asyncio.gather(fetch(1), fetch(2))
+        with ThreadPoolExecutor(1, thread_name_prefix='chart') as executor:
+            thread = await asyncio.get_running_loop().run_in_executor(executor, tracing.in_context(analyze))
+    assert thread.startswith('chart')
+    assert tracing.current_span() is None
+
+    (spans,) = tracing.load_traces(trace_file).values()
+    by_name = {s['name']: s for s in spans}
+    assert len(spans) == 6 and {s['trace_id'] for s in spans} == {root.trace_id}
+    assert by_name['analysis_request']['parent_id'] is None
+    assert sorted(s['attributes']['after'] for s in spans if s['name'] == 'fetch_page') == [1, 2]
+    for name in ('queued', 'fetch_page', 'analyze'):
+        assert by_name[name]['parent_id'] == root.span_id
+    assert by_name['scoring']['parent_id'] == by_name['analyze']['span_id']
+    assert by_name['queued']['duration'] == pytest.approx(0.5)
+
+def test_errors_are_recorded_and_unsampled_requests_write_nothing(tmp_path):
+    path = str(tmp_path / 'traces.jsonl')
+    tracing.configure(1.0, path)
+    try:
+        with pytest.raises(ValueError):
+            with tracing.trace('analysis_request'):
+                with tracing.span('validate'):
+                    raise ValueError("bad candles")
+        assert spans_by_name(path)['validate']['error'] == 'ValueError: bad candles'
+
+        tracing.configure(0.0, path)
+        with tracing.trace('analysis_request') as root:
+            with tracing.span('validate') as child:
+                pass
+        assert root is None and child is None
+        assert len(tracing.load_traces(path)) == 1
+    finally:
+        tracing.configure(0.0)
+
+def test_waterfall_shows_the_span_tree_with_durations(trace_file):
+    with tracing.trace('analysis_request', symbol='BTC-USDT'):
+        with tracing.span('load_data'):
+            with tracing.span('exchange.candles'):
+                pass
+        with tracing.span('analyze'):
+            pass
+    (spans,) = tracing.load_traces(trace_file).values()
+    lines = tracing.format_waterfall(spans, width=20).splitlines()
+
+    assert lines[0].startswith(f"trace {spans[0]['trace_id']}") and 'symbol=BTC-USDT' in lines[0]
+    assert [line.split(' ms')[0].rsplit(None, 1)[0] for line in lines[1:]] == [
+        'analysis_request', '  load_data', '    exchange.candles', '  analyze']
+    assert all(line.endswith('|') and '█' in line for line in lines[1:])
@@ -0,0 +1,45 @@
+import asyncio
+import json
+import os
+import pytest
+from telegram import Update
+from src.update_processor import ChatUpdateProcessor
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'callback_query_update.json')
+
+def _update(update_id, chat_id):
+    data = json.load(open(FIXTURE_PATH))
+    data['update_id'] = update_id
+    data['callback_query']['message']['chat']['id'] = chat_id
+    return Update.de_json(data, None)
+
+@pytest.mark.anyio
+async def test_updates_of_one_chat_run_in_order_and_other_chats_in_parallel():
+    processor = ChatUpdateProcessor(8)
+    events = []
+
+    async def handle(name):
+        events.append(f'{name} start')
+        await asyncio.sleep(0.01)
+        events.append(f'{name} end')
+
+    await asyncio.gather(
+        processor.process_update(_update(1, 7), handle('a1')),
+        processor.process_update(_update(2, 7), handle('a2')),
+        processor.process_update(_update(3, 8), handle('b1')),
+    )
+    assert events.index('a1 end') < events.index('a2 start')
+    assert events.index('b1 start') < events.index('a1 end')
+    assert processor._chats == {}
+
+@pytest.mark.anyio
+async def test_updates_without_a_chat_are_not_serialized():
+    processor = ChatUpdateProcessor(2)
+    running = []
+
+    async def handle():
+        running.append(processor.current_concurrent_updates)
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(processor.process_update(object(), handle()), processor.process_update(object(), handle()))
+    assert running == [1, 2]
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import pytest
+from telegram import Bot
+from src.webhook_server import WebhookServer
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'callback_query_update.json')
+
+async def _request(port, method, path, body=b'', headers=None):
+    """Sends a single HTTP/1.1 request and returns (status_code, body)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    for name, value in (headers or {}).items():
+        head += f"{name}: {value}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status_line, _, rest = response.partition(b"\r\n")
+    return int(status_line.split()[1]), rest.split(b"\r\n\r\n", 1)[1]
+
+@pytest.fixture
+async def server():
+    received = []
+
+    async def enqueue(update):
+        received.append(update)
+
+    server = WebhookServer(Bot('123456:TEST'), enqueue, listen='127.0.0.1', port=0,
+                           path='telegram', secret_token='s3cret')
+    server.received = received
+    await server.start()
+    yield server
+    await server.stop()
+
+@pytest.mark.anyio
+async def test_recorded_update_is_enqueued(server):
+    with open(FIXTURE_PATH, 'rb') as f:
+        body = f.read()
+
+    status, _ = await _request(server.bound_port, 'POST', '/telegram', body,
+                               {'X-Telegram-Bot-Api-Secret-Token': 's3cret'})
+
+    assert status == 200
+    assert len(server.received) == 1
+    assert server.received[0].callback_query.data == 'analyze_start'
+
+@pytest.mark.anyio
+async def test_concurrent_updates_are_all_accepted(server):
+    update = json.load(open(FIXTURE_PATH))
+    bodies = []
+    for i in range(20):
+        update['update_id'] = i
+        bodies.append(json.dumps(update).encode())
+
+    results = await asyncio.gather(*(
+        _request(server.bound_port, 'POST', '/telegram', body, {'X-Telegram-Bot-Api-Secret-Token': 's3cret'})
+        for body in bodies
+    ))
+
+    assert all(status == 200 for status, _ in results)
+    assert sorted(u.update_id for u in server.received) == list(range(20))
+
+@pytest.mark.anyio
+async def test_invalid_secret_token_is_rejected(server):
+    status, _ = await _request(server.bound_port, 'POST', '/telegram', b'{}',
+                               {'X-Telegram-Bot-Api-Secret-Token': 'wrong'})
+    assert status == 403
+    assert server.received == []
+
+@pytest.mark.anyio
+async def test_public_listener_without_a_secret_is_refused():
+    async def enqueue(update):
+        pass
+
+    with pytest.raises(ValueError):
+        await WebhookServer(Bot('123456:TEST'), enqueue, listen='0.0.0.0', port=0).start()
+    local = WebhookServer(Bot('123456:TEST'), enqueue, listen='127.0.0.1', port=0)
+    await local.start()
+    assert local.bound_port
+    await local.stop()
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('body', [b'not json', b'[]', b'"x"', b'1', b'null'])
+async def test_malformed_json_is_rejected(server, body):
+    status, _ = await _request(server.bound_port, 'POST', '/telegram', body,
+                               {'X-Telegram-Bot-Api-Secret-Token': 's3cret'})
+    assert status == 400
+    assert server.received == []
+
+@pytest.mark.anyio
+async def test_health_and_readiness_endpoints(server):
+    assert await _request(server.bound_port, 'GET', '/healthz') == (200, b'ok')
+    assert await _request(server.bound_port, 'GET', '/readyz') == (200, b'ready')
+
+    server.is_ready = lambda: False
+    status, _ = await _request(server.bound_port, 'GET', '/readyz')
+    assert status == 503
+    assert (await _request(server.bound_port, 'GET', '/unknown'))[0] == 404
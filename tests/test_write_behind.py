@@ -0,0 +1,115 @@
+import sqlite3
+import threading
+import time
+import pytest
+from src.cache_manager import CacheManager
+from src.database import DatabaseManager
+from src.write_behind import CandleWriter
+
+START = 1672531200000
+
+def _candles(count, start=START, price=100.0):
+    return [
+        {'timestamp': start + i * 60_000, 'open': price, 'high': price + 1, 'low': price - 1,
+         'close': price + i, 'volume': 10.0}
+        for i in range(count)
+    ]
+
+class _RecordingDatabase(DatabaseManager):
+    """Records each committed batch and can hold the writer inside a transaction."""
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def save_candles_many(self, writes):
+        writes = list(writes)
+        self.gate.wait()
+        super().save_candles_many(writes)
+        self.batches.append([(symbol, timeframe) for symbol, timeframe, *_ in writes])
+
+def test_writes_queued_during_a_commit_share_the_next_transaction(tmp_path):
+    db = _RecordingDatabase(str(tmp_path / "cache.db"))
+    writer = CandleWriter(db)
+
+    db.gate.clear()
+    writer.submit('BTC-USDT', '1m', _candles(3), ttl_hours=1)
+    for symbol in ('ETH-USDT', 'SOL-USDT', 'XRP-USDT'):
+        writer.submit(symbol, '1H', _candles(2), ttl_hours=1)
+    assert writer.pending() == 4
+    db.gate.set()
+
+    assert writer.flush(timeout=5)
+    assert writer.pending() == 0
+    assert sum(len(batch) for batch in db.batches) == 4
+    assert len(db.batches) <= 2
+    writer.close()
+
+    reader = DatabaseManager(str(tmp_path / "cache.db"))
+    assert len(reader.get_candles('BTC-USDT', '1m')) == 3
+    assert reader.get_cache_metadata('XRP-USDT', '1H')['ttl_hours'] == 1
+    assert reader._conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    reader.close()
+
+def test_writes_are_applied_in_submission_order(tmp_path):
+    db = DatabaseManager(str(tmp_path / "cache.db"))
+    writer = CandleWriter(db)
+    # INSERT OR IGNORE keeps the first write of a candle, so order is observable.
+    writer.submit('BTC-USDT', '1m', _candles(2, price=1.0), ttl_hours=1)
+    writer.submit('BTC-USDT', '1m', _candles(3, price=2.0), ttl_hours=1)
+    writer.close()
+
+    reader = DatabaseManager(str(tmp_path / "cache.db"))
+    assert [c['open'] for c in reader.get_candles('BTC-USDT', '1m')] == [1.0, 1.0, 2.0]
+    reader.close()
+    with pytest.raises(RuntimeError):
+        writer.submit('BTC-USDT', '1m', _candles(1), ttl_hours=1)
+
+@pytest.mark.parametrize("storage", ['rows', 'chunked'])
+def test_cache_manager_reads_its_own_queued_writes(tmp_path, storage):
+    manager = CacheManager(str(tmp_path / "cache.db"), default_ttl_hours=1, storage=storage, write_behind=True)
+    manager.set('BTC/USDT', '1H', _candles(5))
+    candles = manager.get('BTC/USDT', '1H')
+    assert candles is not None and len(candles) == 5
+    manager.set('ETH/USDT', '1H', _candles(2))
+    manager.close()
+
+    reopened = CacheManager(str(tmp_path / "cache.db"), storage=storage)
+    assert len(reopened.get('ETH/USDT', '1H')) == 2
+    reopened.close()
+
+def test_reads_wait_for_a_slow_writer_only_up_to_the_timeout(tmp_path):
+    manager = CacheManager(str(tmp_path / "cache.db"), default_ttl_hours=1, write_behind=True,
+                           write_wait_timeout=0.1)
+    manager.set('BTC/USDT', '1H', _candles(5))
+    manager.writer.flush()
+    slow = _RecordingDatabase(str(tmp_path / "cache.db"))
+    slow.gate.clear()
+    manager.writer.db, committed = slow, manager.writer.db
+    manager.set('BTC/USDT', '1H', _candles(3, start=START + 5 * 60_000))
+
+    # The committed candles are served while the writer is held up.
+    assert len(manager.get('BTC/USDT', '1H')) == 5
+    slow.gate.set()
+    manager.writer.flush()
+    assert len(manager.get('BTC/USDT', '1H')) == 8
+    manager.close()
+    committed.close()
+
+def test_writer_waits_for_another_connection_to_release_the_write_lock(tmp_path):
+    writer = CandleWriter(DatabaseManager(str(tmp_path / "cache.db")), busy_timeout=30)
+    assert writer.db._conn.execute('PRAGMA busy_timeout').fetchone()[0] == 30_000
+    blocker = sqlite3.connect(str(tmp_path / "cache.db"), isolation_level=None)
+    blocker.execute('BEGIN IMMEDIATE')
+    writer.submit('BTC-USDT', '1m', _candles(3), ttl_hours=1)
+    time.sleep(0.2)
+    assert writer.pending() == 1
+    blocker.execute('COMMIT')
+    blocker.close()
+
+    assert writer.flush(timeout=10)
+    writer.close()
+    reader = DatabaseManager(str(tmp_path / "cache.db"))
+    assert len(reader.get_candles('BTC-USDT', '1m')) == 3
+    reader.close()
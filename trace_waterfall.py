@@ -0,0 +1,52 @@
+"""
+Prints traced analysis requests (see TRACE_SAMPLE_RATE) as span waterfalls.
+
+Usage (from the project root):
+    python trace_waterfall.py                     # the latest trace
+    python trace_waterfall.py 3f2a9c              # the trace whose id starts with 3f2a9c
+    python trace_waterfall.py --last 5 --chat 12345
+    python trace_waterfall.py --slowest 3
+"""
+import argparse
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description="Print recorded analysis traces as waterfalls.")
+    parser.add_argument('trace_id', nargs='?', help="Trace id or a prefix of it (default: the latest trace).")
+    parser.add_argument('--file', default=None, help="Span file (default: TRACE_FILE).")
+    parser.add_argument('--last', type=int, default=1, help="Print the N latest traces.")
+    parser.add_argument('--slowest', type=int, default=None, help="Print the N slowest traces instead.")
+    parser.add_argument('--chat', default=None, help="Only traces of this chat id.")
+    parser.add_argument('--width', type=int, default=50, help="Width of the timeline bars.")
+    args = parser.parse_args()
+
+    from src.tracing import format_waterfall, load_traces
+
+    path = args.file
+    if path is None:
+        from src.config import get_app_config
+        path = get_app_config().get('tracing', {}).get('FILE', 'data/traces.jsonl')
+    try:
+        traces = load_traces(path)
+    except FileNotFoundError:
+        sys.exit(f"No trace file at {path}; set TRACE_SAMPLE_RATE above 0 to record traces.")
+
+    def root(spans):
+        return next((s for s in spans if s['parent_id'] is None), spans[0])
+
+    selected = list(traces.values())
+    if args.trace_id:
+        selected = [spans for trace_id, spans in traces.items() if trace_id.startswith(args.trace_id)]
+    if args.chat:
+        selected = [spans for spans in selected if str(root(spans)['attributes'].get('chat_id')) == args.chat]
+    if args.slowest:
+        selected = sorted(selected, key=lambda spans: root(spans)['duration'], reverse=True)[:args.slowest]
+    elif not args.trace_id:
+        selected = sorted(selected, key=lambda spans: root(spans)['start'])[-args.last:]
+    if not selected:
+        sys.exit("No matching traces.")
+
+    print('\n\n'.join(format_waterfall(spans, args.width) for spans in selected))
+
+if __name__ == '__main__':
+    main()